@@ -2,6 +2,12 @@
 ASGI config for PrimeStore project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Run it under gunicorn with uvicorn workers, so the async views (Stripe
+checkout, search suggestions) wait on the network without holding a worker::
+
+    gunicorn PrimeStore.asgi:application -k uvicorn_worker.UvicornWorker
+
+The WSGI entry point in ``wsgi.py`` serves the same views with sync workers.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
@@ -14,3 +20,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'PrimeStore.settings')
 
 application = get_asgi_application()
+
+from orders.payments import gateway
+
+# Event loops here last as long as the worker, so async Stripe calls can keep
+# a connection pool per loop.
+gateway.long_lived_loops = True
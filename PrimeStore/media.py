@@ -0,0 +1,184 @@
+"""
+Serving uploaded media in production.
+
+``MediaFiles`` is WSGI middleware that answers requests under ``MEDIA_URL``
+from ``MEDIA_ROOT`` before they reach Django, the way WhiteNoise does for
+static files. It handles ``If-None-Match``/``If-Modified-Since``, single
+``Range`` requests (with ``If-Range``) and hands the open file to the server's
+``wsgi.file_wrapper``, so gunicorn sends it with ``sendfile``. Anything it
+can't find is passed on to Django.
+
+Product images are stored by ``HashedFilenameStorage`` under names carrying a
+hash of their content; such a name always has the same bytes, so it is cached
+as immutable for a year. Other files get ``MEDIA_MAX_AGE`` and revalidate with
+their ETag. Under ASGI the ``serve`` view answers the same requests.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+import stat
+from wsgiref.util import FileWrapper
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.core.handlers.wsgi import get_path_info
+from django.http import Http404
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from django.views.decorators.http import require_safe
+from PrimeStore.ranges import CHUNK_SIZE, file_etag, parse_range_header, ranged_file_response
+
+HASH_LENGTH = 12
+HASHED_NAME_RE = re.compile(rf"\.[0-9a-f]{{{HASH_LENGTH}}}\.\w+$")
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+class HashedFilenameStorage(FileSystemStorage):
+    """Saves ``phone.jpg`` as ``phone.<hash of its content>.jpg``; identical uploads share one file."""
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        root, ext = os.path.splitext(name)
+        name = f"{root}.{digest.hexdigest()[:HASH_LENGTH]}{ext}"
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
+hashed_storage = HashedFilenameStorage()
+
+def cache_control(name, max_age=None):
+    if HASHED_NAME_RE.search(name):
+        return f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    if max_age is None:
+        max_age = getattr(settings, "MEDIA_MAX_AGE", 3600)
+    return f"public, max-age={max_age}"
+def media_path(root, name):
+    """The file ``name`` refers to under ``root``, or ``None`` if it is outside it or hidden."""
+    if any(part.startswith(".") for part in name.split("/")):
+        return None
+    try:
+        return safe_join(root, name)
+    except SuspiciousFileOperation:
+        return None
+def _not_modified(environ, etag, mtime):
+    if_none_match = environ.get("HTTP_IF_NONE_MATCH")
+    if if_none_match:
+        etags = {tag.removeprefix("W/") for tag in parse_etags(if_none_match)}
+        return "*" in etags or etag in etags
+    since = parse_http_date_safe(environ.get("HTTP_IF_MODIFIED_SINCE"))
+    return since is not None and int(mtime) <= since
+class _FileSlice:
+    """
+    The next ``length`` bytes of an open file. ``fileno`` lets the server's
+    ``wsgi.file_wrapper`` send them with ``sendfile`` from the current offset.
+    """
+    def __init__(self, fh, length):
+        self.fh = fh
+        self.remaining = length
+    def fileno(self):
+        return self.fh.fileno()
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.fh.read(size)
+        self.remaining -= len(data)
+        return data
+    def close(self):
+        self.fh.close()
+class MediaFiles:
+    """
+    Wraps the WSGI application in ``wsgi.py``::
+
+        application = MediaFiles(get_wsgi_application())
+    """
+    def __init__(self, application, root=None, prefix=None, max_age=None):
+        self.application = application
+        self.root = str(root or settings.MEDIA_ROOT)
+        self.prefix = prefix or settings.MEDIA_URL
+        self.max_age = max_age
+    def __call__(self, environ, start_response):
+        path = get_path_info(environ)
+        if (
+            not self.prefix.startswith("/")
+            or not path.startswith(self.prefix)
+            or environ["REQUEST_METHOD"] not in ("GET", "HEAD")
+        ):
+            return self.application(environ, start_response)
+        name = path[len(self.prefix):]
+        full = media_path(self.root, name)
+        try:
+            fh = open(full, "rb") if full else None
+        except OSError:
+            fh = None
+        if fh is not None and not stat.S_ISREG(os.fstat(fh.fileno()).st_mode):
+            fh.close()
+            fh = None
+        if fh is None:
+            return self.application(environ, start_response)
+        try:
+            return self._serve(environ, start_response, name, fh)
+        except BaseException:
+            fh.close()
+            raise
+    def _serve(self, environ, start_response, name, fh):
+        info = os.fstat(fh.fileno())
+        size = info.st_size
+        etag = file_etag(info)
+        last_modified = http_date(info.st_mtime)
+        headers = [
+            ("ETag", etag),
+            ("Last-Modified", last_modified),
+            ("Cache-Control", cache_control(name, self.max_age)),
+            ("Accept-Ranges", "bytes"),
+        ]
+        if _not_modified(environ, etag, info.st_mtime):
+            fh.close()
+            start_response("304 Not Modified", headers)
+            return []
+        byte_range = None
+        if_range = environ.get("HTTP_IF_RANGE")
+        if not if_range or if_range in (etag, last_modified):
+            try:
+                byte_range = parse_range_header(environ.get("HTTP_RANGE"), size)
+            except ValueError:
+                fh.close()
+                start_response("416 Range Not Satisfiable", [
+                    ("Content-Range", f"bytes */{size}"), ("Content-Length", "0"),
+                ])
+                return []
+        if byte_range is None:
+            start, end, status = 0, size - 1, "200 OK"
+        else:
+            (start, end), status = byte_range, "206 Partial Content"
+            headers.append(("Content-Range", f"bytes {start}-{end}/{size}"))
+        length = end - start + 1 if size else 0
+        content_type, _ = mimetypes.guess_type(name)
+        headers += [
+            ("Content-Type", content_type or "application/octet-stream"),
+            ("Content-Length", str(length)),
+            ("X-Content-Type-Options", "nosniff"),
+        ]
+        start_response(status, headers)
+        if environ["REQUEST_METHOD"] == "HEAD":
+            fh.close()
+            return []
+        fh.seek(start)
+        file_wrapper = environ.get("wsgi.file_wrapper", FileWrapper)
+        return file_wrapper(_FileSlice(fh, length), CHUNK_SIZE)
+@require_safe
+def serve(request, path):
+    """``MediaFiles`` for ASGI, as a view; it runs behind Django's middleware and can't use sendfile."""
+    full = media_path(str(settings.MEDIA_ROOT), path)
+    if full is None or not os.path.isfile(full):
+        raise Http404("Media file not found")
+    content_type, _ = mimetypes.guess_type(path)
+    response = ranged_file_response(
+        request, full, content_type or "application/octet-stream", as_attachment=False
+    )
+    response["Cache-Control"] = cache_control(path)
+    return response
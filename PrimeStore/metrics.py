@@ -0,0 +1,146 @@
+"""
+Prometheus metrics, served in text format at ``/metrics``.
+
+``MetricsMiddleware`` records request latency, status codes and the number
+and time of DB queries per request, labelled by the resolved URL name (or
+the route for unnamed API patterns). Cache lookups, Stripe and FCM calls are
+recorded where they happen, and job queue depth is read from the database
+when scraped. Under gunicorn, set ``PROMETHEUS_MULTIPROC_DIR`` to an empty
+directory so every worker writes its samples there and a scrape of any
+worker aggregates all of them (``gunicorn.conf.py`` cleans up after workers).
+"""
+import hmac
+import os
+import time
+from contextlib import contextmanager
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.models import Count, Min
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils import timezone
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+from .sqlstats import wrap_queries
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+REQUEST_LATENCY = Histogram(
+    "primestore_request_duration_seconds", "Time spent handling a request.",
+    ["view", "method"], buckets=LATENCY_BUCKETS,
+)
+RESPONSES = Counter("primestore_responses_total", "Responses by status code.", ["view", "method", "status"])
+DB_QUERIES = Histogram(
+    "primestore_request_db_queries", "Database queries run per request.", ["view"], buckets=QUERY_BUCKETS,
+)
+DB_TIME = Histogram(
+    "primestore_request_db_seconds", "Database time per request.", ["view"], buckets=LATENCY_BUCKETS,
+)
+CACHE_LOOKUPS = Counter("primestore_cache_lookups_total", "Cache lookups by result.", ["cache", "result"])
+EXTERNAL_CALLS = Histogram(
+    "primestore_external_call_duration_seconds", "Latency of calls to external services.",
+    ["service", "operation", "outcome"], buckets=LATENCY_BUCKETS,
+)
+
+def record_cache(cache, hits, misses=0):
+    if hits:
+        CACHE_LOOKUPS.labels(cache, "hit").inc(hits)
+    if misses:
+        CACHE_LOOKUPS.labels(cache, "miss").inc(misses)
+def observe_external(service, operation, seconds, outcome="ok"):
+    EXTERNAL_CALLS.labels(service, operation, outcome).observe(seconds)
+@contextmanager
+def timed_call(service, operation):
+    """Time the block as one ``service`` call; an exception marks it as an error."""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        observe_external(service, operation, time.perf_counter() - started, outcome)
+class _QueryTimer:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+def view_label(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "<unresolved>"
+    return match.view_name if match.url_name else match.route
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+    def __init__(self, get_response):
+        if not getattr(settings, "METRICS_ENABLED", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with wrap_queries(_QueryTimer()) as timer:
+            response = self.get_response(request)
+        self._observe(request, response, timer, started)
+        return response
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with wrap_queries(_QueryTimer()) as timer:
+            response = await self.get_response(request)
+        self._observe(request, response, timer, started)
+        return response
+    def _observe(self, request, response, timer, started):
+        elapsed = time.perf_counter() - started
+        view = view_label(request)
+        REQUEST_LATENCY.labels(view, request.method).observe(elapsed)
+        RESPONSES.labels(view, request.method, str(response.status_code)).inc()
+        DB_QUERIES.labels(view).observe(timer.count)
+        DB_TIME.labels(view).observe(timer.duration)
+class JobQueueCollector:
+    """Queue depth and age of the oldest due job, read from the database at scrape time."""
+    def describe(self):
+        return []
+    def collect(self):
+        from jobs.models import Job
+        depth = GaugeMetricFamily("primestore_jobs", "Jobs waiting or running, by task.", labels=["task", "status"])
+        for row in (
+            Job.objects.filter(status__in=["queued", "running"])
+            .values("task", "status").annotate(count=Count("id")).order_by()
+        ):
+            depth.add_metric([row["task"], row["status"]], row["count"])
+        yield depth
+        oldest = Job.objects.filter(status="queued", run_at__lte=timezone.now()).aggregate(oldest=Min("run_at"))["oldest"]
+        yield GaugeMetricFamily(
+            "primestore_jobs_oldest_due_seconds", "How long the oldest due job has been waiting.",
+            value=(timezone.now() - oldest).total_seconds() if oldest else 0,
+        )
+def _allowed(request):
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if token:
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        return hmac.compare_digest(supplied.encode(), token.encode())
+    return request.META.get("REMOTE_ADDR") in getattr(settings, "METRICS_ALLOWED_IPS", ["127.0.0.1", "::1"])
+def metrics_view(request):
+    if not _allowed(request):
+        return HttpResponseForbidden()
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        output = generate_latest(registry)
+    else:
+        output = generate_latest(REGISTRY)
+    jobs = CollectorRegistry()
+    jobs.register(JobQueueCollector())
+    return HttpResponse(output + generate_latest(jobs), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,83 @@
+import os
+import re
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.http import http_date, quote_etag
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+
+def parse_range_header(header, size):
+    """
+    Parse a single-range ``Range`` header into an inclusive ``(start, end)``.
+    Returns ``None`` when the header should be ignored (absent, malformed or
+    multi-range) and raises ``ValueError`` when it is unsatisfiable.
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        length = int(end)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = int(end) if end else size - 1
+    if start >= size or end < start:
+        raise ValueError("Range not satisfiable")
+    return start, min(end, size - 1)
+def iter_file_range(path, start, length, chunk_size=CHUNK_SIZE):
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        remaining = length
+        while remaining > 0:
+            data = fh.read(min(chunk_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+def file_etag(stat):
+    return quote_etag(f"{stat.st_mtime_ns:x}-{stat.st_size:x}")
+def ranged_file_response(request, path, content_type, filename=None, as_attachment=True):
+    """Stream ``path`` honouring ``Range``/``If-Range`` and ``If-None-Match``."""
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = file_etag(stat)
+    if request.headers.get("If-None-Match") == etag:
+        response = HttpResponse(status=304)
+        response["ETag"] = etag
+        return response
+    byte_range = None
+    if_range = request.headers.get("If-Range")
+    if not if_range or if_range == etag:
+        try:
+            byte_range = parse_range_header(request.headers.get("Range"), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+    if byte_range is None:
+        start, end, status = 0, size - 1, 200
+    else:
+        (start, end), status = byte_range, 206
+    length = end - start + 1 if size else 0
+    if request.method == "HEAD":
+        response = HttpResponse(status=status, content_type=content_type)
+    else:
+        response = StreamingHttpResponse(
+            iter_file_range(path, start, length), status=status, content_type=content_type
+        )
+    response["Content-Length"] = str(length)
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    if status == 206:
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    if filename:
+        disposition = "attachment" if as_attachment else "inline"
+        response["Content-Disposition"] = f'{disposition}; filename="{filename}"'
+    return response
@@ -0,0 +1,143 @@
+"""
+Read replicas with read-your-writes stickiness.
+
+Replicas are the ``replicaN`` aliases built from ``REPLICA_DATABASE_URLS``.
+``ReplicaRouter`` sends every write to the primary. Reads go to a replica only
+inside a ``use_replica()`` block (exports, snapshots), or during a GET/HEAD
+request to a view in ``REPLICA_READ_NAMESPACES`` or one marked
+``replica_reads = True`` (the read-only API endpoints).
+
+Reads stay on the primary in four cases:
+- inside a transaction;
+- for sessions and the job queue;
+- for the rest of a request once it has written anything;
+- for ``REPLICA_PIN_SECONDS`` after a client's last write. A short-lived
+  cookie records this, so the pin covers whichever worker serves the next
+  request.
+"""
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import FileResponse
+
+PIN_COOKIE = "primary_pin"
+PRIMARY_ONLY_APPS = {"sessions", "jobs"}
+
+_reads = ContextVar("PrimeStore.replicas.reads", default=None)
+
+def pick_replica():
+    """A random replica alias, or the primary when none are configured."""
+    replicas = getattr(settings, "REPLICA_DATABASES", [])
+    return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+class _Reads:
+    """Where reads go for the current request or ``use_replica`` block."""
+    def __init__(self, alias=None, request=None, pin_on_write=True):
+        self.alias = alias
+        self.request = request
+        self.pin_on_write = pin_on_write
+        self.wrote = False
+    def alias_for(self, model):
+        if self.wrote and self.pin_on_write:
+            return DEFAULT_DB_ALIAS
+        if model._meta.app_label in PRIMARY_ONLY_APPS or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if self.alias is None:
+            # Decided once the URL has been resolved; reads before that
+            # (the session, mostly) use the primary.
+            match = getattr(self.request, "resolver_match", None)
+            if match is None:
+                return DEFAULT_DB_ALIAS
+            self.alias = pick_replica() if _replica_view(self.request, match) else DEFAULT_DB_ALIAS
+        return self.alias
+def _replica_view(request, match):
+    if request.method not in ("GET", "HEAD") or is_pinned(request):
+        return False
+    view_class = getattr(match.func, "view_class", None)
+    return (
+        match.namespace in getattr(settings, "REPLICA_READ_NAMESPACES", [])
+        or getattr(match.func, "replica_reads", False)
+        or getattr(view_class, "replica_reads", False)
+    )
+def is_pinned(request):
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+@contextmanager
+def use_replica():
+    """Send reads in this block to a replica; writes in it don't pin later reads to the primary."""
+    token = _reads.set(_Reads(alias=pick_replica(), pin_on_write=False))
+    try:
+        yield
+    finally:
+        _reads.reset(token)
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        reads = _reads.get()
+        if reads is None:
+            return None
+        return reads.alias_for(model)
+    def db_for_write(self, model, **hints):
+        reads = _reads.get()
+        if reads is not None and model._meta.app_label not in PRIMARY_ONLY_APPS:
+            reads.wrote = True
+        return DEFAULT_DB_ALIAS
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+def _streamed(content, reads):
+    iterator = iter(content)
+    while True:
+        token = _reads.set(reads)
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _reads.reset(token)
+        yield chunk
+class ReplicaMiddleware:
+    sync_capable = True
+    async_capable = True
+    def __init__(self, get_response):
+        if not getattr(settings, "REPLICA_DATABASES", []):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.pin_seconds = getattr(settings, "REPLICA_PIN_SECONDS", 5.0)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        reads = _Reads(request=request)
+        token = _reads.set(reads)
+        try:
+            response = self.get_response(request)
+        finally:
+            _reads.reset(token)
+        return self._pin(request, response, reads)
+    async def __acall__(self, request):
+        reads = _Reads(request=request)
+        token = _reads.set(reads)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _reads.reset(token)
+        return self._pin(request, response, reads)
+    def _pin(self, request, response, reads):
+        if response.streaming and not response.is_async and not isinstance(response, FileResponse):
+            # Streamed exports read while the server iterates the response.
+            response.streaming_content = _streamed(response.streaming_content, reads)
+        if reads.wrote or request.method not in ("GET", "HEAD", "OPTIONS"):
+            response.set_cookie(
+                PIN_COOKIE, f"{time.time() + self.pin_seconds:.3f}",
+                max_age=self.pin_seconds, httponly=True, samesite="Lax",
+            )
+        return response
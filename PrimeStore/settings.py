@@ -7,6 +7,38 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 STRIPE_PUBLIC_KEY = config("STRIPE_PUBLIC_KEY")
 STRIPE_SECRET_KEY = config("STRIPE_SECRET_KEY")
 STRIPE_WEBHOOK_SECRET = config("STRIPE_WEBHOOK_SECRET")
+STRIPE_API_BASE = config("STRIPE_API_BASE", default=None)
+STRIPE_CONNECT_TIMEOUT = config("STRIPE_CONNECT_TIMEOUT", default=3.0, cast=float)
+STRIPE_READ_TIMEOUT = config("STRIPE_READ_TIMEOUT", default=10.0, cast=float)
+STRIPE_MAX_RETRIES = config("STRIPE_MAX_RETRIES", default=2, cast=int)
+STRIPE_POOL_SIZE = config("STRIPE_POOL_SIZE", default=10, cast=int)
+STRIPE_BREAKER_THRESHOLD = config("STRIPE_BREAKER_THRESHOLD", default=5, cast=int)
+STRIPE_BREAKER_RESET = config("STRIPE_BREAKER_RESET", default=30.0, cast=float)
+IDEMPOTENCY_KEY_TTL = config("IDEMPOTENCY_KEY_TTL", default=24 * 3600, cast=int)
+# Seconds before a retry may take over a key whose request never finished.
+IDEMPOTENCY_LEASE = config("IDEMPOTENCY_LEASE", default=120, cast=int)
+DASHBOARD_WIDGET_TTL = config("DASHBOARD_WIDGET_TTL", default=60, cast=int)
+DASHBOARD_WIDGET_STALE_TTL = config("DASHBOARD_WIDGET_STALE_TTL", default=900, cast=int)
+JOBS_POLL_INTERVAL = config("JOBS_POLL_INTERVAL", default=1.0, cast=float)
+JOBS_RETRY_BASE = config("JOBS_RETRY_BASE", default=10, cast=int)
+JOBS_LEASE = config("JOBS_LEASE", default=1800, cast=int)
+JOBS_RETENTION_DAYS = config("JOBS_RETENTION_DAYS", default=7, cast=int)
+DELTA_EXPORT_LAG = config("DELTA_EXPORT_LAG", default=60, cast=int)
+ANALYTICS_SNAPSHOT_DIR = config("ANALYTICS_SNAPSHOT_DIR", default=str(BASE_DIR / "var" / "analytics"))
+LOW_STOCK_THRESHOLD = config("LOW_STOCK_THRESHOLD", default=5, cast=int)
+NOTIFICATION_TRANSPORT = config("NOTIFICATION_TRANSPORT", default="notifications.transports.FCMTransport")
+NOTIFICATION_BATCH_SIZE = config("NOTIFICATION_BATCH_SIZE", default=500, cast=int)
+NOTIFICATION_CONCURRENCY = config("NOTIFICATION_CONCURRENCY", default=4, cast=int)
+NOTIFICATION_RATE_LIMIT = config("NOTIFICATION_RATE_LIMIT", default=5000, cast=int)
+METRICS_ENABLED = config("METRICS_ENABLED", default=True, cast=bool)
+METRICS_TOKEN = config("METRICS_TOKEN", default="")
+METRICS_ALLOWED_IPS = config("METRICS_ALLOWED_IPS", default="127.0.0.1,::1", cast=lambda v: [e.strip() for e in v.split(",") if e.strip()])
+SQL_INSTRUMENTATION = config("SQL_INSTRUMENTATION", default=False, cast=bool)
+SQL_N_PLUS_ONE_THRESHOLD = config("SQL_N_PLUS_ONE_THRESHOLD", default=5, cast=int)
+REPLICA_DATABASE_URLS = config("REPLICA_DATABASE_URLS", default="", cast=lambda v: [e.strip() for e in v.split(",") if e.strip()])
+REPLICA_READ_NAMESPACES = config("REPLICA_READ_NAMESPACES", default="store,dashboard", cast=lambda v: [e.strip() for e in v.split(",") if e.strip()])
+REPLICA_PIN_SECONDS = config("REPLICA_PIN_SECONDS", default=5.0, cast=float)
+STOCK_ALERT_RECIPIENTS = config("STOCK_ALERT_RECIPIENTS", default="", cast=lambda v: [e.strip() for e in v.split(",") if e.strip()])
 SECRET_KEY = config("SECRET_KEY", default="unsafe-dev-key")
 
 DEBUG = config("DEBUG", default=True, cast=bool)
@@ -35,6 +67,9 @@ INSTALLED_APPS = [
     'orders',
     'accounts',
     'dashboard',
+    'notifications',
+    'jobs',
+    'benchmarks',
     'rest_framework',
     'rest_framework_simplejwt',
     'rest_framework.authtoken',
@@ -49,8 +84,11 @@ REST_FRAMEWORK = {
 }
 
 MIDDLEWARE = [
+    "PrimeStore.sqlstats.SQLInstrumentationMiddleware",
+    "PrimeStore.metrics.MetricsMiddleware",
+    "PrimeStore.replicas.ReplicaMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "PrimeStore.staticfiles.StaticFilesMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -85,6 +123,35 @@ DATABASES = {
         conn_max_age=600,
     )
 }
+# Read replicas; PrimeStore.replicas decides which reads may use them.
+for index, url in enumerate(REPLICA_DATABASE_URLS, start=1):
+    DATABASES[f"replica{index}"] = dict(dj_database_url.parse(url, conn_max_age=600), TEST={"MIRROR": "default"})
+REPLICA_DATABASES = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["PrimeStore.replicas.ReplicaRouter"]
+for database in DATABASES.values():
+    if database["ENGINE"] == "django.db.backends.sqlite3":
+        # WAL lets the job worker write while web requests read; IMMEDIATE
+        # transactions wait for the write lock instead of failing to upgrade.
+        database.setdefault("OPTIONS", {}).update({
+            "init_command": "PRAGMA journal_mode=WAL;",
+            "transaction_mode": "IMMEDIATE",
+            "timeout": 20,
+        })
+
+REDIS_URL = config("REDIS_URL", default=None)
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
 
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
@@ -104,6 +171,11 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+# Serve MEDIA_ROOT from the app (PrimeStore.media); turn off when a CDN or
+# object storage serves uploads.
+SERVE_MEDIA = config("SERVE_MEDIA", default=True, cast=bool)
+# Browser cache lifetime for uploads without a content hash in their name.
+MEDIA_MAX_AGE = config("MEDIA_MAX_AGE", default=3600, cast=int)
 
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 DEFAULT_FROM_EMAIL = 'noreply@myshop.com'
@@ -0,0 +1,160 @@
+"""
+Per-request SQL instrumentation.
+
+``SQLInstrumentationMiddleware`` (on when ``SQL_INSTRUMENTATION`` is set)
+records every query run while handling a request and reports the query count and DB time in ``X-Query-Count``/``Server-Timing`` headers and
+one JSON log line. Statements are grouped by fingerprint (the SQL with its
+placeholders, ``IN`` lists collapsed); a fingerprint run at least
+``SQL_N_PLUS_ONE_THRESHOLD`` times is logged as a likely N+1 together with
+the project code and template line that issued it first.
+
+``wrap_queries`` does the routing: each connection carries one permanent
+execute wrapper that hands queries to the wrappers active in the current
+context, so queries that async views run through ``sync_to_async`` on another
+thread are still attributed to the request that made them.
+"""
+import json
+import logging
+import re
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+from pathlib import Path
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger("PrimeStore.sql")
+
+IN_LIST_RE = re.compile(r"\((?:%s, )+%s\)")
+PROJECT_ROOT = str(Path(__file__).resolve().parent.parent)
+
+_active_wrappers = ContextVar("PrimeStore.sqlstats.wrappers", default=())
+
+def _run_wrappers(execute, sql, params, many, context):
+    for wrapper in reversed(_active_wrappers.get()):
+        execute = partial(wrapper, execute)
+    return execute(sql, params, many, context)
+def _install(sender=None, connection=None, **kwargs):
+    if _run_wrappers not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_run_wrappers)
+connection_created.connect(_install)
+@contextmanager
+def wrap_queries(wrapper):
+    """Pass every query run in this context, on any thread or connection, through ``wrapper``."""
+    for connection in connections.all(initialized_only=True):
+        _install(connection=connection)
+    token = _active_wrappers.set(_active_wrappers.get() + (wrapper,))
+    try:
+        yield wrapper
+    finally:
+        _active_wrappers.reset(token)
+def fingerprint(sql):
+    return IN_LIST_RE.sub("(...)", sql)
+def _origin():
+    """The innermost project frame and template node on the current stack."""
+    code = template = None
+    frame = sys._getframe(2)
+    while frame is not None and (code is None or template is None):
+        filename = frame.f_code.co_filename
+        if template is None and "django/template" in filename:
+            node = frame.f_locals.get("self")
+            origin = getattr(node, "origin", None)
+            token = getattr(node, "token", None)
+            if origin is not None and token is not None:
+                template = f"{origin.template_name}:{token.lineno}"
+        elif (
+            code is None
+            and filename.startswith(PROJECT_ROOT)
+            and "site-packages" not in filename
+            and filename != __file__
+        ):
+            code = f"{Path(filename).relative_to(PROJECT_ROOT)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return code, template
+class QueryRecorder:
+    """``execute_wrapper`` that times statements and groups them by fingerprint."""
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = {}
+        self.slowest = []
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.duration += elapsed
+            key = fingerprint(sql)
+            entry = self.statements.get(key)
+            if entry is None:
+                code, template = _origin()
+                entry = self.statements[key] = {"count": 0, "time": 0.0, "code": code, "template": template}
+            entry["count"] += 1
+            entry["time"] += elapsed
+            self.slowest.append((elapsed, sql))
+            if len(self.slowest) > 20:
+                self.slowest.sort(reverse=True)
+                del self.slowest[10:]
+    def repeated(self, threshold):
+        return {
+            sql: entry for sql, entry in self.statements.items() if entry["count"] >= threshold
+        }
+    def report(self, threshold, slow_count=5):
+        return {
+            "queries": self.count,
+            "db_ms": round(self.duration * 1000, 2),
+            "duplicates": sum(entry["count"] - 1 for entry in self.statements.values()),
+            "n_plus_one": [
+                dict(entry, sql=sql, time=round(entry["time"] * 1000, 2))
+                for sql, entry in self.repeated(threshold).items()
+            ],
+            "slowest": [
+                {"ms": round(elapsed * 1000, 2), "sql": sql[:500]}
+                for elapsed, sql in sorted(self.slowest, reverse=True)[:slow_count]
+            ],
+        }
+class SQLInstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+    def __init__(self, get_response):
+        if not getattr(settings, "SQL_INSTRUMENTATION", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = getattr(settings, "SQL_N_PLUS_ONE_THRESHOLD", 5)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with wrap_queries(QueryRecorder()) as recorder:
+            response = self.get_response(request)
+        return self._report(request, response, recorder, started)
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with wrap_queries(QueryRecorder()) as recorder:
+            response = await self.get_response(request)
+        return self._report(request, response, recorder, started)
+    def _report(self, request, response, recorder, started):
+        total = time.perf_counter() - started
+        report = recorder.report(self.threshold)
+        response["X-Query-Count"] = str(recorder.count)
+        response["Server-Timing"] = (
+            f'db;dur={report["db_ms"]};desc="{recorder.count} queries", '
+            f"total;dur={total * 1000:.2f}"
+        )
+        report.update(method=request.method, path=request.path, status=response.status_code)
+        logger.info(json.dumps(report), extra={"sql": report})
+        for entry in report["n_plus_one"]:
+            logger.warning(
+                "Possible N+1 on %s: %s queries like %s (from %s, template %s)",
+                request.path, entry["count"], entry["sql"][:200], entry["code"], entry["template"],
+            )
+        return response
@@ -0,0 +1,20 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from .sqlstats import fingerprint
+
+class QueryBudgetMixin:
+    """``assertQueryBudget`` for ``TestCase``s: fail when a request runs more queries than allowed."""
+    def assertQueryBudget(self, budget, path, method="get", client=None, **kwargs):
+        client = client or self.client
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(client, method)(path, **kwargs)
+        if len(ctx) > budget:
+            counts = {}
+            for query in ctx.captured_queries:
+                key = fingerprint(query["sql"])
+                counts[key] = counts.get(key, 0) + 1
+            details = "\n".join(
+                f"  {count}x {sql[:200]}" for sql, count in sorted(counts.items(), key=lambda item: -item[1])
+            )
+            self.fail(f"{method.upper()} {path} ran {len(ctx)} queries, budget is {budget}:\n{details}")
+        return response
@@ -0,0 +1,84 @@
+import sqlite3
+import tempfile
+from decimal import Decimal
+from pathlib import Path
+from unittest import skipUnless
+from django.contrib.sessions.models import Session
+from django.db import connection, connections, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TransactionTestCase, override_settings
+from django.urls import resolve
+from django.utils import timezone
+from jobs.models import Job
+from store.models import Category, Product
+from .replicas import PIN_COOKIE, ReplicaMiddleware, use_replica
+
+REPLICA = "replica_test"
+
+@skipUnless(connection.vendor == "sqlite", "Uses a second SQLite file as the replica.")
+@override_settings(REPLICA_DATABASES=[REPLICA], REPLICA_READ_NAMESPACES=["store"])
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    The replica is a copy of the test database's schema in its own file, so
+    rows written to only one side show where a read went. Transaction test
+    case: inside ``TestCase``'s transaction every read stays on the primary.
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls._dir = tempfile.TemporaryDirectory()
+        path = str(Path(cls._dir.name) / "replica.sqlite3")
+        connections["default"].ensure_connection()
+        target = sqlite3.connect(path)
+        connections["default"].connection.backup(target)
+        target.close()
+        connections.settings[REPLICA] = dict(connections["default"].settings_dict, NAME=path)
+        # Declared here rather than on the class: the runner only sets up
+        # databases that exist before the tests start.
+        cls.databases = {"default", REPLICA}
+        super().setUpClass()
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+        cls._dir.cleanup()
+    def setUp(self):
+        self.category = Category.objects.create(name="On primary", slug="on-primary")
+        Category.objects.using(REPLICA).create(name="On replica", slug="on-replica")
+        # flush skips the replica: the router allows no migrations there.
+        self.addCleanup(Category.objects.using(REPLICA).all().delete)
+        self.product = Product.objects.create(
+            category=self.category, name="Phone", slug="phone", price=Decimal("100.00"), stock=5,
+        )
+    def category_names(self, response):
+        return {category["name"] for category in response.json()["categories"]}
+    def test_store_and_api_reads_use_replica(self):
+        self.assertEqual(self.category_names(self.client.get("/filters/")), {"On replica"})
+        names = {category["name"] for category in self.client.get("/api/categories/").json()}
+        self.assertEqual(names, {"On replica"})
+    def test_post_pins_reads_to_primary(self):
+        response = self.client.post(f"/cart/add/{self.product.pk}/")
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(self.category_names(self.client.get("/filters/")), {"On primary"})
+    def test_write_pins_rest_of_request(self):
+        seen = []
+        def view(request):
+            seen.append(Category.objects.filter(slug="on-replica").exists())
+            Category.objects.create(name="New", slug="new")
+            seen.append(Category.objects.filter(slug="new").exists())
+            return HttpResponse()
+        request = RequestFactory().get("/filters/")
+        request.resolver_match = resolve("/filters/")
+        response = ReplicaMiddleware(view)(request)
+        self.assertEqual(seen, [True, True])
+        self.assertIn(PIN_COOKIE, response.cookies)
+    def test_primary_only_reads(self):
+        Job.objects.create(task="noop")
+        Session.objects.create(session_key="k", session_data="", expire_date=timezone.now())
+        with use_replica():
+            self.assertFalse(Category.objects.filter(slug="on-primary").exists())
+            with transaction.atomic():
+                self.assertTrue(Category.objects.filter(slug="on-primary").exists())
+            self.assertTrue(Job.objects.exists())
+            self.assertTrue(Session.objects.exists())
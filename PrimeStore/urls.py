@@ -1,27 +1,41 @@
 
+from functools import cache
 from django.contrib import admin
 from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
 from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-schema_view = get_schema_view(
-    openapi.Info(
-        title="PrimeStore API Documentation",
-        default_version="v1",
-        description="API documentation for PrimeStore E-commerce system",
-        terms_of_service="https://example.com/terms/",
-        contact=openapi.Contact(email="support@example.com"),
-        license=openapi.License(name="MIT"),
-    ),
-    public=True,
-    permission_classes=[permissions.AllowAny],
-)
+from PrimeStore.metrics import metrics_view
+from PrimeStore import media
+@cache
+def schema_view():
+    # drf_yasg is slow to import, so it is loaded with the first docs request.
+    from drf_yasg.views import get_schema_view
+    from drf_yasg import openapi
+    return get_schema_view(
+        openapi.Info(
+            title="PrimeStore API Documentation",
+            default_version="v1",
+            description="API documentation for PrimeStore E-commerce system",
+            terms_of_service="https://example.com/terms/",
+            contact=openapi.Contact(email="support@example.com"),
+            license=openapi.License(name="MIT"),
+        ),
+        public=True,
+        permission_classes=[permissions.AllowAny],
+    )
+def docs_view(renderer=None):
+    @cache
+    def build():
+        if renderer is None:
+            return schema_view().without_ui(cache_timeout=0)
+        return schema_view().with_ui(renderer, cache_timeout=0)
+    def view(request, *args, **kwargs):
+        return build()(request, *args, **kwargs)
+    return view
 urlpatterns = [
     path('api/auth/login/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
@@ -31,11 +45,15 @@ urlpatterns = [
     path('dashboard/', include('dashboard.urls')),
     path('orders/', include('orders.urls', namespace='orders')),
     path('api/', include('api.urls')),  # REST API
+    path('metrics', metrics_view, name='metrics'),
 ]
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+if settings.SERVE_MEDIA and settings.MEDIA_URL.startswith('/'):
+    # Under WSGI, MediaFiles answers these before Django sees them.
+    urlpatterns += [
+        re_path(rf'^{settings.MEDIA_URL.lstrip("/")}(?P<path>.*)$', media.serve, name='media'),
+    ]
 urlpatterns += [
-    re_path(r'^api/docs/$', schema_view.with_ui('swagger', cache_timeout=0), name='swagger-ui'),
-    re_path(r'^api/redoc/$', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
-    re_path(r'^api/schema/$', schema_view.without_ui(cache_timeout=0), name='schema-json'),
+    re_path(r'^api/docs/$', docs_view('swagger'), name='swagger-ui'),
+    re_path(r'^api/redoc/$', docs_view('redoc'), name='schema-redoc'),
+    re_path(r'^api/schema/$', docs_view(), name='schema-json'),
 ]
\ No newline at end of file
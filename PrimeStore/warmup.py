@@ -0,0 +1,31 @@
+"""
+Warm-up for servers that load the app once and fork workers from it.
+
+Heavy dependencies (Stripe, ReportLab, openpyxl, NumPy, drf_yasg) are
+imported on first use so that a worker booted on its own gets to its first
+response quickly. With ``gunicorn --preload`` the master loads the app before
+forking, so ``gunicorn.conf.py`` calls ``warm_up`` there instead: the URLconf
+and those dependencies are imported once and every worker inherits them
+without paying for the import or the first-request URLconf load.
+"""
+import time
+from importlib import import_module
+from django.urls import get_resolver
+
+HEAVY_MODULES = (
+    "stripe",
+    "reportlab.pdfgen.canvas",
+    "openpyxl",
+    "numpy",
+    "drf_yasg.views",
+)
+
+def warm_up(heavy=True):
+    """Load the URLconf, and the lazily imported dependencies if ``heavy``; returns seconds taken."""
+    started = time.perf_counter()
+    # Populating the reverse lookup imports every urls and views module.
+    get_resolver().reverse_dict
+    if heavy:
+        for name in HEAVY_MODULES:
+            import_module(name)
+    return time.perf_counter() - started
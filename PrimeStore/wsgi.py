@@ -9,8 +9,12 @@ https://docs.djangoproject.com/en/6.0/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'PrimeStore.settings')
 
 application = get_wsgi_application()
+if settings.SERVE_MEDIA:
+    from PrimeStore.media import MediaFiles
+    application = MediaFiles(application)
\ No newline at end of file
@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-19 17:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_devicetoken'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='devicetoken',
+            index=models.Index(fields=['user', 'device_type'], name='devicetoken_user_type_idx'),
+        ),
+    ]
@@ -25,5 +25,7 @@ class DeviceToken(models.Model):
         default='android'
     )
     created = models.DateTimeField(auto_now_add=True)
+    class Meta:
+        indexes = [models.Index(fields=['user', 'device_type'], name='devicetoken_user_type_idx')]
     def __str__(self):
         return f"{self.user} - {self.device_type}"
\ No newline at end of file
@@ -85,5 +85,5 @@ def profile_view(request):
     return render(request, 'accounts/profile.html')
 @login_required
 def order_history(request):
-    orders = Order.objects.filter(email=request.user.email)
+    orders = Order.objects.filter(email=request.user.email).prefetch_related('items__product')
     return render(request, 'accounts/order_history.html', {'orders': orders})
\ No newline at end of file
@@ -0,0 +1,131 @@
+"""
+``Idempotency-Key`` support for POST endpoints that mobile clients retry.
+
+The first request with a key runs the view and stores its response; repeats
+within the TTL get that response replayed without running the view again.
+A repeat that arrives while the first is still running gets a 409 with
+``Retry-After`` straight away rather than holding a worker. The in-progress
+record is leased for ``IDEMPOTENCY_LEASE`` seconds; if the worker running it
+dies, the next retry after the lease takes the key over and runs the view.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+from .models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+def _ttl():
+    return timedelta(seconds=getattr(settings, "IDEMPOTENCY_KEY_TTL", 24 * 3600))
+def _lease():
+    return timedelta(seconds=getattr(settings, "IDEMPOTENCY_LEASE", 120))
+def request_fingerprint(request):
+    try:
+        body = json.dumps(request.data, sort_keys=True, cls=JSONEncoder)
+    except (TypeError, ValueError):
+        body = repr(request.data)
+    raw = f"{request.method}\n{request.path}\n{body}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+def _claim(request, key, fingerprint):
+    """
+    Insert an in-progress record, or take over one whose lease ran out;
+    otherwise return the existing record.
+    """
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(
+                user=request.user,
+                key=key,
+                method=request.method,
+                path=request.path[:255],
+                fingerprint=fingerprint,
+                locked_at=now,
+                expires_at=now + _ttl(),
+            ), True
+    except IntegrityError:
+        pass
+    record = IdempotencyKey.objects.filter(user=request.user, key=key).first()
+    if record is not None and record.expires_at <= now:
+        IdempotencyKey.objects.filter(pk=record.pk, expires_at__lte=now).delete()
+        return _claim(request, key, fingerprint)
+    if (
+        record is not None
+        and record.status == "in_progress"
+        and record.fingerprint == fingerprint
+        and record.locked_at <= now - _lease()
+    ):
+        # Conditional on the old lease, so only one retry takes it over.
+        if IdempotencyKey.objects.filter(
+            pk=record.pk, status="in_progress", locked_at=record.locked_at
+        ).update(locked_at=now):
+            record.locked_at = now
+            return record, True
+        return _claim(request, key, fingerprint)
+    return record, False
+def _replay(record):
+    response = Response(record.response_body, status=record.response_status)
+    response["Idempotent-Replayed"] = "true"
+    return response
+def _in_progress(record):
+    retry_after = (record.locked_at + _lease() - timezone.now()).total_seconds()
+    response = Response(
+        {"detail": "A request with this Idempotency-Key is still being processed"},
+        status=status.HTTP_409_CONFLICT,
+    )
+    response["Retry-After"] = str(max(1, min(int(retry_after) + 1, 5)))
+    return response
+def idempotent(view_method):
+    """Decorate an APIView handler (e.g. ``post``) to honour ``Idempotency-Key``."""
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {"detail": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        fingerprint = request_fingerprint(request)
+        record, created = _claim(request, key, fingerprint)
+        if record is None:
+            # The original request failed and released the key; run again.
+            return wrapper(self, request, *args, **kwargs)
+        if not created:
+            if record.fingerprint != fingerprint:
+                return Response(
+                    {"detail": f"{HEADER} was already used for a different request"},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            if record.status == "in_progress":
+                return _in_progress(record)
+            return _replay(record)
+        # Only the current lease holder stores or releases the record.
+        held = IdempotencyKey.objects.filter(pk=record.pk, locked_at=record.locked_at)
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except Exception:
+            held.delete()
+            raise
+        if response.status_code >= 500:
+            held.delete()
+            return response
+        held.update(
+            status="completed",
+            response_status=response.status_code,
+            response_body=json.loads(json.dumps(response.data, cls=JSONEncoder)),
+        )
+        return response
+    return wrapper
+def purge_expired_keys():
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
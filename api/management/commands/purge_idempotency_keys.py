@@ -0,0 +1,7 @@
+from django.core.management.base import BaseCommand
+from api.idempotency import purge_expired_keys
+
+class Command(BaseCommand):
+    help = "Delete stored Idempotency-Key responses past their TTL."
+    def handle(self, *args, **options):
+        self.stdout.write(f"Deleted {purge_expired_keys()} expired key(s).")
@@ -1,3 +1,31 @@
 from django.db import models
+from django.conf import settings
+from django.utils import timezone
 
-# Create your models here.
+class IdempotencyKey(models.Model):
+    STATUS_CHOICES = [
+        ("in_progress", "In progress"),
+        ("completed", "Completed"),
+    ]
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name='idempotency_keys',
+        on_delete=models.CASCADE
+    )
+    key = models.CharField(max_length=255)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="in_progress")
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True)
+    # Start of the current holder's lease; see IDEMPOTENCY_LEASE.
+    locked_at = models.DateTimeField(default=timezone.now)
+    created = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key_per_user'),
+        ]
+    def __str__(self):
+        return f"{self.user_id}:{self.key}"
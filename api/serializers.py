@@ -46,7 +46,25 @@ class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ['id', 'name', 'slug']
-class ProductSerializer(serializers.ModelSerializer):
+def requested_fields(request):
+    """The names in ``?fields=a,b``, or ``None`` when the parameter is absent."""
+    value = request.query_params.get("fields") if request is not None else None
+    if not value:
+        return None
+    return {name.strip() for name in value.split(",") if name.strip()}
+class SparseFieldsMixin:
+    """Drops the fields a request's ``?fields=`` leaves out; naming an unknown field is a 400."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = requested_fields(self.context.get("request"))
+        if fields is None:
+            return
+        unknown = fields - set(self.fields)
+        if unknown:
+            raise serializers.ValidationError({"fields": f"Unknown field(s): {', '.join(sorted(unknown))}"})
+        for name in set(self.fields) - fields:
+            self.fields.pop(name)
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     category = CategorySerializer()
     class Meta:
         model = Product
@@ -66,6 +84,14 @@ class OrderSerializer(serializers.ModelSerializer):
             'id', 'email', 'address', 'city',
             'postal_code', 'created', 'paid', 'items'
         ]
+class OrderStatusTransitionSerializer(serializers.Serializer):
+    order_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=10000
+    )
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES)
+    note = serializers.CharField(max_length=255, required=False, allow_blank=True, default="")
 class RegisterSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
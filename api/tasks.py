@@ -0,0 +1,7 @@
+from datetime import timedelta
+from jobs.queue import task
+from .idempotency import purge_expired_keys
+
+@task("api.purge_idempotency_keys", priority=-10, every=timedelta(hours=6))
+def purge_idempotency_keys():
+    purge_expired_keys()
@@ -1,3 +1,109 @@
+from decimal import Decimal
+from django.contrib.auth.models import User
+from datetime import timedelta
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from PrimeStore.testing import QueryBudgetMixin
+from orders.models import Order, OrderItem
+from api.models import IdempotencyKey
+from store.models import CartItem, Category, Product, Review, Wishlist
 
-# Create your tests here.
+class APIQueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("buyer", "buyer@example.com", "pass")
+        reviewers = [User.objects.create_user(f"reviewer{i}", f"reviewer{i}@example.com", "pass") for i in range(4)]
+        categories = [Category.objects.create(name=f"Category {i}", slug=f"category-{i}") for i in range(3)]
+        cls.products = [
+            Product.objects.create(
+                category=categories[i % 3], name=f"Phone {i}", slug=f"phone-{i}",
+                price=Decimal("100.00"), image="products/phone.jpg", stock=10,
+            )
+            for i in range(9)
+        ]
+        for reviewer in reviewers:
+            Review.objects.create(product=cls.products[0], user=reviewer, rating=5, comment="Great")
+        for product in cls.products[:4]:
+            CartItem.objects.create(user=cls.user, product=product, quantity=2)
+            Wishlist.objects.create(user=cls.user, product=product)
+        for i in range(3):
+            order = Order.objects.create(
+                user=cls.user, first_name="Buyer", last_name="One", email=cls.user.email,
+                address="1 Main St", postal_code="10001", city="Pune",
+            )
+            for product in cls.products[:3]:
+                OrderItem.objects.create(order=order, product=product, price=product.price, quantity=1)
+        cls.order = order
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+    def test_catalogue(self):
+        # The page and its count, with categories joined in.
+        self.assertQueryBudget(2, "/api/products/", client=self.api)
+        self.assertQueryBudget(1, f"/api/products/{self.products[0].pk}/", client=self.api)
+        self.assertQueryBudget(1, "/api/categories/", client=self.api)
+        self.assertQueryBudget(2, "/api/recommendations/popular/", client=self.api)
+    def test_product_list_page_filters_and_fields(self):
+        response = self.api.get("/api/products/", {"category": "category-0", "fields": "id,name", "page_size": 2})
+        self.assertEqual(response.data["count"], 3)
+        self.assertEqual([set(row) for row in response.data["results"]], [{"id", "name"}] * 2)
+        self.assertIsNotNone(response.data["next"])
+        self.assertEqual(self.api.get("/api/products/", {"max_price": "99"}).data["count"], 0)
+        self.assertEqual(self.api.get("/api/products/", {"fields": "id,secret"}).status_code, 400)
+    def test_reviews(self):
+        self.assertQueryBudget(2, f"/api/reviews/product/{self.products[0].pk}/", client=self.api)
+        self.assertQueryBudget(2, f"/api/reviews/summary/{self.products[0].pk}/", client=self.api)
+    def test_cart_and_wishlist(self):
+        self.assertQueryBudget(1, "/api/cart/", client=self.api)
+        self.assertQueryBudget(1, "/api/wishlist/", client=self.api)
+    def test_orders(self):
+        self.assertQueryBudget(2, "/api/orders/history/", client=self.api)
+        self.assertQueryBudget(2, f"/api/orders/{self.order.pk}/timeline/", client=self.api)
+    def test_bulk_status_reports_rejected_ids(self):
+        staff = User.objects.create_user("staff", "staff@example.com", "pass", is_staff=True)
+        self.api.force_authenticate(staff)
+        Order.objects.filter(pk=self.order.pk).update(status="DELIVERED")
+        placed = Order.objects.exclude(pk=self.order.pk).first()
+        response = self.api.post(
+            "/api/orders/status/bulk/", {"order_ids": [placed.pk, self.order.pk, 999999], "status": "PACKED"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["updated"], [placed.pk])
+        self.assertEqual(set(response.data["rejected"]), {str(self.order.pk), "999999"})
+class IdempotencyTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("buyer", "buyer@example.com", "pass")
+        category = Category.objects.create(name="Phones", slug="phones")
+        self.product = Product.objects.create(
+            category=category, name="Phone", slug="phone", price=Decimal("100.00"), stock=10,
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+    def add_to_cart(self):
+        return self.api.post(
+            "/api/cart/add/", {"product_id": self.product.pk, "quantity": 1},
+            format="json", HTTP_IDEMPOTENCY_KEY="retry-1",
+        )
+    def test_replay(self):
+        first = self.add_to_cart()
+        again = self.add_to_cart()
+        self.assertEqual(again.status_code, first.status_code)
+        self.assertEqual(again["Idempotent-Replayed"], "true")
+        self.assertEqual(CartItem.objects.get(user=self.user).quantity, 1)
+    def test_in_progress_conflicts_without_waiting(self):
+        self.add_to_cart()
+        IdempotencyKey.objects.update(status="in_progress", locked_at=timezone.now())
+        response = self.add_to_cart()
+        self.assertEqual(response.status_code, 409)
+        self.assertIn("Retry-After", response)
+    def test_expired_lease_taken_over(self):
+        self.add_to_cart()
+        # The worker running the first request died before storing a response.
+        IdempotencyKey.objects.update(status="in_progress", locked_at=timezone.now() - timedelta(hours=1))
+        response = self.add_to_cart()
+        self.assertLess(response.status_code, 300)
+        self.assertNotIn("Idempotent-Replayed", response)
+        self.assertEqual(IdempotencyKey.objects.get().status, "completed")
+        self.assertEqual(CartItem.objects.get(user=self.user).quantity, 2)
@@ -13,6 +13,10 @@ urlpatterns = [
     path('categories/', views.CategoryListAPI.as_view()),
     path('orders/', views.OrderCreateAPI.as_view()),
     path('orders/history/', views.OrderHistoryAPI.as_view()),
+    path('orders/status/bulk/', views.OrderStatusBulkTransitionAPI.as_view(), name='order_status_bulk'),
+    path('orders/<int:order_id>/timeline/', views.OrderTimelineAPI.as_view(), name='order_timeline'),
+    path('exports/<str:entity>/changes/', views.ChangeFeedAPI.as_view(), name='change_feed'),
+    path('exports/<str:entity>/ack/', views.ChangeFeedAckAPI.as_view(), name='change_feed_ack'),
     path('recommendations/popular/', views.PopularProductsAPI.as_view(), name='popular_products'),
     path('recommendations/product/<int:product_id>/similar/', views.SimilarProductsAPI.as_view(), name='similar_products'),
     path('recommendations/for-you/', views.ForYouRecommendationsAPI.as_view(), name='for_you_recommendations'),
@@ -40,4 +44,5 @@ urlpatterns = [
     path("notifications/token/save/", SaveDeviceTokenAPI.as_view()),
     path("notifications/send/", SendNotificationToUserAPI.as_view()),
     path("notifications/send-all/", SendBroadcastNotificationAPI.as_view()),
+    path("notifications/campaigns/<int:campaign_id>/", views.CampaignStatusAPI.as_view(), name="api_campaign_status"),
 ]
\ No newline at end of file
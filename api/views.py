@@ -1,17 +1,25 @@
 from decimal import Decimal
-import stripe
 from django.conf import settings
 from django.http import HttpResponse
+from django.urls import reverse
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
-from django.db.models import Sum, Count, Avg
+from django.db.models import Sum, Count, Avg, Q
 from rest_framework import generics, status
-from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.permissions import IsAdminUser, IsAuthenticated, IsAuthenticatedOrReadOnly
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from store.filters import filter_products, sort_products
 from store.models import Product, Category, CartItem, Wishlist, Coupon, Review
 from orders.models import Order, OrderItem
+from orders.status import bulk_transition, order_timeline
+from orders.webhooks import ingest_event
+from orders.payments import gateway, PaymentGatewayError, PaymentGatewayUnavailable
 from accounts.models import DeviceToken
+from dashboard.deltas import ENTITIES, changed_rows, decode_cursor, encode_cursor, get_cursor, save_cursor, serialize
+from dashboard.rollups import record_order_placed
+from .idempotency import idempotent
 from .serializers import (
     ProductSerializer,
     CategorySerializer,
@@ -19,20 +27,48 @@ from .serializers import (
     WishlistSerializer,
     RegisterSerializer,
     OrderSerializer,
+    OrderStatusTransitionSerializer,
     ReviewSerializer,
     CouponSerializer,
     ProductMiniSerializer,
+    requested_fields,
 )
-from notifications.utils import send_fcm_notification
+from notifications.dispatch import start_campaign
+from notifications.models import Campaign
 
-stripe.api_key = settings.STRIPE_SECRET_KEY
+class ProductPagination(PageNumberPagination):
+    page_size = 24
+    page_size_query_param = "page_size"
+    max_page_size = 100
+def _product_columns(qs, request):
+    """Load only the columns the requested ``ProductSerializer`` fields need."""
+    fields = requested_fields(request) or set(ProductSerializer.Meta.fields)
+    columns = [name for name in ProductSerializer.Meta.fields if name in fields and name != "category"]
+    if "category" in fields:
+        qs = qs.select_related("category")
+        columns += ["category", "category__name", "category__slug"]
+    return qs.only(*columns) if columns else qs
 class ProductListAPI(generics.ListAPIView):
-    queryset = Product.objects.filter(available=True)
+    """
+    Available products, a page at a time (``?page=``, ``?page_size=`` up to 100),
+    filtered and sorted by the storefront's parameters (``category``, ``brand``,
+    ``min_price``, ``max_price``, ``q``, ``sort``...). ``?fields=id,name,price``
+    returns and loads only those fields.
+    """
+    replica_reads = True
     serializer_class = ProductSerializer
+    pagination_class = ProductPagination
+    def get_queryset(self):
+        params = self.request.query_params
+        qs = filter_products(Product.objects.filter(available=True), params)
+        return _product_columns(sort_products(qs, params.get("sort", "")), self.request)
 class ProductDetailAPI(generics.RetrieveAPIView):
-    queryset = Product.objects.filter(available=True)
+    replica_reads = True
     serializer_class = ProductSerializer
+    def get_queryset(self):
+        return _product_columns(Product.objects.filter(available=True), self.request)
 class CategoryListAPI(generics.ListAPIView):
+    replica_reads = True
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
 class CartListAPI(APIView):
@@ -44,6 +80,7 @@ class CartListAPI(APIView):
         return Response({"items": serializer.data, "total": total})
 class CartAddAPI(APIView):
     permission_classes = [IsAuthenticated]
+    @idempotent
     def post(self, request):
         data = request.data.copy()
         data.setdefault("quantity", 1)
@@ -150,6 +187,7 @@ class RegisterAPI(generics.CreateAPIView):
     serializer_class = RegisterSerializer
 class OrderCreateAPI(generics.CreateAPIView):
     permission_classes = [IsAuthenticated]
+    @idempotent
     def post(self, request, **kwargs):
         items_data = request.data.get("items")
         if not items_data:
@@ -187,12 +225,52 @@ class OrderCreateAPI(generics.CreateAPIView):
                     price=product.price,
                     quantity=item["quantity"],
                 )
+        record_order_placed(order)
         return Response({"order_id": order.id}, status=status.HTTP_200_OK)
 class OrderHistoryAPI(generics.ListAPIView):
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
     def get_queryset(self):
-        return Order.objects.filter(email=self.request.user.email)
+        return Order.objects.filter(email=self.request.user.email).prefetch_related("items")
+class OrderStatusBulkTransitionAPI(APIView):
+    permission_classes = [IsAdminUser]
+    def post(self, request):
+        serializer = OrderStatusTransitionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        result = bulk_transition(
+            serializer.validated_data["order_ids"],
+            serializer.validated_data["status"],
+            user=request.user,
+            source="api",
+            note=serializer.validated_data["note"],
+        )
+        return Response(
+            {
+                "status": serializer.validated_data["status"],
+                "updated": result["updated"],
+                "rejected": {str(pk): reason for pk, reason in result["rejected"].items()},
+            },
+            status=status.HTTP_200_OK,
+        )
+class OrderTimelineAPI(APIView):
+    permission_classes = [IsAuthenticated]
+    def get(self, request, order_id):
+        orders = Order.objects.all()
+        if not request.user.is_staff:
+            orders = orders.filter(user=request.user)
+        try:
+            order = orders.prefetch_related("status_events").get(id=order_id)
+        except Order.DoesNotExist:
+            return Response({"detail": "Order not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(
+            {
+                "order_id": order.id,
+                "status": order.status,
+                "tracking_number": order.tracking_number,
+                "timeline": order_timeline(order),
+            }
+        )
 class AddReviewAPI(APIView):
     permission_classes = [IsAuthenticated]
     def post(self, request, product_id):
@@ -238,15 +316,17 @@ class DeleteReviewAPI(APIView):
         review.delete()
         return Response({"message": "Review deleted"}, status=status.HTTP_200_OK)
 class ProductReviewListAPI(APIView):
+    replica_reads = True
     def get(self, request, product_id):
         try:
             product = Product.objects.get(id=product_id, available=True)
         except Product.DoesNotExist:
             return Response({"detail": "Product not found"}, status=status.HTTP_404_NOT_FOUND)
-        reviews = product.reviews.all()
+        reviews = product.reviews.select_related("user")
         serializer = ReviewSerializer(reviews, many=True)
         return Response(serializer.data)
 class ProductRatingSummaryAPI(APIView):
+    replica_reads = True
     def get(self, request, product_id):
         try:
             product = Product.objects.get(id=product_id, available=True)
@@ -255,11 +335,9 @@ class ProductRatingSummaryAPI(APIView):
         summary = product.reviews.aggregate(
             avg_rating=Avg("rating"),
             total=Count("id"),
+            **{f"stars_{star}": Count("id", filter=Q(rating=star)) for star in [5, 4, 3, 2, 1]},
         )
-        star_counts = {
-            star: product.reviews.filter(rating=star).count()
-            for star in [5, 4, 3, 2, 1]
-        }
+        star_counts = {star: summary[f"stars_{star}"] for star in [5, 4, 3, 2, 1]}
         return Response(
             {
                 "average_rating": summary["avg_rating"] or 0,
@@ -276,6 +354,7 @@ class CheckUserReviewAPI(APIView):
         ).exists()
         return Response({"reviewed": exists})
 class PopularProductsAPI(APIView):
+    replica_reads = True
     permission_classes = [IsAuthenticatedOrReadOnly]
     def get(self, request):
         top_items = (
@@ -290,6 +369,7 @@ class PopularProductsAPI(APIView):
         serializer = ProductMiniSerializer(products_sorted, many=True)
         return Response(serializer.data)
 class SimilarProductsAPI(APIView):
+    replica_reads = True
     permission_classes = [IsAuthenticatedOrReadOnly]
     def get(self, request, product_id):
         try:
@@ -390,6 +470,7 @@ class CouponListAPI(APIView):
         return Response(serializer.data)
 class StripeCreatePaymentIntentAPI(APIView):
     permission_classes = [IsAuthenticated]
+    @idempotent
     def post(self, request):
         order_id = request.data.get("order_id")
         try:
@@ -397,11 +478,22 @@ class StripeCreatePaymentIntentAPI(APIView):
         except Order.DoesNotExist:
             return Response({"detail": "Invalid order id"}, status=status.HTTP_404_NOT_FOUND)
         amount = int(order.get_total_cost() * 100)
-        intent = stripe.PaymentIntent.create(
-            amount=amount,
-            currency="inr",  # or "usd"
-            metadata={"order_id": order.id},
-        )
+        try:
+            intent = gateway.create_payment_intent(
+                idempotency_key=f"order-{order.id}-intent-{amount}",
+                amount=amount,
+                currency="inr",  # or "usd"
+                metadata={"order_id": order.id},
+            )
+        except PaymentGatewayUnavailable:
+            return Response(
+                {"detail": "Online payments are temporarily unavailable", "fallback": "COD"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+        except PaymentGatewayError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_502_BAD_GATEWAY)
+        order.stripe_payment_intent = intent.id
+        order.save(update_fields=["stripe_payment_intent", "updated"])
         return Response(
             {
                 "client_secret": intent.client_secret,
@@ -410,26 +502,22 @@ class StripeCreatePaymentIntentAPI(APIView):
         )
 @csrf_exempt
 def stripe_webhook(request):
-    payload = request.body
-    sig_header = request.headers.get("stripe-signature")
     try:
-        event = stripe.Webhook.construct_event(
-            payload,
-            sig_header,
-            settings.STRIPE_WEBHOOK_SECRET,
-        )
+        ingest_event(request.body, request.headers.get("stripe-signature"))
     except Exception:
         return HttpResponse(status=400)
-    if event["type"] == "payment_intent.succeeded":
-        intent = event["data"]["object"]
-        order_id = intent["metadata"]["order_id"]
-        try:
-            order = Order.objects.get(id=order_id)
-            order.paid = True
-            order.save()
-        except Order.DoesNotExist:
-            pass
     return HttpResponse(status=200)
+def _campaign_data(campaign):
+    return {
+        "campaign_id": campaign.id,
+        "status": campaign.status,
+        "total_tokens": campaign.total_tokens,
+        "sent": campaign.sent_count,
+        "failed": campaign.failed_count,
+        "pruned": campaign.pruned_count,
+        "progress": campaign.progress,
+        "status_url": reverse("api_campaign_status", args=[campaign.id]),
+    }
 class SaveDeviceTokenAPI(APIView):
     permission_classes = [IsAuthenticated]
     def post(self, request):
@@ -460,9 +548,8 @@ class SendNotificationToUserAPI(APIView):
                 {"detail": "User has no device tokens"},
                 status=status.HTTP_404_NOT_FOUND,
             )
-        for t in tokens:
-            send_fcm_notification(t.token, title, body)
-        return Response({"message": "Notification sent"}, status=status.HTTP_200_OK)
+        campaign = start_campaign(title, body, user_id=user_id, requested_by=request.user)
+        return Response(_campaign_data(campaign), status=status.HTTP_202_ACCEPTED)
 class SendBroadcastNotificationAPI(APIView):
     permission_classes = [IsAuthenticated]
     def post(self, request):
@@ -473,12 +560,71 @@ class SendBroadcastNotificationAPI(APIView):
                 {"detail": "title and body are required"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        device_type = request.data.get("device_type", "")
         tokens = DeviceToken.objects.all()
+        if device_type:
+            tokens = tokens.filter(device_type=device_type)
         if not tokens.exists():
             return Response(
                 {"detail": "No device tokens found"},
                 status=status.HTTP_404_NOT_FOUND,
             )
-        for t in tokens:
-            send_fcm_notification(t.token, title, body)
-        return Response({"message": "Broadcast sent"}, status=status.HTTP_200_OK)
\ No newline at end of file
+        campaign = start_campaign(title, body, device_type=device_type, requested_by=request.user)
+        return Response(_campaign_data(campaign), status=status.HTTP_202_ACCEPTED)
+class CampaignStatusAPI(APIView):
+    permission_classes = [IsAuthenticated]
+    def get(self, request, campaign_id):
+        campaign = Campaign.objects.filter(id=campaign_id).first()
+        if campaign is None or not (request.user.is_staff or campaign.requested_by_id == request.user.id):
+            return Response({"detail": "Campaign not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(_campaign_data(campaign))
+class ChangeFeedAPI(APIView):
+    """
+    Rows of ``entity`` changed after the consumer's cursor (or ``cursor``),
+    as NDJSON or CSV (``output``). ``X-Next-Cursor`` is where the next page starts; POST
+    it to the ack endpoint once the page is stored.
+    """
+    permission_classes = [IsAdminUser]
+    def get(self, request, entity):
+        if entity not in ENTITIES:
+            return Response({"detail": "Unknown entity"}, status=status.HTTP_404_NOT_FOUND)
+        consumer = request.query_params.get("consumer")
+        if not consumer:
+            return Response({"detail": "consumer is required"}, status=status.HTTP_400_BAD_REQUEST)
+        # Not "format": DRF reserves that for renderer negotiation.
+        fmt = request.query_params.get("output", "ndjson")
+        if fmt not in ("ndjson", "csv"):
+            return Response({"detail": "output must be ndjson or csv"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            if "cursor" in request.query_params:
+                after_ts, after_pk = decode_cursor(request.query_params["cursor"])
+            else:
+                after_ts, after_pk = get_cursor(consumer, entity)
+            limit = min(max(int(request.query_params.get("limit", 5000)), 1), 50000)
+        except ValueError:
+            return Response({"detail": "Invalid cursor or limit"}, status=status.HTTP_400_BAD_REQUEST)
+        rows = list(changed_rows(entity, after_ts, after_pk, limit=limit))
+        if rows:
+            after_ts, after_pk = rows[-1]["updated"], rows[-1]["id"]
+        content_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+        response = HttpResponse("".join(serialize(entity, rows, fmt)), content_type=content_type)
+        response["X-Next-Cursor"] = encode_cursor(after_ts, after_pk)
+        response["X-Row-Count"] = str(len(rows))
+        response["X-Has-More"] = "true" if len(rows) == limit else "false"
+        return response
+class ChangeFeedAckAPI(APIView):
+    permission_classes = [IsAdminUser]
+    def post(self, request, entity):
+        if entity not in ENTITIES:
+            return Response({"detail": "Unknown entity"}, status=status.HTTP_404_NOT_FOUND)
+        consumer = request.data.get("consumer")
+        if not consumer:
+            return Response({"detail": "consumer is required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            last_ts, last_pk = decode_cursor(request.data.get("cursor"))
+        except ValueError:
+            return Response({"detail": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+        if last_ts is None:
+            return Response({"detail": "cursor is required"}, status=status.HTTP_400_BAD_REQUEST)
+        save_cursor(consumer, entity, last_ts, last_pk)
+        return Response({"consumer": consumer, "entity": entity, "cursor": request.data["cursor"]})
\ No newline at end of file
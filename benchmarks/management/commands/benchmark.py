@@ -0,0 +1,166 @@
+import json
+import platform
+import subprocess
+from pathlib import Path
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from benchmarks.runner import GunicornServer, compare, run_client, run_http
+from benchmarks.scenarios import Fixtures, default_scenarios
+from orders.fake_stripe import StubStripeServer
+from orders.models import Order
+from orders.payments import gateway
+from store.models import Product
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the store's hot endpoints against the current (seeded) database: "
+        "latency percentiles, queries and allocations per request, optionally under HTTP load."
+    )
+    def add_arguments(self, parser):
+        parser.add_argument("--scenario", action="append", help="Only run these scenarios (repeatable).")
+        parser.add_argument("--iterations", type=int, default=50, help="Measured requests per scenario.")
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument("--alloc-iterations", type=int, default=10)
+        parser.add_argument("--http", action="store_true", help="Also load test the GET scenarios over HTTP.")
+        parser.add_argument("--url", help="Server to load test; by default gunicorn is started locally.")
+        parser.add_argument("--workers", type=int, default=4, help="gunicorn workers to start.")
+        parser.add_argument(
+            "--server", choices=["wsgi", "asgi", "both"], default="wsgi",
+            help="gunicorn mode for --http: sync workers, uvicorn workers, or both to compare them.",
+        )
+        parser.add_argument(
+            "--stripe-delay", type=float, default=0.2, help="Seconds the local Stripe stub takes to answer.",
+        )
+        parser.add_argument("--concurrency", type=int, default=4, help="Load driver processes.")
+        parser.add_argument("--requests", type=int, default=50, help="Requests per load driver process.")
+        parser.add_argument("--output", help="Write the results to this JSON file.")
+        parser.add_argument("--baseline", help="Results file to compare against; regressions fail the command.")
+        parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown, e.g. 0.2 for 20%%.")
+    def _meta(self):
+        try:
+            commit = subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=settings.BASE_DIR
+            ).stdout.strip()
+        except OSError:
+            commit = ""
+        return {
+            "created": timezone.now().isoformat(),
+            "commit": commit,
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "products": Product.objects.count(),
+            "orders": Order.objects.count(),
+            "users": User.objects.count(),
+        }
+    def _row(self, name, summary):
+        fields = [f"{name:<24}", f"p50 {summary.get('p50_ms', '-'):>9}", f"p95 {summary.get('p95_ms', '-'):>9}"]
+        if "queries" in summary:
+            fields.append(f"queries {summary['queries']:>3}")
+        if summary.get("alloc_peak_kb") is not None:
+            fields.append(f"alloc {summary['alloc_peak_kb']:>9} KB")
+        if summary.get("response_kb") is not None:
+            fields.append(f"body {summary['response_kb']:>8} KB")
+        if "throughput_rps" in summary:
+            fields.append(f"{summary['throughput_rps']:>8} req/s")
+        if summary.get("errors"):
+            fields.append(self.style.ERROR(f"{summary['errors']} errors"))
+        self.stdout.write("  ".join(fields))
+    def _measure(self, scenarios, fixtures, results, stub_url, options):
+        self.stdout.write(f"Test client, {options['iterations']} requests per scenario (ms):")
+        for scenario in scenarios:
+            summary = run_client(
+                scenario,
+                fixtures.client(scenario),
+                iterations=options["iterations"],
+                warmup=options["warmup"],
+                alloc_iterations=options["alloc_iterations"],
+            )
+            results["client"][scenario.name] = summary
+            self._row(scenario.name, summary)
+        if options["http"]:
+            loaded = [scenario for scenario in scenarios if scenario.method == "get" and not scenario.writes]
+            cookies = {
+                scenario.name: {name: morsel.value for name, morsel in fixtures.client(scenario).cookies.items()}
+                for scenario in loaded
+            }
+            def load(url, mode):
+                self.stdout.write(f"HTTP {url}, {options['concurrency']} processes x {options['requests']} requests (ms):")
+                for scenario in loaded:
+                    summary = run_http(
+                        scenario, url, cookies[scenario.name],
+                        concurrency=options["concurrency"], requests_per_worker=options["requests"],
+                    )
+                    results[mode][scenario.name] = summary
+                    self._row(scenario.name, summary)
+            if options["url"]:
+                load(options["url"], "http")
+                return
+            results["meta"]["gunicorn_workers"] = options["workers"]
+            modes = {"wsgi": ["wsgi"], "asgi": ["asgi"], "both": ["wsgi", "asgi"]}[options["server"]]
+            for mode in modes:
+                asgi = mode == "asgi"
+                self.stdout.write(f"Starting gunicorn with {'uvicorn' if asgi else 'sync'} workers.")
+                try:
+                    with GunicornServer(
+                        workers=options["workers"], env={"STRIPE_API_BASE": stub_url}, asgi=asgi
+                    ) as server:
+                        load(server.url, "http_asgi" if asgi else "http")
+                except RuntimeError as exc:
+                    raise CommandError(exc)
+            if options["server"] == "both":
+                self.stdout.write("Throughput, ASGI vs WSGI:")
+                for name, summary in results["http_asgi"].items():
+                    wsgi_rps = results["http"][name]["throughput_rps"]
+                    ratio = summary["throughput_rps"] / wsgi_rps if wsgi_rps else 0
+                    self.stdout.write(
+                        f"{name:<24}  {wsgi_rps:>8} -> {summary['throughput_rps']:>8} req/s  ({ratio:.2f}x)"
+                    )
+    def handle(self, *args, **options):
+        try:
+            fixtures = Fixtures()
+        except LookupError as exc:
+            raise CommandError(exc)
+        scenarios = default_scenarios(fixtures)
+        if options["scenario"]:
+            unknown = set(options["scenario"]) - {scenario.name for scenario in scenarios}
+            if unknown:
+                raise CommandError(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+            scenarios = [scenario for scenario in scenarios if scenario.name in options["scenario"]]
+        results = {"meta": self._meta(), "client": {}, "http": {}, "http_asgi": {}}
+        results["meta"]["stripe_delay"] = options["stripe_delay"]
+        # Checkout scenarios never reach real Stripe: this process and the
+        # servers it starts talk to a local stub instead.
+        stub = StubStripeServer(("127.0.0.1", 0), delay=options["stripe_delay"])
+        stub.start()
+        gateway.api_base = stub.url
+        try:
+            self._measure(scenarios, fixtures, results, stub.url, options)
+        finally:
+            stub.shutdown()
+            stub.server_close()
+        failing = sorted({
+            f"{mode} {name}" for mode in ("client", "http", "http_asgi")
+            for name, summary in results[mode].items() if summary.get("errors")
+        })
+        if failing:
+            # Timings of error responses would make a misleading baseline.
+            raise CommandError(f"Requests failed in: {', '.join(failing)}; results not saved.")
+        if options["output"]:
+            Path(options["output"]).write_text(json.dumps(results, indent=2))
+            self.stdout.write(f"Saved results to {options['output']}")
+        if options["baseline"]:
+            try:
+                baseline = json.loads(Path(options["baseline"]).read_text())
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Can't read baseline: {exc}")
+            regressions = compare(results, baseline, tolerance=options["tolerance"])
+            for mode, name, metric, old, new in regressions:
+                self.stdout.write(self.style.ERROR(f"{mode} {name}: {metric} {old} -> {new}"))
+            if regressions:
+                raise CommandError(f"{len(regressions)} regression(s) against {options['baseline']}.")
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}."))
@@ -0,0 +1,64 @@
+import json
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from benchmarks.startup import compare, import_profile, time_to_first_response
+
+class Command(BaseCommand):
+    help = (
+        "Measure cold start: Django setup and URLconf import time, import time per module, "
+        "and gunicorn's time to first response. Fails if a lazily imported dependency is "
+        "loaded at startup or a baseline is exceeded."
+    )
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default="/", help="Request to time after starting gunicorn.")
+        parser.add_argument("--runs", type=int, default=3, help="gunicorn starts to take the median of.")
+        parser.add_argument("--workers", type=int, default=1)
+        parser.add_argument("--preload", action="store_true", help="Also time gunicorn --preload with the warm-up.")
+        parser.add_argument("--skip-server", action="store_true", help="Only profile imports.")
+        parser.add_argument("--top", type=int, default=15, help="Slowest modules to print.")
+        parser.add_argument("--output", help="Write the results to this JSON file.")
+        parser.add_argument("--baseline", help="Results file to compare against; regressions fail the command.")
+        parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown, e.g. 0.2 for 20%%.")
+    def handle(self, *args, **options):
+        try:
+            imports = import_profile()
+        except RuntimeError as exc:
+            raise CommandError(exc)
+        results = {"meta": {"created": timezone.now().isoformat()}, "imports": imports, "server": {}}
+        self.stdout.write(f"django.setup() {imports['setup_ms']} ms, URLconf {imports['urlconf_ms']} ms")
+        self.stdout.write("Slowest top-level imports (ms):")
+        for name, ms in list(imports["modules"].items())[:options["top"]]:
+            self.stdout.write(f"  {name:<40} {ms:>8}")
+        if not options["skip_server"]:
+            modes = [("wsgi", False)] + ([("wsgi_preload", True)] if options["preload"] else [])
+            for mode, preload in modes:
+                try:
+                    summary = time_to_first_response(
+                        options["path"], runs=options["runs"], workers=options["workers"], preload=preload
+                    )
+                except RuntimeError as exc:
+                    raise CommandError(exc)
+                results["server"][mode] = summary
+                self.stdout.write(
+                    f"{mode:<14} first response {summary['first_response_ms']} ms "
+                    f"(max {summary['first_response_max_ms']}), then {summary['second_response_ms']} ms"
+                )
+        if options["output"]:
+            Path(options["output"]).write_text(json.dumps(results, indent=2))
+            self.stdout.write(f"Saved results to {options['output']}")
+        baseline = None
+        if options["baseline"]:
+            try:
+                baseline = json.loads(Path(options["baseline"]).read_text())
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Can't read baseline: {exc}")
+        violations = compare(results, baseline, tolerance=options["tolerance"])
+        for section, metric, old, new in violations:
+            if metric == "heavy_loaded":
+                self.stdout.write(self.style.ERROR(f"{new} is imported at startup; import it where it is used."))
+            else:
+                self.stdout.write(self.style.ERROR(f"{section} {metric}: {old} -> {new}"))
+        if violations:
+            raise CommandError(f"{len(violations)} startup budget violation(s).")
+        self.stdout.write(self.style.SUCCESS("Startup within budget."))
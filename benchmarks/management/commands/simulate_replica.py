@@ -0,0 +1,57 @@
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+class Command(BaseCommand):
+    help = (
+        "Simulate asynchronous replication for local testing: copy the SQLite primary into every "
+        "replica in REPLICA_DATABASE_URLS, each copy applied --lag seconds after it was taken."
+    )
+    def add_arguments(self, parser):
+        parser.add_argument("--lag", type=float, default=2.0, help="Seconds a replica trails the primary.")
+        parser.add_argument("--once", action="store_true", help="Copy the primary once, without lag, and exit.")
+    def _path(self, alias):
+        database = settings.DATABASES[alias]
+        if database["ENGINE"] != "django.db.backends.sqlite3":
+            raise CommandError(
+                f"{alias} is not SQLite; for PostgreSQL, point REPLICA_DATABASE_URLS at a streaming "
+                "replica (recovery_min_apply_delay simulates lag)."
+            )
+        return str(database["NAME"])
+    def _copy(self, source, target):
+        src, dst = sqlite3.connect(source), sqlite3.connect(target)
+        try:
+            src.backup(dst)
+        finally:
+            src.close()
+            dst.close()
+    def handle(self, *args, **options):
+        replicas = getattr(settings, "REPLICA_DATABASES", [])
+        if not replicas:
+            raise CommandError("No replicas configured; set REPLICA_DATABASE_URLS.")
+        primary = self._path("default")
+        targets = {alias: self._path(alias) for alias in replicas}
+        if options["once"]:
+            for target in targets.values():
+                self._copy(primary, target)
+            self.stdout.write(f"Copied the primary to {', '.join(targets)}.")
+            return
+        self.stdout.write(f"Replicating to {', '.join(targets)} with {options['lag']}s lag; Ctrl+C to stop.")
+        with tempfile.TemporaryDirectory() as tmp:
+            pending = None
+            try:
+                while True:
+                    started = time.monotonic()
+                    snapshot = Path(tmp) / f"{started}.sqlite3"
+                    self._copy(primary, str(snapshot))
+                    if pending is not None:
+                        for target in targets.values():
+                            self._copy(str(pending), target)
+                        pending.unlink()
+                    pending = snapshot
+                    time.sleep(max(0.0, options["lag"] - (time.monotonic() - started)))
+            except KeyboardInterrupt:
+                pass
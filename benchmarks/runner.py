@@ -0,0 +1,199 @@
+"""
+Latency, query and allocation measurements for the ``benchmark`` command.
+
+``run_client`` drives each scenario in-process through the Django test
+client, which also yields the query count, the response size and the peak
+memory allocated per request (``tracemalloc``, measured in a separate pass so it doesn't skew the
+timings). ``run_http`` fans requests out over several processes against a
+running server, e.g. one started by ``GunicornServer`` in WSGI or ASGI
+(uvicorn worker) mode, and reports sustained requests per second. ``compare`` flags
+scenarios that got slower, ran more queries, or allocated or returned more
+than a baseline results file.
+"""
+import math
+import multiprocessing
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from urllib.parse import urlencode
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+PERCENTILES = (50, 90, 95, 99)
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return None
+    return values[max(0, math.ceil(pct / 100 * len(values)) - 1)]
+def summarize(latencies, errors=0):
+    latencies = sorted(latencies)
+    summary = {"requests": len(latencies), "errors": errors}
+    if latencies:
+        summary.update({f"p{pct}_ms": round(percentile(latencies, pct) * 1000, 3) for pct in PERCENTILES})
+        summary.update(
+            mean_ms=round(statistics.fmean(latencies) * 1000, 3),
+            min_ms=round(latencies[0] * 1000, 3),
+            max_ms=round(latencies[-1] * 1000, 3),
+        )
+    return summary
+def _call(client, scenario):
+    if scenario.method == "get":
+        return client.get(scenario.path, scenario.params)
+    return getattr(client, scenario.method)(scenario.path, scenario.data)
+def _request(client, scenario):
+    if not scenario.writes:
+        return _call(client, scenario)
+    with transaction.atomic():
+        response = _call(client, scenario)
+        transaction.set_rollback(True)
+    return response
+def run_client(scenario, client, iterations=50, warmup=5, alloc_iterations=10):
+    for _ in range(warmup):
+        _request(client, scenario)
+    latencies, queries, errors = [], [], 0
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            response = _request(client, scenario)
+            latencies.append(time.perf_counter() - started)
+        queries.append(len(ctx))
+        errors += response.status_code >= 400
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(alloc_iterations):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            _request(client, scenario)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    summary = summarize(latencies, errors)
+    summary.update(
+        status=response.status_code,
+        queries=int(statistics.median(queries)),
+        max_queries=max(queries),
+        response_kb=None if response.streaming else round(len(response.content) / 1024, 1),
+        alloc_peak_kb=round(statistics.median(peaks) / 1024, 1) if peaks else None,
+    )
+    return summary
+def _http_worker(args):
+    import requests
+    url, cookies, requests_per_worker = args
+    session = requests.Session()
+    session.cookies.update(cookies)
+    latencies, queries, errors = [], [], 0
+    for _ in range(requests_per_worker):
+        started = time.perf_counter()
+        try:
+            response = session.get(url, timeout=60, allow_redirects=False)
+        except requests.RequestException:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+        errors += response.status_code >= 400
+        if "X-Query-Count" in response.headers:
+            queries.append(int(response.headers["X-Query-Count"]))
+    return latencies, queries, errors
+def run_http(scenario, base_url, cookies, concurrency=4, requests_per_worker=50):
+    """Hit ``scenario`` from ``concurrency`` processes; only GETs are load tested."""
+    url = base_url.rstrip("/") + scenario.path
+    if scenario.params:
+        url += "?" + urlencode(scenario.params)
+    with multiprocessing.get_context("spawn").Pool(concurrency) as pool:
+        _http_worker((url, cookies, 2))
+        started = time.perf_counter()
+        results = pool.map(_http_worker, [(url, cookies, requests_per_worker)] * concurrency)
+        elapsed = time.perf_counter() - started
+    latencies = [value for worker in results for value in worker[0]]
+    queries = [value for worker in results for value in worker[1]]
+    summary = summarize(latencies, sum(worker[2] for worker in results))
+    summary.update(concurrency=concurrency, throughput_rps=round(len(latencies) / elapsed, 1))
+    if queries:
+        summary["queries"] = int(statistics.median(queries))
+    return summary
+class GunicornServer:
+    """
+    Run gunicorn on a free local port for the duration of a ``with`` block:
+    ``PrimeStore.wsgi`` with sync workers, or ``PrimeStore.asgi`` with uvicorn
+    workers when ``asgi`` is set. ``preload`` loads the app in the master
+    before forking (see ``gunicorn.conf.py``).
+    """
+    def __init__(self, workers=4, threads=1, env=None, asgi=False, preload=False):
+        self.workers = workers
+        self.threads = threads
+        self.env = env or {}
+        self.asgi = asgi
+        self.preload = preload
+        self.process = None
+    def __enter__(self):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        self.url = f"http://127.0.0.1:{self.port}"
+        if self.asgi:
+            app = ["PrimeStore.asgi:application", "--worker-class", "uvicorn_worker.UvicornWorker"]
+        else:
+            app = ["PrimeStore.wsgi:application", "--threads", str(self.threads)]
+        if self.preload:
+            app.append("--preload")
+        self.process = subprocess.Popen(
+            [
+                sys.executable, "-m", "gunicorn", *app,
+                "--bind", f"127.0.0.1:{self.port}",
+                "--workers", str(self.workers),
+                "--log-level", "warning",
+            ],
+            env={**os.environ, **self.env},
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"gunicorn exited with status {self.process.returncode}")
+            try:
+                socket.create_connection(("127.0.0.1", self.port), timeout=1).close()
+                return self
+            except OSError:
+                time.sleep(0.2)
+        self.__exit__()
+        raise RuntimeError("gunicorn did not start listening within 30s")
+    def __exit__(self, *exc):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+def compare(results, baseline, tolerance=0.2):
+    """
+    Regressions of ``results`` against ``baseline``: latency percentiles or
+    allocation or response size more than ``tolerance`` above the baseline,
+    any extra query or error, or a different response status.
+    Returns a list of (mode, scenario, metric, baseline value, new value).
+    """
+    regressions = []
+    for mode in ("client", "http", "http_asgi"):
+        for name, current in results.get(mode, {}).items():
+            previous = baseline.get(mode, {}).get(name)
+            if not previous:
+                continue
+            for metric in ("p50_ms", "p95_ms", "alloc_peak_kb", "response_kb"):
+                old, new = previous.get(metric), current.get(metric)
+                if old and new is not None and new > old * (1 + tolerance):
+                    regressions.append((mode, name, metric, old, new))
+            old, new = previous.get("queries"), current.get("queries")
+            if old is not None and new is not None and new > old:
+                regressions.append((mode, name, "queries", old, new))
+            # A scenario that starts failing usually gets faster.
+            old, new = previous.get("errors", 0), current.get("errors", 0)
+            if new > old:
+                regressions.append((mode, name, "errors", old, new))
+            old, new = previous.get("status"), current.get("status")
+            if old is not None and new is not None and new != old:
+                regressions.append((mode, name, "status", old, new))
+    return regressions
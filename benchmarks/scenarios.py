@@ -0,0 +1,72 @@
+from django.contrib.auth.models import User
+from django.test import Client
+from store.cart import Cart
+from store.models import Product
+
+class Scenario:
+    """One benchmarked request. ``writes`` requests are rolled back after each run."""
+    def __init__(self, name, path, method="get", params=None, data=None, user=None, cart=False, writes=False):
+        self.name = name
+        self.path = path
+        self.method = method
+        self.params = params or {}
+        self.data = data or {}
+        self.user = user
+        self.cart = cart
+        self.writes = writes
+class Fixtures:
+    """The users, cart and search term the scenarios run with, taken from the seeded data."""
+    STAFF_USERNAME = "benchmark-staff"
+    def __init__(self):
+        self.customer = (
+            User.objects.filter(is_active=True, is_staff=False, addresses__isnull=False)
+            .order_by("id").first()
+        )
+        if self.customer is None:
+            raise LookupError("No customer with an address; seed the database with manage.py seed_store first.")
+        self.address = self.customer.addresses.order_by("-is_default", "id").first()
+        self.staff, _ = User.objects.get_or_create(
+            username=self.STAFF_USERNAME, defaults={"is_staff": True, "email": "benchmark@example.com"}
+        )
+        self.cart_products = list(
+            Product.objects.filter(available=True, stock__gte=10).order_by("-sales_count", "id")[:3]
+        )
+        popular = self.cart_products[0].name if self.cart_products else "phone"
+        self.brand = self.cart_products[0].brand if self.cart_products else ""
+        self.search_term = popular.split()[0][:4].lower()
+    def client(self, scenario):
+        """A test client logged in and with a cart as ``scenario`` needs."""
+        # The test client's default "testserver" host isn't in ALLOWED_HOSTS.
+        client = Client(SERVER_NAME="localhost")
+        user = {"customer": self.customer, "staff": self.staff}.get(scenario.user)
+        if user is not None:
+            client.force_login(user)
+        if scenario.cart:
+            session = client.session
+            session[Cart.SESSION_KEY] = {
+                str(product.pk): {"quantity": 1, "price": str(product.price)} for product in self.cart_products
+            }
+            session.save()
+        return client
+def default_scenarios(fixtures):
+    return [
+        Scenario("product_list", "/"),
+        Scenario(
+            "product_list_filtered", "/",
+            params={"q": fixtures.search_term, "sort": "rating", "in_stock": "1", "page": "2"},
+        ),
+        Scenario("search_suggest", "/search/suggest/", params={"q": fixtures.search_term}),
+        Scenario("cart_summary", "/cart/summary/", user="customer", cart=True),
+        Scenario("stripe_checkout", "/pay/", user="customer", cart=True),
+        Scenario(
+            "order_create", "/orders/create/", method="post",
+            data={"selected_address": fixtures.address.pk, "payment_method": "COD"},
+            user="customer", cart=True, writes=True,
+        ),
+        Scenario("product_list_api", "/api/products/"),
+        Scenario(
+            "product_list_api_sparse", "/api/products/",
+            params={"fields": "id,name,price,category", "brand": fixtures.brand, "sort": "low_price"},
+        ),
+        Scenario("dashboard", "/dashboard/", user="staff"),
+    ]
@@ -0,0 +1,105 @@
+"""
+Cold-start measurements for the ``benchmark_startup`` command.
+
+``import_profile`` boots Django in a fresh interpreter under
+``python -X importtime`` and reports how long ``django.setup()`` and the
+URLconf take, the cumulative import time of each top-level module, and which
+of the lazily imported heavy dependencies got loaded anyway.
+``time_to_first_response`` starts gunicorn and times how long it takes until
+the first request is answered, which is what a new instance on scale-out
+waits for. ``compare`` applies the regression budget.
+"""
+import json
+import statistics
+import subprocess
+import sys
+import time
+from django.conf import settings
+from PrimeStore.warmup import HEAVY_MODULES
+from .runner import GunicornServer
+
+PROFILE_SCRIPT = """
+import json, os, time
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "PrimeStore.settings")
+started = time.perf_counter()
+import django
+django.setup()
+setup = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().reverse_dict
+print(json.dumps({"setup": setup - started, "urlconf": time.perf_counter() - setup}))
+"""
+
+def parse_importtime(stderr):
+    """``(name, depth, cumulative seconds)`` for each line of ``-X importtime`` output."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        stripped = name.lstrip(" ")
+        entries.append((stripped.strip(), (len(name) - len(stripped) - 1) // 2, int(cumulative) / 1_000_000))
+    return entries
+def import_profile(min_ms=1.0):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROFILE_SCRIPT],
+        capture_output=True, text=True, cwd=settings.BASE_DIR,
+    )
+    if result.returncode:
+        raise RuntimeError(f"Django failed to start:\n{result.stderr[-2000:]}")
+    phases = json.loads(result.stdout.strip().splitlines()[-1])
+    entries = parse_importtime(result.stderr)
+    loaded = {name for name, _, _ in entries}
+    modules = {
+        name: round(seconds * 1000, 1)
+        for name, depth, seconds in entries
+        if depth == 0 and seconds * 1000 >= min_ms
+    }
+    return {
+        "setup_ms": round(phases["setup"] * 1000, 1),
+        "urlconf_ms": round(phases["urlconf"] * 1000, 1),
+        "modules": dict(sorted(modules.items(), key=lambda item: -item[1])),
+        "heavy_loaded": [name for name in HEAVY_MODULES if name in loaded],
+    }
+def time_to_first_response(path="/", runs=3, workers=1, preload=False, timeout=60):
+    """Median seconds from starting gunicorn to the first answered request, and the second request's latency."""
+    import requests
+    first, second = [], []
+    for _ in range(runs):
+        started = time.perf_counter()
+        with GunicornServer(workers=workers, preload=preload) as server:
+            response = requests.get(server.url + path, timeout=timeout, allow_redirects=False)
+            first.append(time.perf_counter() - started)
+            if response.status_code >= 500:
+                raise RuntimeError(f"{path} answered {response.status_code}")
+            again = time.perf_counter()
+            requests.get(server.url + path, timeout=timeout, allow_redirects=False)
+            second.append(time.perf_counter() - again)
+    return {
+        "runs": runs,
+        "first_response_ms": round(statistics.median(first) * 1000, 1),
+        "first_response_max_ms": round(max(first) * 1000, 1),
+        "second_response_ms": round(statistics.median(second) * 1000, 1),
+    }
+def compare(results, baseline, tolerance=0.2):
+    """
+    Budget violations of ``results``: any heavy module imported at startup,
+    or setup, URLconf or first-response time more than ``tolerance`` above
+    ``baseline`` (when given). Returns (section, metric, allowed, actual) tuples.
+    """
+    violations = [("imports", "heavy_loaded", [], name) for name in results["imports"]["heavy_loaded"]]
+    if not baseline:
+        return violations
+    checks = [("imports", "setup_ms"), ("imports", "urlconf_ms")]
+    checks += [(mode, "first_response_ms") for mode in results.get("server", {})]
+    for section, metric in checks:
+        if section == "imports":
+            old, new = baseline.get("imports", {}).get(metric), results["imports"][metric]
+        else:
+            old = baseline.get("server", {}).get(section, {}).get(metric)
+            new = results["server"][section][metric]
+        if old and new > old * (1 + tolerance):
+            violations.append((section, metric, old, new))
+    return violations
@@ -1,3 +1,27 @@
 from django.contrib import admin
+from .models import CustomerFirstOrder, DailyProductSales, DailySales, ExportJob, StockAlert
 
-# Register your models here.
+@admin.register(DailySales)
+class DailySalesAdmin(admin.ModelAdmin):
+    list_display = ['date', 'orders', 'paid_orders', 'items_sold', 'gross_revenue', 'paid_revenue', 'new_customers']
+    date_hierarchy = 'date'
+@admin.register(DailyProductSales)
+class DailyProductSalesAdmin(admin.ModelAdmin):
+    list_display = ['date', 'product', 'quantity', 'revenue']
+    list_select_related = ['product']
+    date_hierarchy = 'date'
+@admin.register(CustomerFirstOrder)
+class CustomerFirstOrderAdmin(admin.ModelAdmin):
+    list_display = ['email', 'first_order_date', 'last_order_date', 'order_count']
+    search_fields = ['email']
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'status', 'processed_rows', 'total_rows', 'requested_by', 'created', 'finished']
+    list_filter = ['kind', 'status']
+    readonly_fields = ['processed_rows', 'total_rows', 'started', 'finished', 'error']
+@admin.register(StockAlert)
+class StockAlertAdmin(admin.ModelAdmin):
+    list_display = ['product', 'kind', 'stock', 'previous_stock', 'threshold', 'created', 'digested_at']
+    list_filter = ['kind', 'created']
+    list_select_related = ['product']
+    raw_id_fields = ['product']
\ No newline at end of file
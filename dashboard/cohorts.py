@@ -0,0 +1,175 @@
+"""
+Customer cohort analytics over a columnar order snapshot.
+
+``write_snapshot`` dumps one row per order into ``.npy`` column files
+(customer number, local order day, order value, paid flag) under
+``ANALYTICS_SNAPSHOT_DIR``; ``load_snapshot`` memory-maps the latest one and
+``cohort_report`` computes retention, repeat rate, inter-purchase time and
+lifetime value with vectorized NumPy operations. Emails are replaced by
+customer numbers, so snapshots hold no contact details. NumPy is imported by
+the functions that use it, so loading the dashboard doesn't pay for it.
+"""
+import json
+import os
+import shutil
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+from django.conf import settings
+from django.db.models import DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from orders.models import Order
+
+COLUMNS = {
+    "customer": "int32",
+    "day": "int32",
+    "value": "float64",
+    "paid": "bool",
+}
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+LATEST = "LATEST"
+KEEP_SNAPSHOTS = 2
+CHUNK_SIZE = 5000
+
+def snapshot_root():
+    return Path(getattr(settings, "ANALYTICS_SNAPSHOT_DIR", Path(settings.BASE_DIR) / "var" / "analytics"))
+def write_snapshot(root=None):
+    """Write a new snapshot of all orders and point ``LATEST`` at it."""
+    import numpy as np
+    root = Path(root or snapshot_root())
+    root.mkdir(parents=True, exist_ok=True)
+    orders = Order.objects.exclude(email="")
+    max_id = orders.order_by("-id").values_list("id", flat=True).first() or 0
+    orders = orders.filter(id__lte=max_id)
+    count = orders.count()
+    columns = {name: np.empty(count, dtype=dtype) for name, dtype in COLUMNS.items()}
+    customers = {}
+    rows = (
+        orders.annotate(
+            total=Coalesce(
+                Sum(F("items__price") * F("items__quantity"), output_field=DecimalField()),
+                Value(Decimal("0")),
+                output_field=DecimalField(),
+            ) - F("discount")
+        )
+        .order_by("id")
+        .values_list("email", "created", "total", "paid")
+    )
+    n = 0
+    for email, created, total, paid in rows.iterator(chunk_size=CHUNK_SIZE):
+        if n == count:
+            break
+        columns["customer"][n] = customers.setdefault(email.lower(), len(customers))
+        columns["day"][n] = timezone.localdate(created).toordinal() - EPOCH_ORDINAL
+        columns["value"][n] = float(total)
+        columns["paid"][n] = paid
+        n += 1
+    stamp = timezone.now().strftime("%Y%m%dT%H%M%S%f")
+    target = root / stamp
+    tmp = root / f".{stamp}.tmp"
+    tmp.mkdir()
+    for name, data in columns.items():
+        np.save(tmp / f"{name}.npy", data[:n])
+    meta = {"created": timezone.now().isoformat(), "orders": n, "customers": len(customers)}
+    (tmp / "meta.json").write_text(json.dumps(meta))
+    os.replace(tmp, target)
+    pointer = root / f".{LATEST}.tmp"
+    pointer.write_text(stamp)
+    os.replace(pointer, root / LATEST)
+    for old in sorted(p for p in root.iterdir() if p.is_dir() and not p.name.startswith("."))[:-KEEP_SNAPSHOTS]:
+        shutil.rmtree(old, ignore_errors=True)
+    return target, meta
+def load_snapshot(root=None):
+    """Memory-map the latest snapshot; returns ``(columns, meta)`` or ``None``."""
+    import numpy as np
+    root = Path(root or snapshot_root())
+    try:
+        path = root / (root / LATEST).read_text().strip()
+        meta = json.loads((path / "meta.json").read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+    columns = {name: np.load(path / f"{name}.npy", mmap_mode="r") for name in COLUMNS}
+    return columns, meta
+def _month_index(days):
+    import numpy as np
+    return days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+def _month_label(index):
+    import numpy as np
+    return np.datetime64(int(index), "M").astype(object).strftime("%b %Y")
+def cohort_report(columns, max_months=12, max_cohorts=24):
+    """
+    Monthly acquisition cohorts with retention and cumulative revenue per
+    customer by months since first order, plus repeat rate, inter-purchase
+    days and lifetime value across all customers.
+    """
+    import numpy as np
+    customer = np.asarray(columns["customer"])
+    day = np.asarray(columns["day"])
+    value = np.where(columns["paid"], columns["value"], 0.0)
+    if customer.size == 0:
+        return {"customers": 0, "orders": 0, "cohorts": []}
+    order = np.lexsort((day, customer))
+    customer, day, value = customer[order], day[order], value[order]
+    n_customers = int(customer.max()) + 1
+    starts = np.flatnonzero(np.r_[True, customer[1:] != customer[:-1]])
+    present = customer[starts]
+    first_day = np.zeros(n_customers, dtype=np.int64)
+    first_day[present] = day[starts]
+    orders_per_customer = np.bincount(customer, minlength=n_customers)[present]
+    revenue_per_customer = np.bincount(customer, weights=value, minlength=n_customers)[present]
+    cohort_of_customer = np.zeros(n_customers, dtype=np.int64)
+    cohort_of_customer[present] = _month_index(first_day[present])
+    offset = _month_index(day) - cohort_of_customer[customer]
+    in_window = offset <= max_months
+    cohorts, cohort_pos = np.unique(cohort_of_customer[present], return_inverse=True)
+    pos_of_customer = np.zeros(n_customers, dtype=np.int64)
+    pos_of_customer[present] = cohort_pos
+    sizes = np.bincount(cohort_pos, minlength=cohorts.size)
+    width = max_months + 1
+    # Count each customer once per (cohort, month offset) they ordered in.
+    active_keys = np.unique(customer[in_window].astype(np.int64) * width + offset[in_window])
+    active_cells = pos_of_customer[active_keys // width] * width + active_keys % width
+    active = np.bincount(active_cells, minlength=cohorts.size * width).reshape(cohorts.size, width)
+    revenue_cells = pos_of_customer[customer[in_window]] * width + offset[in_window]
+    revenue = np.bincount(
+        revenue_cells, weights=value[in_window], minlength=cohorts.size * width
+    ).reshape(cohorts.size, width)
+    ltv_curve = np.cumsum(revenue, axis=1) / sizes[:, None]
+    # Months a cohort hasn't reached yet are reported as null, not 0%.
+    current = np.datetime64(timezone.localdate(), "M").astype(np.int64)
+    observed = (current - cohorts)[:, None] >= np.arange(width)[None, :]
+    repeat = orders_per_customer > 1
+    gaps = np.diff(day)[customer[1:] == customer[:-1]]
+    total_orders = int(customer.size)
+    paid_orders = int(np.count_nonzero(columns["paid"]))
+    total_revenue = float(value.sum())
+    return {
+        "customers": int(present.size),
+        "orders": total_orders,
+        "repeat_rate": float(repeat.mean()),
+        "orders_per_customer": float(orders_per_customer.mean()),
+        "average_order_value": total_revenue / paid_orders if paid_orders else 0.0,
+        "lifetime_value": float(revenue_per_customer.mean()),
+        "lifetime_value_repeat": float(revenue_per_customer[repeat].mean()) if repeat.any() else 0.0,
+        "inter_purchase_days": {
+            "mean": float(gaps.mean()) if gaps.size else None,
+            "median": float(np.median(gaps)) if gaps.size else None,
+            "p90": float(np.percentile(gaps, 90)) if gaps.size else None,
+        },
+        "cohorts": [
+            {
+                "month": _month_label(cohorts[i]),
+                "customers": int(sizes[i]),
+                "retention": [
+                    round(float(active[i, m]) / int(sizes[i]), 4) if observed[i, m] else None
+                    for m in range(width)
+                ],
+                "ltv": [
+                    round(float(ltv_curve[i, m]), 2) if observed[i, m] else None
+                    for m in range(width)
+                ],
+            }
+            for i in range(max(0, cohorts.size - max_cohorts), cohorts.size)
+        ],
+    }
@@ -0,0 +1,192 @@
+import csv
+import logging
+import os
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from pathlib import Path
+from django.conf import settings
+from django.db.models import DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from jobs.queue import enqueue
+from PrimeStore.replicas import use_replica
+from orders.models import Order, OrderItem
+from .models import ExportJob
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 2000
+
+ORDER_HEADER = ["ID", "Customer Email", "Total Cost", "Paid", "Created"]
+ORDER_ITEM_HEADER = ["Order ID", "Product", "Price", "Quantity", "Subtotal"]
+
+class Echo:
+    """File-like object whose write() hands the row back to the caller."""
+    def write(self, value):
+        return value
+def _order_item_filters(filters):
+    return {f"order__{lookup}": value for lookup, value in filters.items()}
+def export_filters(params):
+    """
+    Turn ``start``/``end`` (ISO dates, inclusive), ``status`` and ``paid``
+    query parameters into ``Order`` lookups. Raises ``ValueError``.
+    """
+    filters = {}
+    tz = timezone.get_current_timezone()
+    if params.get("start"):
+        start = date.fromisoformat(params["start"])
+        filters["created__gte"] = datetime.combine(start, time.min, tzinfo=tz)
+    if params.get("end"):
+        end = date.fromisoformat(params["end"]) + timedelta(days=1)
+        filters["created__lt"] = datetime.combine(end, time.min, tzinfo=tz)
+    if params.get("status"):
+        statuses = params["status"].split(",")
+        valid = dict(Order.STATUS_CHOICES)
+        if any(status not in valid for status in statuses):
+            raise ValueError("Unknown status")
+        filters["status__in"] = statuses
+    if params.get("paid"):
+        if params["paid"] not in ("true", "false"):
+            raise ValueError("paid must be true or false")
+        filters["paid"] = params["paid"] == "true"
+    return filters
+def _chunks(rows, key):
+    """
+    Page through ``rows`` (a ``values_list`` ending in its ``key`` fields) by
+    keyset, one short query per chunk. Unlike ``.iterator()`` no read stays
+    open between chunks, so a job can record progress while it reads.
+    """
+    after = None
+    while True:
+        page = rows
+        if after is not None:
+            page = page.filter(keyset_after(key, after))
+        page = list(page.order_by(*key)[:CHUNK_SIZE])
+        yield from page
+        if len(page) < CHUNK_SIZE:
+            return
+        after = page[-1][-len(key):]
+def keyset_after(key, values):
+    """``Q`` for rows ordered strictly after ``values`` on the ``key`` fields."""
+    condition = Q(**{f"{key[-1]}__gt": values[-1]})
+    for field, value in zip(reversed(key[:-1]), reversed(values[:-1])):
+        condition = Q(**{f"{field}__gt": value}) | (Q(**{field: value}) & condition)
+    return condition
+def order_rows(filters):
+    orders = (
+        Order.objects.filter(**filters)
+        .annotate(
+            total_cost=Coalesce(
+                Sum(F("items__price") * F("items__quantity"), output_field=DecimalField()),
+                Value(Decimal("0")),
+                output_field=DecimalField(),
+            )
+        )
+        .values_list("email", "total_cost", "paid", "created", "id")
+    )
+    for email, total_cost, paid, created, pk in _chunks(orders, ["id"]):
+        yield [pk, email, float(total_cost), paid, created]
+def order_item_rows(filters):
+    items = (
+        OrderItem.objects.filter(**_order_item_filters(filters))
+        .values_list("product__name", "price", "quantity", "order_id", "id")
+    )
+    for product_name, price, quantity, order_id, _ in _chunks(items, ["order_id", "id"]):
+        yield [order_id, product_name, float(price), quantity, float(price * quantity)]
+def iter_csv(header, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+EXPORTS = {
+    "orders": {
+        "title": "Orders",
+        "header": ORDER_HEADER,
+        "rows": order_rows,
+        "count": lambda filters: Order.objects.filter(**filters).count(),
+    },
+    "order_items": {
+        "title": "Order Items",
+        "header": ORDER_ITEM_HEADER,
+        "rows": order_item_rows,
+        "count": lambda filters: OrderItem.objects.filter(**_order_item_filters(filters)).count(),
+    },
+}
+EXPORT_DIR = "exports"
+PROGRESS_EVERY = CHUNK_SIZE
+
+def serialize_filters(filters):
+    """``export_filters`` output as JSON for ``ExportJob.filters``."""
+    return {
+        lookup: value.isoformat() if isinstance(value, datetime) else value
+        for lookup, value in filters.items()
+    }
+def deserialize_filters(data):
+    return {
+        lookup: datetime.fromisoformat(value) if lookup.startswith("created__") else value
+        for lookup, value in data.items()
+    }
+def _xlsx_value(value):
+    if isinstance(value, datetime):
+        return timezone.localtime(value).strftime("%Y-%m-%d %H:%M")
+    return value
+def write_xlsx(job):
+    """
+    Write the job's rows to ``MEDIA_ROOT/exports/<id>/`` with a write-only
+    workbook, recording progress on the job as it goes.
+    """
+    export = EXPORTS[job.kind]
+    filters = deserialize_filters(job.filters)
+    total = export["count"](filters)
+    ExportJob.objects.filter(pk=job.pk).update(total_rows=total)
+    import openpyxl
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(export["title"])
+    ws.append(export["header"])
+    processed = 0
+    for row in export["rows"](filters):
+        ws.append([_xlsx_value(value) for value in row])
+        processed += 1
+        if processed % PROGRESS_EVERY == 0:
+            ExportJob.objects.filter(pk=job.pk).update(processed_rows=processed)
+    name = f"{EXPORT_DIR}/{job.id}/{job.kind}_{timezone.localdate():%Y%m%d}.xlsx"
+    path = Path(settings.MEDIA_ROOT) / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    wb.save(tmp_path)
+    os.replace(tmp_path, path)
+    return name, processed
+def run_export_job(job_id):
+    """Claim a pending job and run it; returns the job's final status."""
+    claimed = ExportJob.objects.filter(pk=job_id, status="pending").update(
+        status="running", started=timezone.now()
+    )
+    if not claimed:
+        return None
+    job = ExportJob.objects.get(pk=job_id)
+    try:
+        with use_replica():
+            name, processed = write_xlsx(job)
+    except Exception as exc:
+        logger.exception("Export job %s failed", job_id)
+        ExportJob.objects.filter(pk=job_id).update(
+            status="failed", error=repr(exc), finished=timezone.now()
+        )
+        return "failed"
+    ExportJob.objects.filter(pk=job_id).update(
+        status="completed",
+        file=name,
+        total_rows=processed,
+        processed_rows=processed,
+        finished=timezone.now(),
+    )
+    return "completed"
+def start_export(kind, filters, user=None):
+    """Create an ``ExportJob`` and queue it for the background worker."""
+    job = ExportJob.objects.create(
+        kind=kind,
+        filters=serialize_filters(filters),
+        requested_by=user,
+    )
+    enqueue("dashboard.run_export", {"job_id": job.id})
+    return job
@@ -0,0 +1,86 @@
+"""
+Low-stock alerts.
+
+``Product.save`` keeps ``is_low_stock`` in step with the product's effective
+threshold (its own, else its category's, else ``LOW_STOCK_THRESHOLD``), so
+low-stock listings only touch the partial index on flagged rows. Callers that
+change stock pass the old value to ``record_stock_change``, which records a
+``StockAlert`` when the product crosses its threshold; ``send_stock_digest``
+mails pending alerts to staff in one message.
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.mail import send_mail
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+from store.models import Product
+from .models import StockAlert
+
+def _alert_kind(previous, stock, threshold):
+    if previous is None or previous == stock:
+        return None
+    if stock == 0:
+        return "out"
+    if stock <= threshold < previous:
+        return "low"
+    if previous <= threshold < stock:
+        return "restocked"
+    return None
+def record_stock_change(product, previous):
+    """Create a ``StockAlert`` if ``product`` crossed its threshold since ``previous``."""
+    threshold = product.get_low_stock_threshold()
+    kind = _alert_kind(previous, product.stock, threshold)
+    if kind is None:
+        return None
+    return StockAlert.objects.create(
+        product=product,
+        kind=kind,
+        stock=product.stock,
+        previous_stock=previous,
+        threshold=threshold,
+    )
+def low_stock_products():
+    return (
+        Product.objects.filter(is_low_stock=True)
+        .select_related("category")
+        .order_by("stock", "id")
+    )
+def digest_recipients():
+    return settings.STOCK_ALERT_RECIPIENTS or list(
+        User.objects.filter(is_staff=True, is_active=True)
+        .exclude(email="")
+        .values_list("email", flat=True)
+    )
+def send_stock_digest(dry_run=False):
+    """
+    Mail every undigested alert (latest per product) to staff and mark them
+    digested. Returns the number of alerts included.
+    """
+    with transaction.atomic():
+        pending = list(
+            StockAlert.objects.filter(digested_at__isnull=True)
+            .select_for_update(skip_locked=True)
+            .select_related("product")
+            .order_by("created", "id")
+        )
+        if not pending:
+            return 0
+        latest = {}
+        for alert in pending:
+            latest[alert.product_id] = alert
+        alerts = sorted(latest.values(), key=lambda alert: (alert.stock, alert.product.name))
+        if dry_run:
+            return len(pending)
+        recipients = digest_recipients()
+        if recipients:
+            send_mail(
+                f"Stock alerts: {len(alerts)} product(s)",
+                render_to_string("dashboard/stock_digest.txt", {"alerts": alerts}),
+                settings.DEFAULT_FROM_EMAIL,
+                recipients,
+            )
+        StockAlert.objects.filter(pk__in=[alert.pk for alert in pending]).update(
+            digested_at=timezone.now()
+        )
+    return len(pending)
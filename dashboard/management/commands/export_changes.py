@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+from dashboard.deltas import (
+    ENTITIES,
+    changed_rows,
+    decode_cursor,
+    encode_cursor,
+    get_cursor,
+    save_cursor,
+    serialize,
+)
+
+class Command(BaseCommand):
+    help = "Write rows changed since a consumer's cursor as NDJSON or CSV, then advance the cursor."
+    def add_arguments(self, parser):
+        parser.add_argument("entity", choices=sorted(ENTITIES))
+        parser.add_argument("--consumer", required=True, help="Name of the downstream consumer.")
+        parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+        parser.add_argument("--output", help="File to write. Defaults to stdout.")
+        parser.add_argument("--cursor", help="Start from this cursor instead of the stored one.")
+        parser.add_argument("--batch", type=int, default=5000)
+        parser.add_argument("--no-ack", action="store_true", help="Don't advance the stored cursor.")
+    def handle(self, *args, **options):
+        entity, consumer = options["entity"], options["consumer"]
+        if options["cursor"] is not None:
+            try:
+                after_ts, after_pk = decode_cursor(options["cursor"])
+            except ValueError:
+                raise CommandError("Invalid cursor.")
+        else:
+            after_ts, after_pk = get_cursor(consumer, entity)
+        state = {"count": 0, "last": None}
+        def tracked(rows):
+            for row in rows:
+                state["count"] += 1
+                state["last"] = row
+                yield row
+        rows = tracked(changed_rows(entity, after_ts, after_pk, batch_size=options["batch"]))
+        out = open(options["output"], "w", newline="", encoding="utf-8") if options["output"] else self.stdout
+        try:
+            for chunk in serialize(entity, rows, options["format"]):
+                out.write(chunk)
+        finally:
+            if options["output"]:
+                out.close()
+        if state["last"] is not None:
+            after_ts, after_pk = state["last"]["updated"], state["last"]["id"]
+            if not options["no_ack"]:
+                save_cursor(consumer, entity, after_ts, after_pk)
+        self.stderr.write(
+            f"Exported {state['count']} {entity} row(s); cursor {encode_cursor(after_ts, after_pk) or '(start)'}."
+        )
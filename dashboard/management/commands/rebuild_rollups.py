@@ -0,0 +1,24 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from dashboard.rollups import rebuild_rollups
+
+class Command(BaseCommand):
+    help = "Recompute the dashboard sales rollups from orders, or check them for drift."
+    def add_arguments(self, parser):
+        parser.add_argument("--since", help="First day (YYYY-MM-DD) to rebuild. Defaults to all history.")
+        parser.add_argument("--until", help="Last day (YYYY-MM-DD) to rebuild.")
+        parser.add_argument("--check", action="store_true", help="Report mismatched rows without writing.")
+    def handle(self, *args, **options):
+        try:
+            since = date.fromisoformat(options["since"]) if options["since"] else None
+            until = date.fromisoformat(options["until"]) if options["until"] else None
+        except ValueError as exc:
+            raise CommandError(exc)
+        report = rebuild_rollups(since=since, until=until, dry_run=options["check"])
+        summary = ", ".join(f"{table}: {count}" for table, count in report.items())
+        if options["check"]:
+            self.stdout.write(f"Mismatched rows - {summary}")
+            if any(report.values()):
+                raise CommandError("Rollups are out of date; run rebuild_rollups.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt rollups (corrected rows - {summary})."))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from dashboard.inventory import send_stock_digest
+
+class Command(BaseCommand):
+    help = "Email staff a digest of stock alerts raised since the last digest."
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Count pending alerts without sending.")
+    def handle(self, *args, **options):
+        sent = send_stock_digest(dry_run=options["dry_run"])
+        if options["dry_run"]:
+            self.stdout.write(f"{sent} pending stock alert(s).")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Sent a digest of {sent} stock alert(s)."))
\ No newline at end of file
@@ -0,0 +1,28 @@
+# Generated by Django 6.0 on 2026-10-19 17:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0002_export_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('consumer', models.CharField(max_length=100)),
+                ('entity', models.CharField(max_length=50)),
+                ('last_ts', models.DateTimeField(blank=True, null=True)),
+                ('last_pk', models.BigIntegerField(default=0)),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['consumer', 'entity'],
+                'constraints': [models.UniqueConstraint(fields=('consumer', 'entity'), name='unique_export_cursor')],
+            },
+        ),
+    ]
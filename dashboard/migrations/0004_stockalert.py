@@ -0,0 +1,32 @@
+# Generated by Django 6.0 on 2026-10-19 17:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_export_cursor'),
+        ('store', '0016_low_stock_thresholds'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('low', 'Low Stock'), ('out', 'Out of Stock'), ('restocked', 'Restocked')], max_length=20)),
+                ('stock', models.PositiveIntegerField()),
+                ('previous_stock', models.PositiveIntegerField(blank=True, null=True)),
+                ('threshold', models.PositiveIntegerField()),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('digested_at', models.DateTimeField(blank=True, null=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_alerts', to='store.product')),
+            ],
+            options={
+                'ordering': ['-created'],
+                'indexes': [models.Index(condition=models.Q(('digested_at__isnull', True)), fields=['created'], name='stockalert_pending_idx')],
+            },
+        ),
+    ]
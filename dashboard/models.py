@@ -1,3 +1,132 @@
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+class DailySales(models.Model):
+    date = models.DateField(unique=True)
+    orders = models.PositiveIntegerField(default=0)
+    paid_orders = models.PositiveIntegerField(default=0)
+    items_sold = models.PositiveIntegerField(default=0)
+    gross_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    paid_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    new_customers = models.PositiveIntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+    class Meta:
+        ordering = ['date']
+        verbose_name_plural = 'daily sales'
+    def __str__(self):
+        return f"Sales on {self.date}"
+class DailyProductSales(models.Model):
+    date = models.DateField()
+    product = models.ForeignKey(
+        'store.Product',
+        related_name='daily_sales',
+        on_delete=models.CASCADE
+    )
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    class Meta:
+        ordering = ['date']
+        verbose_name_plural = 'daily product sales'
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'product'], name='unique_daily_product_sales'),
+        ]
+    def __str__(self):
+        return f"{self.product_id} on {self.date}"
+class CustomerFirstOrder(models.Model):
+    email = models.EmailField(unique=True)
+    first_order = models.ForeignKey(
+        'orders.Order',
+        related_name='+',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True
+    )
+    first_order_date = models.DateField(db_index=True)
+    last_order_date = models.DateField()
+    order_count = models.PositiveIntegerField(default=0)
+    class Meta:
+        indexes = [models.Index(fields=['-order_count'], name='customer_order_count_idx')]
+    def __str__(self):
+        return f"{self.email} since {self.first_order_date}"
+
+class ExportJob(models.Model):
+    KIND_CHOICES = [
+        ("orders", "Orders"),
+        ("order_items", "Order Items"),
+    ]
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("completed", "Completed"),
+        ("failed", "Failed"),
+    ]
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    filters = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    total_rows = models.PositiveIntegerField(default=0)
+    processed_rows = models.PositiveIntegerField(default=0)
+    file = models.FileField(upload_to="exports/", blank=True)
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name='export_jobs',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True
+    )
+    created = models.DateTimeField(auto_now_add=True)
+    started = models.DateTimeField(null=True, blank=True)
+    finished = models.DateTimeField(null=True, blank=True)
+    class Meta:
+        ordering = ['-created']
+    def __str__(self):
+        return f"{self.get_kind_display()} export #{self.id}"
+    @property
+    def progress(self):
+        if self.status == "completed":
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(99, self.processed_rows * 100 // self.total_rows)
+class ExportCursor(models.Model):
+    """How far a downstream consumer has read an entity's change feed."""
+    consumer = models.CharField(max_length=100)
+    entity = models.CharField(max_length=50)
+    last_ts = models.DateTimeField(null=True, blank=True)
+    last_pk = models.BigIntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+    class Meta:
+        ordering = ['consumer', 'entity']
+        constraints = [
+            models.UniqueConstraint(fields=['consumer', 'entity'], name='unique_export_cursor'),
+        ]
+    def __str__(self):
+        return f"{self.consumer}/{self.entity} at {self.last_ts} #{self.last_pk}"
+class StockAlert(models.Model):
+    KIND_CHOICES = [
+        ("low", "Low Stock"),
+        ("out", "Out of Stock"),
+        ("restocked", "Restocked"),
+    ]
+    product = models.ForeignKey(
+        'store.Product',
+        related_name='stock_alerts',
+        on_delete=models.CASCADE
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    stock = models.PositiveIntegerField()
+    previous_stock = models.PositiveIntegerField(null=True, blank=True)
+    threshold = models.PositiveIntegerField()
+    created = models.DateTimeField(auto_now_add=True)
+    digested_at = models.DateTimeField(null=True, blank=True)
+    class Meta:
+        ordering = ['-created']
+        indexes = [
+            models.Index(
+                fields=['created'],
+                name='stockalert_pending_idx',
+                condition=models.Q(digested_at__isnull=True)
+            ),
+        ]
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.product_id} at {self.stock}"
\ No newline at end of file
@@ -0,0 +1,221 @@
+"""
+Incrementally maintained sales rollups.
+
+Orders and payments bump ``DailySales``, ``DailyProductSales`` and
+``CustomerFirstOrder`` as they happen; ``rebuild_rollups`` recomputes them
+from ``Order``/``OrderItem`` to backfill history or repair drift.
+Days are local dates in ``TIME_ZONE``, matching the dashboard's charts.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, Max, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from orders.models import Order, OrderItem
+from .models import CustomerFirstOrder, DailyProductSales, DailySales
+
+ZERO = Decimal("0.00")
+
+def _increment(model, keys, **deltas):
+    """UPSERT-style ``field = field + delta`` for the row identified by ``keys``."""
+    changes = {field: F(field) + value for field, value in deltas.items()}
+    if model.objects.filter(**keys).update(**changes):
+        return False
+    try:
+        with transaction.atomic():
+            model.objects.create(**keys, **deltas)
+        return True
+    except IntegrityError:
+        model.objects.filter(**keys).update(**changes)
+        return False
+def _record_customer(order, day):
+    """Count the order against its customer; returns True for a first order."""
+    updated = CustomerFirstOrder.objects.filter(email=order.email).update(
+        order_count=F("order_count") + 1, last_order_date=day
+    )
+    if updated:
+        return False
+    try:
+        with transaction.atomic():
+            CustomerFirstOrder.objects.create(
+                email=order.email,
+                first_order_id=order.pk,
+                first_order_date=day,
+                last_order_date=day,
+                order_count=1,
+            )
+        return True
+    except IntegrityError:
+        CustomerFirstOrder.objects.filter(email=order.email).update(
+            order_count=F("order_count") + 1, last_order_date=day
+        )
+        return False
+def _order_day(order):
+    return timezone.localdate(order.created)
+def record_order_placed(order):
+    """Add a newly created order (with its items saved) to the rollups."""
+    day = _order_day(order)
+    per_product = defaultdict(lambda: [0, ZERO])
+    for product_id, price, quantity in order.items.values_list("product_id", "price", "quantity"):
+        per_product[product_id][0] += quantity
+        per_product[product_id][1] += price * quantity
+    with transaction.atomic():
+        new_customer = bool(order.email) and _record_customer(order, day)
+        _increment(
+            DailySales,
+            {"date": day},
+            orders=1,
+            items_sold=sum(qty for qty, _ in per_product.values()),
+            gross_revenue=sum((rev for _, rev in per_product.values()), ZERO),
+            new_customers=1 if new_customer else 0,
+        )
+        for product_id, (quantity, revenue) in per_product.items():
+            _increment(
+                DailyProductSales,
+                {"date": day, "product_id": product_id},
+                quantity=quantity,
+                revenue=revenue,
+            )
+def _record_payment(order, sign):
+    revenue = order.items.aggregate(
+        total=Sum(F("price") * F("quantity"), output_field=DecimalField())
+    )["total"] or ZERO
+    _increment(DailySales, {"date": _order_day(order)}, paid_orders=sign, paid_revenue=sign * revenue)
+def record_order_paid(order):
+    _record_payment(order, 1)
+def record_order_unpaid(order):
+    """Reverse ``record_order_paid``, e.g. after a full refund."""
+    _record_payment(order, -1)
+def _day_range_filter(field, since=None, until=None):
+    tz = timezone.get_current_timezone()
+    q = Q()
+    if since:
+        q &= Q(**{f"{field}__gte": datetime.combine(since, time.min, tzinfo=tz)})
+    if until:
+        q &= Q(**{f"{field}__lt": datetime.combine(until + timedelta(days=1), time.min, tzinfo=tz)})
+    return q
+def compute_customers():
+    rows = (
+        Order.objects.exclude(email="")
+        .values("email")
+        .annotate(
+            first_created=Min("created"),
+            last_created=Max("created"),
+            first_id=Min("id"),
+            order_count=Count("id"),
+        )
+        .order_by()
+    )
+    return {
+        row["email"]: CustomerFirstOrder(
+            email=row["email"],
+            first_order_id=row["first_id"],
+            first_order_date=timezone.localdate(row["first_created"]),
+            last_order_date=timezone.localdate(row["last_created"]),
+            order_count=row["order_count"],
+        )
+        for row in rows.iterator(chunk_size=5000)
+    }
+def compute_daily_sales(customers, since=None, until=None):
+    days = defaultdict(lambda: DailySales(gross_revenue=ZERO, paid_revenue=ZERO))
+    order_rows = (
+        Order.objects.filter(_day_range_filter("created", since, until))
+        .annotate(day=TruncDate("created"))
+        .values("day")
+        .annotate(orders=Count("id"), paid_orders=Count("id", filter=Q(paid=True)))
+        .order_by()
+    )
+    for row in order_rows:
+        days[row["day"]].orders = row["orders"]
+        days[row["day"]].paid_orders = row["paid_orders"]
+    line_total = F("price") * F("quantity")
+    item_rows = (
+        OrderItem.objects.filter(_day_range_filter("order__created", since, until))
+        .annotate(day=TruncDate("order__created"))
+        .values("day")
+        .annotate(
+            items_sold=Sum("quantity"),
+            gross_revenue=Sum(line_total, output_field=DecimalField()),
+            paid_revenue=Sum(line_total, filter=Q(order__paid=True), output_field=DecimalField()),
+        )
+        .order_by()
+    )
+    for row in item_rows:
+        entry = days[row["day"]]
+        entry.items_sold = row["items_sold"] or 0
+        entry.gross_revenue = row["gross_revenue"] or ZERO
+        entry.paid_revenue = row["paid_revenue"] or ZERO
+    for customer in customers.values():
+        day = customer.first_order_date
+        if (since and day < since) or (until and day > until):
+            continue
+        days[day].new_customers += 1
+    for day, entry in days.items():
+        entry.date = day
+    return dict(days)
+def compute_daily_product_sales(since=None, until=None):
+    rows = (
+        OrderItem.objects.filter(_day_range_filter("order__created", since, until))
+        .annotate(day=TruncDate("order__created"))
+        .values("day", "product_id")
+        .annotate(
+            total_quantity=Sum("quantity"),
+            total_revenue=Sum(F("price") * F("quantity"), output_field=DecimalField()),
+        )
+        .order_by()
+    )
+    return {
+        (row["day"], row["product_id"]): DailyProductSales(
+            date=row["day"],
+            product_id=row["product_id"],
+            quantity=row["total_quantity"] or 0,
+            revenue=row["total_revenue"] or ZERO,
+        )
+        for row in rows.iterator(chunk_size=5000)
+    }
+SALES_FIELDS = ("orders", "paid_orders", "items_sold", "gross_revenue", "paid_revenue", "new_customers")
+CUSTOMER_FIELDS = ("first_order_id", "first_order_date", "last_order_date", "order_count")
+
+def _diff(fresh, existing, fields):
+    mismatched = 0
+    for key, row in fresh.items():
+        current = existing.get(key)
+        if current is None or any(getattr(current, f) != getattr(row, f) for f in fields):
+            mismatched += 1
+    return mismatched + sum(1 for key in existing if key not in fresh)
+def rebuild_rollups(since=None, until=None, dry_run=False, batch_size=2000):
+    """
+    Recompute rollups from source tables for the given local-date range
+    (customers are always recomputed in full, since "first order" depends on
+    all history). Returns the number of mismatched rows per table; with
+    ``dry_run`` nothing is written.
+    """
+    customers = compute_customers()
+    sales = compute_daily_sales(customers, since, until)
+    products = compute_daily_product_sales(since, until)
+    day_filter = Q()
+    if since:
+        day_filter &= Q(date__gte=since)
+    if until:
+        day_filter &= Q(date__lte=until)
+    report = {
+        "customers": _diff(customers, {c.email: c for c in CustomerFirstOrder.objects.all()}, CUSTOMER_FIELDS),
+        "daily_sales": _diff(sales, {s.date: s for s in DailySales.objects.filter(day_filter)}, SALES_FIELDS),
+        "daily_product_sales": _diff(
+            products,
+            {(p.date, p.product_id): p for p in DailyProductSales.objects.filter(day_filter)},
+            ("quantity", "revenue"),
+        ),
+    }
+    if dry_run:
+        return report
+    with transaction.atomic():
+        CustomerFirstOrder.objects.all().delete()
+        CustomerFirstOrder.objects.bulk_create(customers.values(), batch_size=batch_size)
+        DailySales.objects.filter(day_filter).delete()
+        DailySales.objects.bulk_create(sales.values(), batch_size=batch_size)
+        DailyProductSales.objects.filter(day_filter).delete()
+        DailyProductSales.objects.bulk_create(products.values(), batch_size=batch_size)
+    return report
@@ -0,0 +1,17 @@
+from datetime import timedelta
+from jobs.queue import task
+from PrimeStore.replicas import use_replica
+from .cohorts import write_snapshot
+from .exports import run_export_job
+from .inventory import send_stock_digest
+
+@task("dashboard.run_export", max_attempts=1)
+def run_export(job_id):
+    run_export_job(job_id)
+@task("dashboard.send_stock_digest", every=timedelta(hours=1))
+def stock_digest():
+    send_stock_digest()
+@task("dashboard.snapshot_orders", priority=-10, every=timedelta(days=1))
+def snapshot_orders():
+    with use_replica():
+        write_snapshot()
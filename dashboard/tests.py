@@ -1,3 +1,226 @@
-from django.test import TestCase
+import csv
+import json
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PrimeStore.testing import QueryBudgetMixin
+from orders.fake_stripe import charge, make_event, payment_intent
+from orders.models import Order, OrderItem
+from orders.webhooks import process_pending_events, store_event
+from store.models import Category, Product
+from . import deltas, exports, widgets
+from .models import DailySales, ExportJob
+from .rollups import rebuild_rollups, record_order_placed
 
-# Create your tests here.
+class DashboardQueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("staff", "staff@example.com", "pass", is_staff=True)
+        category = Category.objects.create(name="Phones", slug="phones")
+        products = [
+            Product.objects.create(
+                category=category, name=f"Phone {i}", slug=f"phone-{i}",
+                price=Decimal("100.00"), image="products/phone.jpg", stock=i,
+            )
+            for i in range(8)
+        ]
+        for i in range(5):
+            order = Order.objects.create(
+                first_name="Buyer", last_name="One", email=f"buyer{i}@example.com",
+                address="1 Main St", postal_code="10001", city="Pune", paid=True,
+            )
+            for product in products[:3]:
+                OrderItem.objects.create(order=order, product=product, price=product.price, quantity=2)
+        for kind in ("orders", "order_items"):
+            ExportJob.objects.create(kind=kind, requested_by=cls.staff)
+    def setUp(self):
+        self.client.force_login(self.staff)
+    def test_dashboard(self):
+        self.assertQueryBudget(8, "/dashboard/")
+    def test_inventory(self):
+        self.assertQueryBudget(5, "/dashboard/inventory/")
+    def test_jobs(self):
+        self.assertQueryBudget(5, "/dashboard/jobs/")
+    def test_export_jobs(self):
+        self.assertQueryBudget(3, "/dashboard/exports/")
+    def test_metrics(self):
+        self.assertQueryBudget(4, "/dashboard/api/metrics/low_stock/")
+        self.assertQueryBudget(4, "/dashboard/api/metrics/sales_by_day/")
+class RollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="Phones", slug="phones")
+        cls.products = [
+            Product.objects.create(
+                category=category, name=f"Phone {i}", slug=f"phone-{i}", price=Decimal("100.00"), stock=10,
+            )
+            for i in range(2)
+        ]
+    def place(self, email, quantity=1):
+        order = Order.objects.create(
+            first_name="Buyer", last_name="One", email=email,
+            address="1 Main St", postal_code="10001", city="Pune",
+        )
+        for product in self.products:
+            OrderItem.objects.create(order=order, product=product, price=product.price, quantity=quantity)
+        record_order_placed(order)
+        return order
+    def deliver(self, *events):
+        for seconds, (event_type, obj) in enumerate(events):
+            store_event(make_event(event_type, obj, created=timezone.now().timestamp() + seconds))
+        process_pending_events()
+    def assertRollupsMatchOrders(self):
+        self.assertEqual(rebuild_rollups(dry_run=True), {"customers": 0, "daily_sales": 0, "daily_product_sales": 0})
+    def test_totals_follow_payment_changes(self):
+        paid = self.place("a@example.com")
+        refunded = self.place("b@example.com", quantity=2)
+        failed = self.place("a@example.com", quantity=3)
+        self.assertRollupsMatchOrders()
+        self.deliver(
+            ("payment_intent.succeeded", payment_intent(paid.pk, 20000)),
+            ("payment_intent.succeeded", payment_intent(refunded.pk, 40000)),
+            ("payment_intent.payment_failed", payment_intent(failed.pk, 60000, status="requires_payment_method")),
+        )
+        self.assertRollupsMatchOrders()
+        self.deliver(("charge.refunded", charge(refunded.pk, 40000, 40000)))
+        self.assertRollupsMatchOrders()
+        day = DailySales.objects.get()
+        self.assertEqual((day.orders, day.paid_orders, day.new_customers, day.items_sold), (3, 1, 2, 12))
+        self.assertEqual((day.gross_revenue, day.paid_revenue), (Decimal("1200.00"), Decimal("200.00")))
+@override_settings(DASHBOARD_WIDGET_TTL=60)
+class WidgetCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        DailySales.objects.create(date=timezone.localdate(), orders=3)
+    def test_stale_value_served_while_refreshing_once(self):
+        self.assertEqual(widgets.get_widget("summary")["value"]["total_orders"], 3)
+        key = widgets._key("summary", {})
+        cache.set(key, dict(cache.get(key), computed_at=timezone.now() - timedelta(seconds=120)))
+        DailySales.objects.update(orders=5)
+        with mock.patch.object(widgets, "threading") as threading:
+            for _ in range(2):
+                served = widgets.get_widget("summary")
+                self.assertTrue(served["stale"])
+                self.assertEqual(served["value"]["total_orders"], 3)
+        threading.Thread.assert_called_once()
+        threading.Thread.return_value.start.assert_called_once()
+        # Run the refresh here; closing the connection would end the test's transaction.
+        with mock.patch.object(widgets, "connection"), mock.patch.object(widgets, "close_old_connections"):
+            threading.Thread.call_args.kwargs["target"]()
+        served = widgets.get_widget("summary")
+        self.assertFalse(served["stale"])
+        self.assertEqual(served["value"]["total_orders"], 5)
+        self.assertTrue(cache.add(f"{key}:refreshing", True))
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("staff", "staff@example.com", "pass", is_staff=True)
+        category = Category.objects.create(name="Phones", slug="phones")
+        product = Product.objects.create(
+            category=category, name="Phone", slug="phone", price=Decimal("100.00"), stock=10,
+        )
+        orders = [
+            Order.objects.create(
+                first_name="Buyer", last_name="One", email=f"buyer{i}@example.com",
+                address="1 Main St", postal_code="10001", city="Pune",
+            )
+            for i in range(3)
+        ]
+        # Interleaved, so (order_id, id) order differs from id order.
+        for quantity in range(1, 4):
+            for order in reversed(orders):
+                OrderItem.objects.create(order=order, product=product, price=product.price, quantity=quantity)
+        cls.expected = [
+            [item.order_id, item.quantity] for item in OrderItem.objects.order_by("order_id", "id")
+        ]
+    def setUp(self):
+        self.client.force_login(self.staff)
+    def export_items(self):
+        response = self.client.get("/dashboard/export/orderitems/csv/")
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.reader(b"".join(response.streaming_content).decode().splitlines()))
+        return [[int(row[0]), int(row[3])] for row in rows[1:]]
+    def test_composite_keyset_crosses_chunks(self):
+        # 9 rows: chunk boundaries fall inside an order, and at the very end.
+        for chunk_size in (2, 3, 4, 9, 100):
+            with self.subTest(chunk_size=chunk_size), mock.patch.object(exports, "CHUNK_SIZE", chunk_size):
+                self.assertEqual(self.export_items(), self.expected)
+    def test_bad_filters_rejected(self):
+        for params in ({"status": "PLACED,LOST"}, {"paid": "yes"}, {"start": "2024-13-01"}, {"end": "yesterday"}):
+            with self.subTest(params=params):
+                with self.assertRaises(ValueError):
+                    exports.export_filters(params)
+                self.assertEqual(self.client.get("/dashboard/export/orders/csv/", params).status_code, 400)
+        self.assertEqual(self.client.post("/dashboard/export/orderitems/excel/", {"paid": "yes"}).status_code, 400)
+        self.assertFalse(ExportJob.objects.exists())
+        filters = exports.export_filters({"status": "PLACED,PACKED", "paid": "false", "start": "2024-01-01"})
+        self.assertEqual(filters["status__in"], ["PLACED", "PACKED"])
+        self.assertIs(filters["paid"], False)
+    def test_excel_job_reads_every_row(self):
+        import openpyxl
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=root.name))
+        self.client.post("/dashboard/export/orderitems/excel/")
+        job = ExportJob.objects.get()
+        with mock.patch.object(exports, "CHUNK_SIZE", 4), mock.patch.object(exports, "PROGRESS_EVERY", 4):
+            self.assertEqual(exports.run_export_job(job.pk), "completed")
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed_rows, job.total_rows), ("completed", 9, 9))
+        workbook = openpyxl.load_workbook(job.file.path, read_only=True)
+        rows = list(workbook.active.iter_rows(min_row=2, values_only=True))
+        workbook.close()
+        self.assertEqual([[row[0], row[3]] for row in rows], self.expected)
+        self.assertIsNone(exports.run_export_job(job.pk))
+@override_settings(DELTA_EXPORT_LAG=60)
+class ChangeFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.orders = [
+            Order.objects.create(
+                first_name="Buyer", last_name="One", email=f"buyer{i}@example.com",
+                address="1 Main St", postal_code="10001", city="Pune",
+            )
+            for i in range(5)
+        ]
+    def setUp(self):
+        self.base = timezone.now() - timedelta(minutes=10)
+        # Three rows share a timestamp; the last is inside the lag window.
+        for order, updated in zip(self.orders, [self.base] * 3 + [self.base + timedelta(minutes=1), timezone.now()]):
+            Order.objects.filter(pk=order.pk).update(updated=updated)
+    def export(self, *args):
+        out = StringIO()
+        call_command(
+            "export_changes", "orders", "--consumer", "etl", "--batch", "2", *args, stdout=out, stderr=StringIO(),
+        )
+        return [json.loads(line)["id"] for line in out.getvalue().splitlines()]
+    def test_rows_inside_lag_held_back(self):
+        ids = [order.pk for order in self.orders]
+        self.assertEqual([row["id"] for row in deltas.changed_rows("orders", batch_size=2)], ids[:4])
+        self.assertEqual([row["id"] for row in deltas.changed_rows("orders", limit=3)], ids[:3])
+        after = deltas.changed_rows("orders", self.base, ids[1], batch_size=1)
+        self.assertEqual([row["id"] for row in after], ids[2:4])
+    def test_cursor_advances(self):
+        ids = [order.pk for order in self.orders]
+        self.assertEqual(self.export("--no-ack"), ids[:4])
+        self.assertEqual(deltas.get_cursor("etl", "orders"), (None, 0))
+        self.assertEqual(self.export(), ids[:4])
+        self.assertEqual(deltas.get_cursor("etl", "orders"), (self.base + timedelta(minutes=1), ids[3]))
+        self.assertEqual(self.export(), [])
+        Order.objects.filter(pk=ids[1]).update(updated=self.base + timedelta(minutes=2))
+        self.assertEqual(self.export(), [ids[1]])
+        with override_settings(DELTA_EXPORT_LAG=0):
+            self.assertEqual(self.export(), [ids[4]])
+        cursor = deltas.encode_cursor(self.base, ids[0])
+        self.assertEqual(deltas.decode_cursor(cursor), (self.base, ids[0]))
+        self.assertEqual(self.export("--no-ack", "--cursor", cursor), [ids[2], ids[3], ids[1]])
+        with self.assertRaises(ValueError):
+            deltas.decode_cursor("not-a-cursor")
@@ -4,8 +4,16 @@ from . import views
 app_name = "dashboard"
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
+    path('refresh/', views.refresh_dashboard, name='refresh'),
+    path('inventory/', views.inventory, name='inventory'),
+    path('jobs/', views.jobs, name='jobs'),
+    path('api/metrics/<str:widget>/', views.MetricsAPI.as_view(), name='metrics'),
     path("export/orders/csv/", views.export_orders_csv, name="export_orders_csv"),
     path("export/orderitems/csv/", views.export_orderitems_csv, name="export_orderitems_csv"),
     path("export/orders/excel/", views.export_orders_excel, name="export_orders_excel"),
     path("export/orderitems/excel/", views.export_orderitems_excel, name="export_orderitems_excel"),
+    path("exports/", views.export_jobs, name="export_jobs"),
+    path("exports/<int:job_id>/", views.export_job, name="export_job"),
+    path("exports/<int:job_id>/status/", views.export_job_status, name="export_job_status"),
+    path("exports/<int:job_id>/download/", views.export_job_download, name="export_job_download"),
 ]
\ No newline at end of file
@@ -1,168 +1,176 @@
-from django.shortcuts import render
+import os
+from datetime import date, timedelta
+from django.core.paginator import Paginator
+from django.db.models import Count, Min
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.admin.views.decorators import staff_member_required
-from orders.models import Order, OrderItem
-from store.models import Product
-from django.db.models import Sum, F, FloatField, Count
-from datetime import timedelta
+from django.urls import reverse
 from django.utils import timezone
-from django.db.models.functions import TruncMonth
-import csv
-from django.http import HttpResponse
-import openpyxl
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views.decorators.http import require_POST
+from rest_framework import status
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from jobs.models import Job
+from orders.models import Order
+from PrimeStore.ranges import ranged_file_response
+from .exports import (
+    ORDER_HEADER,
+    ORDER_ITEM_HEADER,
+    export_filters,
+    iter_csv,
+    order_item_rows,
+    order_rows,
+    start_export,
+)
+from .inventory import low_stock_products
+from .models import ExportJob, StockAlert
+from .widgets import WIDGETS, get_widget, get_widgets, refresh_widgets
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+
+DASHBOARD_WIDGETS = ["summary", "top_products", "recent_orders"]
+METRICS = {
+    "sales_by_day": {"start", "end"},
+    "monthly_sales": {"start", "end"},
+    "product_revenue": {"start", "end", "limit"},
+    "customer_cohorts": {"start", "end"},
+    "low_stock": {"limit"},
+    "cohort_retention": {"months"},
+}
+MAX_METRICS_RANGE = timedelta(days=3 * 366)
 
 @staff_member_required
 def dashboard(request):
-    today = timezone.now().date()
-    total_orders = Order.objects.count()
-    total_revenue = OrderItem.objects.aggregate(
-        total=Sum(F("price") * F("quantity"), output_field=FloatField())
-    )["total"] or 0
-    orders_today = Order.objects.filter(created__date=today).count()
-    revenue_today = OrderItem.objects.filter(
-        order__paid=True,
-        order__created__date=today
-    ).aggregate(
-        total=Sum(F("price") * F("quantity"), output_field=FloatField())
-    )["total"] or 0
-    customer_orders = (
-        Order.objects.values("email")
-        .annotate(order_count=Count("id"))
-    )
-    new_customers = sum(1 for c in customer_orders if c["order_count"] == 1)
-    returning_customers = sum(1 for c in customer_orders if c["order_count"] > 1)
-    monthly_new_customers = (
-        Order.objects.annotate(month=TruncMonth("created"))
-        .values("month")
-        .annotate(new_count=Count("email", distinct=True))
-        .order_by("month")
-    )
-    customer_month_labels = [item["month"].strftime("%b %Y") for item in monthly_new_customers]
-    customer_month_data = [item["new_count"] for item in monthly_new_customers]
-    top_customers = (
-        Order.objects.values("email")
-        .annotate(order_count=Count("id"))
-        .order_by("-order_count")[:5]
-    )
-    top_products = (
-        OrderItem.objects.values("product__name")
-        .annotate(total_qty=Sum("quantity"))
-        .order_by("-total_qty")[:5]
-    )
-    last_7_days = [today - timedelta(days=i) for i in range(6, -1, -1)]
-    date_labels = [d.strftime("%b %d") for d in last_7_days]
-    sales_data = [
-        OrderItem.objects.filter(order__paid=True, order__created__date=day)
-        .aggregate(total=Sum(F("price") * F("quantity"), output_field=FloatField()))
-        ["total"] or 0
-        for day in last_7_days
-    ]
-    paid_orders = Order.objects.filter(paid=True).count()
-    unpaid_orders = Order.objects.filter(paid=False).count()
-    monthly_sales = (
-        OrderItem.objects.filter(order__paid=True)
-        .annotate(month=TruncMonth("order__created"))
-        .values("month")
-        .annotate(total=Sum(F("price") * F("quantity")))
-        .order_by("month")
-    )
-    months_labels = [item["month"].strftime("%b %Y") for item in monthly_sales]
-    months_data = [float(item["total"]) for item in monthly_sales]
-    product_revenue = (
-        OrderItem.objects.annotate(total_amount=F("price") * F("quantity"))
-        .values("product__name")
-        .annotate(total_revenue=Sum("total_amount"))
-        .order_by("-total_revenue")[:10]
-    )
-    revenue_labels = [item["product__name"] for item in product_revenue]
-    revenue_data = [float(item["total_revenue"]) for item in product_revenue]
-    recent_orders = Order.objects.order_by("-created")[:10]
-    low_stock_products = Product.objects.filter(stock__lte=5).order_by("stock")
-    context = {
-        "total_orders": total_orders,
-        "total_revenue": total_revenue,
-        "orders_today": orders_today,
-        "revenue_today": revenue_today,
-        "top_products": top_products,
-        "sales_data": sales_data,
-        "date_labels": date_labels,
-        "paid_orders": paid_orders,
-        "unpaid_orders": unpaid_orders,
-        "months_labels": months_labels,
-        "months_data": months_data,
-        "revenue_labels": revenue_labels,
-        "revenue_data": revenue_data,
-        "recent_orders": recent_orders,
-        "low_stock_products": low_stock_products,
-        "new_customers": new_customers,
-        "returning_customers": returning_customers,
-        "customer_month_labels": customer_month_labels,
-        "customer_month_data": customer_month_data,
-        "top_customers": top_customers,
-    }
+    widgets = get_widgets(DASHBOARD_WIDGETS)
+    context = {"widgets": widgets, "status_choices": Order.STATUS_CHOICES}
+    for entry in widgets.values():
+        context.update(entry["value"])
     return render(request, "dashboard/dashboard.html", context)
 @staff_member_required
-def export_orders_csv(request):
-    response = HttpResponse(content_type="text/csv")
-    response["Content-Disposition"] = 'attachment; filename="orders.csv"'
-    writer = csv.writer(response)
-    writer.writerow(["ID", "Customer Email", "Total Cost", "Paid", "Created"])
-    for order in Order.objects.all():
-        total_cost = sum(item.price * item.quantity for item in order.items.all())
-        writer.writerow([order.id, order.email, float(total_cost), order.paid, order.created])
+@require_POST
+def refresh_dashboard(request):
+    names = [name for name in request.POST.getlist("widget") if name in WIDGETS]
+    refresh_widgets(names or None)
+    next_url = request.POST.get("next")
+    if not url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+        next_url = reverse("dashboard:dashboard")
+    return redirect(next_url)
+@staff_member_required
+def inventory(request):
+    products = Paginator(low_stock_products(), 25).get_page(request.GET.get("page"))
+    alerts = Paginator(
+        StockAlert.objects.select_related("product").order_by("-created", "-id"), 25
+    ).get_page(request.GET.get("alerts_page"))
+    return render(request, "dashboard/inventory.html", {"products": products, "alerts": alerts})
+@staff_member_required
+def jobs(request):
+    counts = {}
+    for row in Job.objects.values("task", "status").annotate(total=Count("id")).order_by("task"):
+        counts.setdefault(row["task"], dict.fromkeys(dict(Job.STATUS_CHOICES), 0))[row["status"]] = row["total"]
+    oldest_due = Job.objects.filter(status="queued", run_at__lte=timezone.now()).aggregate(
+        oldest=Min("run_at")
+    )["oldest"]
+    selected = request.GET.get("status")
+    recent = Job.objects.all()
+    if selected in dict(Job.STATUS_CHOICES):
+        recent = recent.filter(status=selected)
+    return render(request, "dashboard/jobs.html", {
+        "counts": sorted(counts.items()),
+        "statuses": Job.STATUS_CHOICES,
+        "selected": selected,
+        "oldest_due": oldest_due,
+        "jobs": Paginator(recent.defer("kwargs"), 50).get_page(request.GET.get("page")),
+    })
+class MetricsAPI(APIView):
+    """JSON data for one dashboard chart; ``start``/``end`` are ISO dates."""
+    authentication_classes = [SessionAuthentication, JWTAuthentication]
+    permission_classes = [IsAdminUser]
+    def get(self, request, widget):
+        if widget not in METRICS:
+            return Response({"detail": "Unknown metric."}, status=status.HTTP_404_NOT_FOUND)
+        allowed = METRICS[widget]
+        params = {}
+        try:
+            for name in ("start", "end"):
+                if name in allowed and request.query_params.get(name):
+                    params[name] = date.fromisoformat(request.query_params[name])
+            for name, low, high in (("limit", 1, 100), ("months", 1, 36)):
+                if name in allowed and request.query_params.get(name):
+                    params[name] = min(max(int(request.query_params[name]), low), high)
+        except ValueError:
+            return Response({"detail": "Invalid parameter."}, status=status.HTTP_400_BAD_REQUEST)
+        if "start" in params:
+            end = params.get("end") or timezone.localdate()
+            if params["start"] > end:
+                return Response({"detail": "start must not be after end."}, status=status.HTTP_400_BAD_REQUEST)
+            if end - params["start"] > MAX_METRICS_RANGE:
+                return Response({"detail": "Date range too long."}, status=status.HTTP_400_BAD_REQUEST)
+        entry = get_widget(widget, **params)
+        return Response({
+            "widget": widget,
+            "params": {name: str(value) for name, value in params.items()},
+            "computed_at": entry["computed_at"],
+            "stale": entry["stale"],
+            "data": entry["value"],
+        })
+def _stream_csv(request, filename, header, rows):
+    try:
+        filters = export_filters(request.GET)
+    except ValueError as exc:
+        return HttpResponseBadRequest(str(exc))
+    response = StreamingHttpResponse(iter_csv(header, rows(filters)), content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
     return response
 @staff_member_required
+def export_orders_csv(request):
+    return _stream_csv(request, "orders.csv", ORDER_HEADER, order_rows)
+@staff_member_required
 def export_orderitems_csv(request):
-    response = HttpResponse(content_type="text/csv")
-    response["Content-Disposition"] = 'attachment; filename="order_items.csv"'
-    writer = csv.writer(response)
-    writer.writerow(["Order ID", "Product", "Price", "Quantity", "Subtotal"])
-    for item in OrderItem.objects.all():
-        writer.writerow([
-            item.order.id,
-            item.product.name,
-            float(item.price),
-            item.quantity,
-            float(item.price * item.quantity)
-        ])
-    return response
+    return _stream_csv(request, "order_items.csv", ORDER_ITEM_HEADER, order_item_rows)
+def _start_excel_export(request, kind):
+    try:
+        filters = export_filters(request.POST)
+    except ValueError as exc:
+        return HttpResponseBadRequest(str(exc))
+    job = start_export(kind, filters, user=request.user)
+    return redirect("dashboard:export_job", job_id=job.id)
 @staff_member_required
+@require_POST
 def export_orders_excel(request):
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Orders"
-    ws.append(["ID", "Customer Email", "Total Cost", "Paid", "Created"])
-    for order in Order.objects.all():
-        total_cost = sum(item.price * item.quantity for item in order.items.all())
-        ws.append([
-            order.id,
-            order.email,
-            float(total_cost),
-            order.paid,
-            order.created.strftime("%Y-%m-%d %H:%M")
-        ])
-    response = HttpResponse(
-        content=openpyxl.writer.excel.save_virtual_workbook(wb),
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    response["Content-Disposition"] = 'attachment; filename="orders.xlsx"'
-    return response
+    return _start_excel_export(request, "orders")
 @staff_member_required
+@require_POST
 def export_orderitems_excel(request):
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Order Items"
-    ws.append(["Order ID", "Product", "Price", "Quantity", "Subtotal"])
-    for item in OrderItem.objects.all():
-        ws.append([
-            item.order.id,
-            item.product.name,
-            float(item.price),
-            item.quantity,
-            float(item.price * item.quantity)
-        ])
-    response = HttpResponse(
-        content=openpyxl.writer.excel.save_virtual_workbook(wb),
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    return _start_excel_export(request, "order_items")
+@staff_member_required
+def export_jobs(request):
+    jobs = ExportJob.objects.select_related("requested_by")[:50]
+    return render(request, "dashboard/export_jobs.html", {"jobs": jobs})
+@staff_member_required
+def export_job(request, job_id):
+    job = get_object_or_404(ExportJob, id=job_id)
+    return render(request, "dashboard/export_job.html", {"job": job})
+@staff_member_required
+def export_job_status(request, job_id):
+    job = get_object_or_404(ExportJob, id=job_id)
+    return JsonResponse({
+        "id": job.id,
+        "status": job.status,
+        "progress": job.progress,
+        "processed_rows": job.processed_rows,
+        "total_rows": job.total_rows,
+        "error": job.error,
+        "download_url": reverse("dashboard:export_job_download", args=[job.id]) if job.file else None,
+    })
+@staff_member_required
+def export_job_download(request, job_id):
+    job = get_object_or_404(ExportJob, id=job_id, status="completed")
+    return ranged_file_response(
+        request,
+        job.file.path,
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        filename=os.path.basename(job.file.name),
     )
-    response["Content-Disposition"] = 'attachment; filename="order_items.xlsx"'
-    return response
\ No newline at end of file
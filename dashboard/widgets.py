@@ -0,0 +1,245 @@
+"""
+Stale-while-revalidate cache for dashboard widgets.
+
+Each widget is computed and cached on its own. Within ``DASHBOARD_WIDGET_TTL``
+the cached value is served as is; after that, and for up to
+``DASHBOARD_WIDGET_STALE_TTL`` more, the stale value is still served while a
+single background thread (guarded by ``cache.add``) recomputes it.
+"""
+import logging
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import close_old_connections, connection
+from django.db.models import Count, DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+from orders.models import Order
+from PrimeStore.metrics import record_cache
+from store.models import Product
+from .cohorts import cohort_report, load_snapshot
+from .inventory import low_stock_products
+from .models import CustomerFirstOrder, DailyProductSales, DailySales
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "dashboard:widget:v1"
+REFRESH_LOCK_TIMEOUT = 120
+
+WIDGETS = {}
+
+def widget(name):
+    def register(func):
+        WIDGETS[name] = func
+        return func
+    return register
+def _fresh_ttl():
+    return getattr(settings, "DASHBOARD_WIDGET_TTL", 60)
+def _stale_ttl():
+    return getattr(settings, "DASHBOARD_WIDGET_STALE_TTL", 900)
+def _key(name, params=None):
+    key = f"{KEY_PREFIX}:{name}"
+    for param, value in sorted((params or {}).items()):
+        key += f":{param}={value}"
+    return key
+def compute_widget(name, params=None):
+    entry = {
+        "value": WIDGETS[name](**(params or {})),
+        "computed_at": timezone.now(),
+    }
+    cache.set(_key(name, params), entry, _fresh_ttl() + _stale_ttl())
+    return entry
+def _refresh_in_background(name, params=None):
+    lock = f"{_key(name, params)}:refreshing"
+    if not cache.add(lock, True, REFRESH_LOCK_TIMEOUT):
+        return False
+    def run():
+        close_old_connections()
+        try:
+            compute_widget(name, params)
+        except Exception:
+            logger.exception("Refreshing dashboard widget %s failed", name)
+        finally:
+            cache.delete(lock)
+            connection.close()
+    threading.Thread(target=run, name=f"widget-refresh-{name}", daemon=True).start()
+    return True
+def _serve(name, params, entry):
+    if entry is None:
+        entry = compute_widget(name, params)
+    stale = timezone.now() - entry["computed_at"] > timedelta(seconds=_fresh_ttl())
+    if stale:
+        _refresh_in_background(name, params)
+    return dict(entry, stale=stale)
+def get_widgets(names):
+    """
+    Return ``{name: {"value", "computed_at", "stale"}}`` with one cache round
+    trip. Only a cold cache computes in the request; stale entries are
+    refreshed behind it.
+    """
+    entries = cache.get_many([_key(name) for name in names])
+    record_cache("dashboard_widgets", len(entries), len(names) - len(entries))
+    return {name: _serve(name, None, entries.get(_key(name))) for name in names}
+def get_widget(name, **params):
+    entry = cache.get(_key(name, params))
+    record_cache("dashboard_widgets", int(entry is not None), int(entry is None))
+    return _serve(name, params, entry)
+def refresh_widgets(names=None):
+    """Recompute widgets now, e.g. from the dashboard's refresh button."""
+    return {name: compute_widget(name) for name in (names or WIDGETS)}
+@widget("summary")
+def summary():
+    today = timezone.localdate()
+    totals = DailySales.objects.aggregate(
+        total_orders=Sum("orders"),
+        total_paid_orders=Sum("paid_orders"),
+        total_revenue=Sum("gross_revenue"),
+        orders_today=Sum("orders", filter=Q(date=today)),
+        revenue_today=Sum("paid_revenue", filter=Q(date=today)),
+        orders_30_days=Sum("orders", filter=Q(date__gt=today - timedelta(days=30))),
+    )
+    total_orders = totals["total_orders"] or 0
+    paid_orders = totals["total_paid_orders"] or 0
+    return {
+        "total_orders": total_orders,
+        "total_revenue": totals["total_revenue"] or 0,
+        "orders_today": totals["orders_today"] or 0,
+        "revenue_today": totals["revenue_today"] or 0,
+        "orders_30_days": totals["orders_30_days"] or 0,
+        "paid_orders": paid_orders,
+        "unpaid_orders": total_orders - paid_orders,
+    }
+def _date_range(start, end):
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
+@widget("sales_by_day")
+def sales_by_day(start=None, end=None):
+    end = end or timezone.localdate()
+    start = start or end - timedelta(days=6)
+    rows = {
+        row["date"]: row
+        for row in DailySales.objects.filter(date__gte=start, date__lte=end)
+        .values("date", "orders", "paid_revenue", "gross_revenue")
+    }
+    days = list(_date_range(start, end))
+    return {
+        "labels": [day.strftime("%b %d") for day in days],
+        "dates": [day.isoformat() for day in days],
+        "orders": [rows[day]["orders"] if day in rows else 0 for day in days],
+        "revenue": [float(rows[day]["paid_revenue"]) if day in rows else 0 for day in days],
+        "gross_revenue": [float(rows[day]["gross_revenue"]) if day in rows else 0 for day in days],
+    }
+def _monthly_rows(start=None, end=None):
+    rows = DailySales.objects.all()
+    if start:
+        rows = rows.filter(date__gte=start)
+    if end:
+        rows = rows.filter(date__lte=end)
+    return (
+        rows.annotate(month=TruncMonth("date"))
+        .values("month")
+        .annotate(
+            total_orders=Sum("orders"),
+            total_revenue=Sum("paid_revenue"),
+            new_count=Sum("new_customers"),
+        )
+        .order_by("month")
+    )
+@widget("monthly_sales")
+def monthly_sales(start=None, end=None):
+    rows = _monthly_rows(start, end)
+    return {
+        "labels": [row["month"].strftime("%b %Y") for row in rows],
+        "orders": [row["total_orders"] for row in rows],
+        "revenue": [float(row["total_revenue"]) for row in rows],
+    }
+@widget("customer_cohorts")
+def customer_cohorts(start=None, end=None):
+    customers = CustomerFirstOrder.objects.all()
+    if start:
+        customers = customers.filter(last_order_date__gte=start)
+    if end:
+        customers = customers.filter(first_order_date__lte=end)
+    new_in_range = Q(order_count=1)
+    if start:
+        new_in_range = Q(first_order_date__gte=start)
+    counts = customers.aggregate(
+        new=Count("id", filter=new_in_range),
+        returning=Count("id", filter=~new_in_range),
+    )
+    monthly = _monthly_rows(start, end)
+    return {
+        "new_customers": counts["new"],
+        "returning_customers": counts["returning"],
+        "labels": [row["month"].strftime("%b %Y") for row in monthly],
+        "new_per_month": [row["new_count"] for row in monthly],
+        "top_customers": list(
+            customers.order_by("-order_count").values("email", "order_count")[:5]
+        ),
+    }
+@widget("top_products")
+def top_products():
+    return {
+        "top_products": list(
+            DailyProductSales.objects.values("product__name")
+            .annotate(total_qty=Sum("quantity"))
+            .order_by("-total_qty")[:5]
+        ),
+    }
+@widget("product_revenue")
+def product_revenue(start=None, end=None, limit=10):
+    rows = DailyProductSales.objects.all()
+    if start:
+        rows = rows.filter(date__gte=start)
+    if end:
+        rows = rows.filter(date__lte=end)
+    rows = (
+        rows.values("product__name")
+        .annotate(total_revenue=Sum("revenue"), total_qty=Sum("quantity"))
+        .order_by("-total_revenue")[:limit]
+    )
+    return {
+        "labels": [row["product__name"] for row in rows],
+        "revenue": [float(row["total_revenue"]) for row in rows],
+        "quantity": [row["total_qty"] for row in rows],
+    }
+@widget("recent_orders")
+def recent_orders():
+    return {
+        "recent_orders": list(
+            Order.objects.annotate(
+                total_cost=Coalesce(
+                    Sum(F("items__price") * F("items__quantity"), output_field=DecimalField()),
+                    Value(Decimal("0")),
+                    output_field=DecimalField(),
+                ) - F("discount")
+            )
+            .order_by("-created")
+            .values("id", "email", "total_cost", "paid", "created")[:10]
+        ),
+    }
+@widget("low_stock")
+def low_stock(limit=10):
+    products = low_stock_products()
+    return {
+        "total": products.count(),
+        "products": list(products.values("id", "name", "stock")[:limit]),
+    }
+@widget("catalog")
+def catalog():
+    return {
+        "total_products": Product.objects.filter(available=True).count(),
+        "total_users": User.objects.count(),
+    }
+@widget("cohort_retention")
+def cohort_retention(months=12):
+    snapshot = load_snapshot()
+    if snapshot is None:
+        return {"available": False}
+    columns, meta = snapshot
+    return dict(cohort_report(columns, max_months=months), available=True, snapshot=meta)
@@ -0,0 +1,23 @@
+import glob
+import os
+from prometheus_client import multiprocess
+
+# With PROMETHEUS_MULTIPROC_DIR set, workers share metrics through files in
+# that directory: start from an empty one and drop the live gauges of workers
+# that exit.
+def on_starting(server):
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        os.makedirs(path, exist_ok=True)
+        for name in glob.glob(os.path.join(path, "*.db")):
+            os.remove(name)
+def when_ready(server):
+    # With --preload the app is already loaded here in the master: import the
+    # URLconf and the lazily imported dependencies once, before forking, so
+    # workers start warm and share those pages copy-on-write.
+    if server.cfg.preload_app:
+        from PrimeStore.warmup import warm_up
+        server.log.info("Warmed up in %.2fs", warm_up())
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
\ No newline at end of file
@@ -0,0 +1,27 @@
+from django.contrib import admin, messages
+from django.utils import timezone
+from .models import Job, Schedule
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'task', 'status', 'priority', 'attempts', 'max_attempts', 'run_at', 'created', 'finished']
+    list_filter = ['status', 'task']
+    search_fields = ['task', 'unique_key']
+    readonly_fields = ['attempts', 'locked_by', 'locked_at', 'last_error', 'created', 'finished']
+    actions = ['retry_jobs']
+    @admin.action(description="Retry selected failed jobs now")
+    def retry_jobs(self, request, queryset):
+        retried = queryset.filter(status="failed").update(
+            status="queued",
+            attempts=0,
+            run_at=timezone.now(),
+            finished=None,
+            locked_by="",
+            locked_at=None,
+            unique_key=None,
+        )
+        self.message_user(request, f"{retried} job(s) queued for retry", messages.SUCCESS)
+@admin.register(Schedule)
+class ScheduleAdmin(admin.ModelAdmin):
+    list_display = ['task', 'interval', 'enabled', 'next_run_at', 'last_run_at']
+    list_editable = ['interval', 'enabled']
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class JobsConfig(AppConfig):
+    name = 'jobs'
+    def ready(self):
+        # Each app registers its background tasks in its own tasks.py.
+        autodiscover_modules('tasks')
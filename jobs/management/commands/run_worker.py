@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from jobs.worker import Worker
+
+class Command(BaseCommand):
+    help = "Run queued background jobs and periodic tasks."
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=1, help="Jobs to run at once (threads).")
+        parser.add_argument("--interval", type=float, help="Seconds to sleep when idle. Defaults to JOBS_POLL_INTERVAL.")
+        parser.add_argument("--name", help="Worker name recorded on claimed jobs.")
+        parser.add_argument("--burst", action="store_true", help="Exit once no jobs are due.")
+    def handle(self, *args, **options):
+        worker = Worker(
+            name=options["name"],
+            concurrency=options["concurrency"],
+            interval=options["interval"],
+            burst=options["burst"],
+        )
+        self.stderr.write(f"Worker {worker.name} started with {worker.concurrency} thread(s).")
+        processed = worker.run()
+        self.stdout.write(f"Processed {processed} job(s).")
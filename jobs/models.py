@@ -0,0 +1,63 @@
+from django.db import models
+from django.utils import timezone
+
+class Job(models.Model):
+    STATUS_CHOICES = [
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("succeeded", "Succeeded"),
+        ("failed", "Failed"),
+    ]
+    task = models.CharField(max_length=100)
+    kwargs = models.JSONField(default=dict, blank=True)
+    priority = models.SmallIntegerField(default=0, help_text="Higher runs first.")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="queued")
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    unique_key = models.CharField(
+        max_length=200,
+        null=True,
+        blank=True,
+        help_text="At most one queued job per key."
+    )
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    finished = models.DateTimeField(null=True, blank=True)
+    class Meta:
+        ordering = ['-created']
+        indexes = [
+            models.Index(
+                fields=['-priority', 'run_at', 'id'],
+                name='job_queued_idx',
+                condition=models.Q(status='queued')
+            ),
+            models.Index(
+                fields=['locked_at'],
+                name='job_running_idx',
+                condition=models.Q(status='running')
+            ),
+            models.Index(fields=['status', 'finished'], name='job_status_finished_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['unique_key'],
+                condition=models.Q(status='queued'),
+                name='unique_queued_job'
+            ),
+        ]
+    def __str__(self):
+        return f"{self.task} #{self.id} ({self.status})"
+class Schedule(models.Model):
+    """When a periodic task is next due; rows are created from ``@task(every=...)``."""
+    task = models.CharField(max_length=100, unique=True)
+    interval = models.PositiveIntegerField(help_text="Seconds between runs.")
+    enabled = models.BooleanField(default=True)
+    next_run_at = models.DateTimeField(default=timezone.now)
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    class Meta:
+        ordering = ['task']
+    def __str__(self):
+        return f"{self.task} every {self.interval}s"
@@ -0,0 +1,159 @@
+"""
+Database-backed job queue.
+
+Apps register functions with ``@task(name)`` in their ``tasks.py`` and queue
+them with ``enqueue(name, kwargs)``; the row is written in the caller's
+transaction, so a job only becomes visible once the work it refers to has
+committed. ``run_worker`` claims due jobs with ``SELECT ... FOR UPDATE SKIP
+LOCKED`` (a conditional update makes the claim safe on SQLite too), runs them
+and retries failures with exponential backoff. Tasks declared with ``every=``
+are queued by the worker whenever their ``Schedule`` row comes due.
+"""
+import logging
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Job, Schedule
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+SUPERSEDED = "superseded by a queued job with the same unique_key"
+
+def task(name, max_attempts=5, priority=0, every=None):
+    """Register a background task; ``every`` (a timedelta) also runs it periodically."""
+    def register(func):
+        TASKS[name] = {
+            "func": func,
+            "max_attempts": max_attempts,
+            "priority": priority,
+            "every": every,
+        }
+        return func
+    return register
+def enqueue(name, kwargs=None, run_at=None, delay=None, priority=None, unique_key=None):
+    """
+    Queue ``name`` to run with ``kwargs`` (JSON-serialisable). With
+    ``unique_key`` an already queued job for the key is returned instead of
+    adding another.
+    """
+    if name not in TASKS:
+        raise ValueError(f"Unknown task {name!r}")
+    spec = TASKS[name]
+    if run_at is None:
+        run_at = timezone.now() + (delay or timedelta())
+    fields = {
+        "task": name,
+        "kwargs": kwargs or {},
+        "run_at": run_at,
+        "priority": spec["priority"] if priority is None else priority,
+        "max_attempts": spec["max_attempts"],
+        "unique_key": unique_key,
+    }
+    if unique_key is None:
+        return Job.objects.create(**fields)
+    try:
+        with transaction.atomic():
+            return Job.objects.create(**fields)
+    except IntegrityError:
+        existing = Job.objects.filter(unique_key=unique_key, status="queued").first()
+        if existing is None:
+            raise
+        return existing
+def retry_delay(attempts):
+    base = getattr(settings, "JOBS_RETRY_BASE", 10)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), getattr(settings, "JOBS_RETRY_MAX", 3600)))
+def claim(worker, limit=1):
+    """Lock up to ``limit`` due jobs for ``worker`` and return them, highest priority first."""
+    now = timezone.now()
+    token = f"{worker}:{uuid.uuid4().hex[:8]}"
+    with transaction.atomic():
+        ids = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status="queued", run_at__lte=now)
+            .order_by("-priority", "run_at", "id")
+            .values_list("id", flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        Job.objects.filter(pk__in=ids, status="queued").update(
+            status="running", locked_by=token, locked_at=now, attempts=F("attempts") + 1
+        )
+    return list(
+        Job.objects.filter(pk__in=ids, status="running", locked_by=token)
+        .order_by("-priority", "run_at", "id")
+    )
+def run_job(job):
+    """Run a claimed job and record the outcome; returns the job's new status."""
+    spec = TASKS.get(job.task)
+    owned = Job.objects.filter(pk=job.pk, status="running", locked_by=job.locked_by)
+    try:
+        if spec is None:
+            raise LookupError(f"Unknown task {job.task!r}")
+        spec["func"](**job.kwargs)
+    except Exception as exc:
+        logger.exception("Job %s (%s) failed on attempt %s", job.pk, job.task, job.attempts)
+        if spec is None or job.attempts >= job.max_attempts:
+            owned.update(status="failed", last_error=repr(exc), finished=timezone.now())
+            return "failed"
+        try:
+            with transaction.atomic():
+                owned.update(
+                    status="queued",
+                    run_at=timezone.now() + retry_delay(job.attempts),
+                    last_error=repr(exc),
+                    locked_by="",
+                    locked_at=None,
+                )
+        except IntegrityError:
+            # A job with the same unique_key was queued meanwhile and will do the work.
+            owned.update(status="failed", last_error=f"{exc!r}; {SUPERSEDED}", finished=timezone.now())
+            return "failed"
+        return "queued"
+    owned.update(status="succeeded", last_error="", finished=timezone.now())
+    return "succeeded"
+def requeue_stale():
+    """Put back jobs whose worker died mid-run, failing those out of attempts."""
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, "JOBS_LEASE", 1800))
+    stale = Job.objects.filter(status="running", locked_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=F("max_attempts")).update(
+        status="failed", last_error="Worker lost", finished=timezone.now()
+    )
+    requeue = {"status": "queued", "locked_by": "", "locked_at": None, "run_at": timezone.now()}
+    requeued = stale.filter(unique_key__isnull=True).update(**requeue)
+    # One at a time: each may clash with a queued job, or another stale one, for its key.
+    for pk in stale.filter(unique_key__isnull=False).values_list("pk", flat=True):
+        job = Job.objects.filter(pk=pk, status="running")
+        try:
+            with transaction.atomic():
+                requeued += job.update(**requeue)
+        except IntegrityError:
+            failed += job.update(status="failed", last_error=f"Worker lost; {SUPERSEDED}", finished=timezone.now())
+    return requeued + failed
+def sync_schedules():
+    """Create ``Schedule`` rows for periodic tasks that don't have one yet."""
+    for name, spec in TASKS.items():
+        if spec["every"] is not None:
+            Schedule.objects.get_or_create(
+                task=name,
+                defaults={"interval": int(spec["every"].total_seconds())},
+            )
+def enqueue_due_schedules():
+    now = timezone.now()
+    queued = 0
+    with transaction.atomic():
+        due = list(
+            Schedule.objects.select_for_update(skip_locked=True)
+            .filter(enabled=True, next_run_at__lte=now)
+        )
+        for schedule in due:
+            if schedule.task in TASKS:
+                enqueue(schedule.task, unique_key=f"schedule:{schedule.task}")
+                queued += 1
+            schedule.last_run_at = now
+            schedule.next_run_at = now + timedelta(seconds=schedule.interval)
+            schedule.save(update_fields=["last_run_at", "next_run_at"])
+    return queued
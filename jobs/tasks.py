@@ -0,0 +1,10 @@
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from .models import Job
+from .queue import task
+
+@task("jobs.purge_finished", every=timedelta(days=1))
+def purge_finished():
+    cutoff = timezone.now() - timedelta(days=getattr(settings, "JOBS_RETENTION_DAYS", 7))
+    Job.objects.filter(status__in=["succeeded", "failed"], finished__lt=cutoff).delete()
@@ -0,0 +1,105 @@
+from datetime import timedelta
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from . import queue
+from .models import Job, Schedule
+from .worker import Worker
+
+def _ok():
+    pass
+def _boom():
+    raise RuntimeError("boom")
+TEST_TASKS = {
+    "tests.ok": {"func": _ok, "max_attempts": 3, "priority": 0, "every": timedelta(minutes=5)},
+    "tests.boom": {"func": _boom, "max_attempts": 2, "priority": 0, "every": None},
+}
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(queue.TASKS, TEST_TASKS, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    def test_claim_order(self):
+        now = timezone.now()
+        later = queue.enqueue("tests.ok", run_at=now - timedelta(minutes=1))
+        earlier = queue.enqueue("tests.ok", run_at=now - timedelta(minutes=2))
+        urgent = queue.enqueue("tests.ok", priority=5, run_at=now - timedelta(seconds=1))
+        queue.enqueue("tests.ok", delay=timedelta(hours=1))
+        claimed = queue.claim("w1", limit=10)
+        self.assertEqual([job.pk for job in claimed], [urgent.pk, earlier.pk, later.pk])
+        self.assertTrue(all(job.status == "running" and job.attempts == 1 for job in claimed))
+    def test_no_double_claim(self):
+        job = queue.enqueue("tests.ok")
+        self.assertEqual([j.pk for j in queue.claim("w1")], [job.pk])
+        self.assertEqual(queue.claim("w2"), [])
+        self.assertEqual(Job.objects.get(pk=job.pk).attempts, 1)
+    @override_settings(JOBS_RETRY_BASE=10)
+    def test_backoff_then_failed(self):
+        job = queue.enqueue("tests.boom")
+        [claimed] = queue.claim("w1")
+        with self.assertLogs("jobs.queue", "ERROR"):
+            self.assertEqual(queue.run_job(claimed), "queued")
+        job.refresh_from_db()
+        self.assertEqual(job.status, "queued")
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=5))
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        [claimed] = queue.claim("w1")
+        self.assertEqual(claimed.attempts, claimed.max_attempts)
+        with self.assertLogs("jobs.queue", "ERROR"):
+            self.assertEqual(queue.run_job(claimed), "failed")
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+        self.assertIn("boom", job.last_error)
+    @override_settings(JOBS_LEASE=60)
+    def test_requeue_stale(self):
+        retry = queue.enqueue("tests.ok")
+        spent = queue.enqueue("tests.ok")
+        queue.claim("w1", limit=2)
+        Job.objects.filter(pk=spent.pk).update(attempts=3)
+        Job.objects.update(locked_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(queue.requeue_stale(), 2)
+        self.assertEqual(Job.objects.get(pk=retry.pk).status, "queued")
+        self.assertEqual(Job.objects.get(pk=spent.pk).status, "failed")
+    @override_settings(JOBS_RETRY_BASE=10)
+    def test_retry_superseded_by_queued_duplicate(self):
+        job = queue.enqueue("tests.boom", unique_key="k")
+        [claimed] = queue.claim("w1")
+        waiting = queue.enqueue("tests.boom", unique_key="k")
+        self.assertNotEqual(waiting.pk, job.pk)
+        with self.assertLogs("jobs.queue", "ERROR"):
+            self.assertEqual(queue.run_job(claimed), "failed")
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+        self.assertIn("superseded", job.last_error)
+        self.assertEqual(Job.objects.get(pk=waiting.pk).status, "queued")
+    @override_settings(JOBS_LEASE=60)
+    def test_requeue_stale_superseded_by_queued_duplicate(self):
+        queue.sync_schedules()
+        lost = queue.enqueue("tests.ok", unique_key="k")
+        other = queue.enqueue("tests.ok")
+        queue.claim("w1", limit=2)
+        waiting = queue.enqueue("tests.ok", unique_key="k")
+        Job.objects.update(locked_at=timezone.now() - timedelta(minutes=5))
+        Worker()._housekeeping()
+        lost.refresh_from_db()
+        self.assertEqual(lost.status, "failed")
+        self.assertIn("superseded", lost.last_error)
+        self.assertEqual(Job.objects.get(pk=other.pk).status, "queued")
+        self.assertEqual(Job.objects.get(pk=waiting.pk).status, "queued")
+        # The pass went on to queue the schedule.
+        self.assertTrue(Job.objects.filter(unique_key__startswith="schedule:").exists())
+    def test_unique_key_dedupes(self):
+        first = queue.enqueue("tests.ok", unique_key="k")
+        self.assertEqual(queue.enqueue("tests.ok", unique_key="k").pk, first.pk)
+        self.assertEqual(Job.objects.count(), 1)
+    def test_due_schedules(self):
+        queue.sync_schedules()
+        schedule = Schedule.objects.get()
+        self.assertEqual(schedule.task, "tests.ok")
+        before = timezone.now()
+        self.assertEqual(queue.enqueue_due_schedules(), 1)
+        schedule.refresh_from_db()
+        self.assertGreaterEqual(schedule.next_run_at, before + timedelta(minutes=5))
+        self.assertEqual(queue.enqueue_due_schedules(), 0)
+        self.assertEqual(Job.objects.filter(task="tests.ok").count(), 1)
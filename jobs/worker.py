@@ -0,0 +1,75 @@
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+from django.conf import settings
+from django.db import close_old_connections, connection
+from .queue import claim, enqueue_due_schedules, requeue_stale, run_job, sync_schedules
+
+logger = logging.getLogger(__name__)
+
+HOUSEKEEPING_EVERY = 60
+
+class Worker:
+    """
+    Runs jobs on ``concurrency`` threads until stopped (SIGINT/SIGTERM let the
+    running jobs finish). The first thread also queues periodic tasks and
+    requeues jobs abandoned by dead workers. With ``burst`` the worker exits
+    once nothing is due.
+    """
+    def __init__(self, name=None, concurrency=1, interval=None, burst=False):
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.concurrency = max(1, concurrency)
+        self.interval = interval if interval is not None else getattr(settings, "JOBS_POLL_INTERVAL", 1.0)
+        self.burst = burst
+        self.stopping = threading.Event()
+        self.processed = 0
+        self._lock = threading.Lock()
+    def stop(self, *args):
+        self.stopping.set()
+    def _housekeeping(self):
+        # Separately, so a failure in one doesn't stop periodic tasks.
+        for step in (requeue_stale, enqueue_due_schedules):
+            try:
+                step()
+            except Exception:
+                logger.exception("Job housekeeping (%s) failed", step.__name__)
+    def _loop(self, index):
+        name = f"{self.name}:{index}"
+        last_housekeeping = 0
+        try:
+            while not self.stopping.is_set():
+                close_old_connections()
+                if index == 0 and time.monotonic() - last_housekeeping >= min(HOUSEKEEPING_EVERY, self.interval * 10):
+                    self._housekeeping()
+                    last_housekeeping = time.monotonic()
+                jobs = claim(name)
+                for job in jobs:
+                    run_job(job)
+                    with self._lock:
+                        self.processed += 1
+                if not jobs:
+                    if self.burst:
+                        return
+                    self.stopping.wait(self.interval)
+        finally:
+            connection.close()
+    def run(self):
+        sync_schedules()
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+        threads = [
+            threading.Thread(target=self._loop, args=(index,), name=f"job-worker-{index}", daemon=True)
+            for index in range(1, self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        self._loop(0)
+        if self.burst:
+            self.stopping.set()
+        for thread in threads:
+            thread.join()
+        return self.processed
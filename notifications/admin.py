@@ -1,3 +1,9 @@
 from django.contrib import admin
+from .models import Campaign
 
-# Register your models here.
+@admin.register(Campaign)
+class CampaignAdmin(admin.ModelAdmin):
+    list_display = ['id', 'title', 'user', 'status', 'sent_count', 'failed_count', 'pruned_count', 'total_tokens', 'created', 'finished']
+    list_filter = ['status', 'device_type']
+    raw_id_fields = ['user', 'requested_by']
+    readonly_fields = ['status', 'total_tokens', 'sent_count', 'failed_count', 'pruned_count', 'error', 'started', 'finished']
\ No newline at end of file
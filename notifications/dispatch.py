@@ -0,0 +1,132 @@
+"""
+Background delivery of push campaigns.
+
+A campaign streams its device tokens in id order, cuts them into
+multicast batches of ``NOTIFICATION_BATCH_SIZE`` (at most 500) and hands them
+to at most ``NOTIFICATION_CONCURRENCY`` sender threads, paced by a token
+bucket of ``NOTIFICATION_RATE_LIMIT`` messages per second. Campaigns are
+queued on the job runner as ``notifications.run_campaign``.
+"""
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from accounts.models import DeviceToken
+from jobs.queue import enqueue
+from .models import Campaign
+from .transports import DEAD_TOKEN_REASONS, MAX_BATCH_SIZE, BatchResult, get_transport
+
+logger = logging.getLogger(__name__)
+
+TOKEN_CHUNK_SIZE = 2000
+
+class RateLimiter:
+    """Token bucket; ``acquire(n)`` blocks until ``n`` messages may go out."""
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+    def acquire(self, n=1):
+        if not self.rate:
+            return
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= n or self._tokens >= self.capacity:
+                self._tokens -= n
+                return
+            time.sleep((min(n, self.capacity) - self._tokens) / self.rate)
+def token_batches(tokens, size):
+    # Keyset pages rather than .iterator(): no read stays open while the
+    # campaign writes its counts and prunes tokens between batches.
+    after = 0
+    batch = []
+    while True:
+        page = list(tokens.filter(id__gt=after).order_by("id").values_list("id", "token")[:TOKEN_CHUNK_SIZE])
+        for after, token in page:
+            batch.append(token)
+            if len(batch) == size:
+                yield batch
+                batch = []
+        if len(page) < TOKEN_CHUNK_SIZE:
+            break
+    if batch:
+        yield batch
+def _send(transport, batch, title, body):
+    try:
+        return transport.send_multicast(batch, title, body)
+    except Exception as exc:
+        logger.exception("Push batch of %s token(s) failed", len(batch))
+        return BatchResult(failures=[(token, repr(exc)) for token in batch])
+def prune_dead_tokens(failures):
+    """Delete tokens whose failure reason says they are gone for good."""
+    dead = [token for token, reason in failures if reason in DEAD_TOKEN_REASONS]
+    if not dead:
+        return 0
+    deleted, _ = DeviceToken.objects.filter(token__in=dead).delete()
+    return deleted
+def _record(campaign_id, futures):
+    sent = failed = 0
+    failures = []
+    for future in futures:
+        result = future.result()
+        sent += result.success_count
+        failed += result.failure_count
+        failures.extend(result.failures)
+    Campaign.objects.filter(pk=campaign_id).update(
+        sent_count=F("sent_count") + sent,
+        failed_count=F("failed_count") + failed,
+        pruned_count=F("pruned_count") + prune_dead_tokens(failures),
+    )
+def deliver(campaign, transport=None):
+    """Send ``campaign`` to all of its tokens; returns ``(sent, failed, pruned)``."""
+    transport = transport or get_transport()
+    concurrency = max(1, getattr(settings, "NOTIFICATION_CONCURRENCY", 4))
+    size = min(getattr(settings, "NOTIFICATION_BATCH_SIZE", MAX_BATCH_SIZE), MAX_BATCH_SIZE)
+    limiter = RateLimiter(getattr(settings, "NOTIFICATION_RATE_LIMIT", 0))
+    tokens = campaign.tokens()
+    Campaign.objects.filter(pk=campaign.pk).update(total_tokens=tokens.count())
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="push") as pool:
+        pending = set()
+        for batch in token_batches(tokens, size):
+            limiter.acquire(len(batch))
+            pending.add(pool.submit(_send, transport, batch, campaign.title, campaign.body))
+            if len(pending) >= concurrency:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                _record(campaign.pk, done)
+        _record(campaign.pk, wait(pending).done)
+    campaign.refresh_from_db(fields=["sent_count", "failed_count", "pruned_count"])
+    return campaign.sent_count, campaign.failed_count, campaign.pruned_count
+def run_campaign(campaign_id, transport=None):
+    """Claim a pending campaign and deliver it; returns its final status."""
+    claimed = Campaign.objects.filter(pk=campaign_id, status="pending").update(
+        status="running", started=timezone.now()
+    )
+    if not claimed:
+        return None
+    campaign = Campaign.objects.get(pk=campaign_id)
+    try:
+        deliver(campaign, transport)
+    except Exception as exc:
+        logger.exception("Push campaign %s failed", campaign_id)
+        Campaign.objects.filter(pk=campaign_id).update(
+            status="failed", error=repr(exc), finished=timezone.now()
+        )
+        return "failed"
+    Campaign.objects.filter(pk=campaign_id).update(status="completed", finished=timezone.now())
+    return "completed"
+def start_campaign(title, body, user_id=None, device_type="", requested_by=None):
+    """Create a ``Campaign`` and queue it for the background worker."""
+    campaign = Campaign.objects.create(
+        title=title,
+        body=body,
+        user_id=user_id,
+        device_type=device_type,
+        requested_by=requested_by,
+    )
+    enqueue("notifications.run_campaign", {"campaign_id": campaign.id})
+    return campaign
\ No newline at end of file
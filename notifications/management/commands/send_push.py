@@ -0,0 +1,26 @@
+import time
+from django.core.management.base import BaseCommand
+from notifications.dispatch import run_campaign
+from notifications.models import Campaign
+
+class Command(BaseCommand):
+    help = "Send a push notification to every device (or one user's devices) in this process."
+    def add_arguments(self, parser):
+        parser.add_argument("title")
+        parser.add_argument("body")
+        parser.add_argument("--user", type=int, help="Only this user's devices.")
+        parser.add_argument("--device-type", choices=["android", "ios"], default="")
+    def handle(self, *args, **options):
+        campaign = Campaign.objects.create(
+            title=options["title"],
+            body=options["body"],
+            user_id=options["user"],
+            device_type=options["device_type"],
+        )
+        started = time.perf_counter()
+        result = run_campaign(campaign.id)
+        campaign.refresh_from_db()
+        self.stdout.write(
+            f"Campaign #{campaign.id} {result}: {campaign.sent_count} sent, {campaign.failed_count} failed "
+            f"({campaign.pruned_count} dead tokens pruned) of {campaign.total_tokens} in {time.perf_counter() - started:.2f}s."
+        )
\ No newline at end of file
@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-19 17:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campaign',
+            name='device_type',
+            field=models.CharField(blank=True, choices=[('android', 'Android'), ('ios', 'iOS')], help_text='Send to this device type only.', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='campaign',
+            name='pruned_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
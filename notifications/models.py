@@ -1,3 +1,61 @@
+from django.conf import settings
 from django.db import models
+from accounts.models import DeviceToken
 
-# Create your models here.
+class Campaign(models.Model):
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("completed", "Completed"),
+        ("failed", "Failed"),
+    ]
+    title = models.CharField(max_length=200)
+    body = models.TextField()
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name='push_campaigns',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        help_text="Send to this user's devices only. Leave empty to broadcast."
+    )
+    device_type = models.CharField(
+        max_length=20,
+        choices=DeviceToken._meta.get_field('device_type').choices,
+        blank=True,
+        help_text="Send to this device type only."
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    total_tokens = models.PositiveIntegerField(default=0)
+    sent_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    pruned_count = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name='requested_push_campaigns',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True
+    )
+    created = models.DateTimeField(auto_now_add=True)
+    started = models.DateTimeField(null=True, blank=True)
+    finished = models.DateTimeField(null=True, blank=True)
+    class Meta:
+        ordering = ['-created']
+    def __str__(self):
+        return f"Campaign #{self.id}: {self.title}"
+    def tokens(self):
+        tokens = DeviceToken.objects.all()
+        if self.user_id:
+            tokens = tokens.filter(user_id=self.user_id)
+        if self.device_type:
+            tokens = tokens.filter(device_type=self.device_type)
+        return tokens
+    @property
+    def progress(self):
+        if self.status == "completed":
+            return 100
+        if not self.total_tokens:
+            return 0
+        return min(99, (self.sent_count + self.failed_count) * 100 // self.total_tokens)
\ No newline at end of file
@@ -0,0 +1,6 @@
+from jobs.queue import task
+from .dispatch import run_campaign
+
+@task("notifications.run_campaign", max_attempts=1)
+def deliver_campaign(campaign_id):
+    run_campaign(campaign_id)
@@ -0,0 +1,78 @@
+"""
+Push transports. ``NOTIFICATION_TRANSPORT`` names the class to use; each
+sends one notification to a batch of up to 500 tokens and returns a
+``BatchResult``.
+"""
+import threading
+import time
+from django.conf import settings
+from django.utils.module_loading import import_string
+from PrimeStore.metrics import timed_call
+
+MAX_BATCH_SIZE = 500
+# Failure reasons meaning the token will never work again.
+DEAD_TOKEN_REASONS = {"UNREGISTERED", "SENDER_ID_MISMATCH", "INVALID_TOKEN"}
+
+class BatchResult:
+    def __init__(self, success_count=0, failures=None):
+        self.success_count = success_count
+        self.failures = failures or []  # (token, reason) pairs
+    @property
+    def failure_count(self):
+        return len(self.failures)
+class FCMTransport:
+    """Firebase Cloud Messaging via ``send_each_for_multicast``."""
+    def __init__(self):
+        import firebase_admin
+        from firebase_admin import messaging
+        try:
+            self.app = firebase_admin.get_app()
+        except ValueError:
+            from PrimeStore.firebase import default_app
+            self.app = default_app
+        self.messaging = messaging
+    def send_multicast(self, tokens, title, body):
+        message = self.messaging.MulticastMessage(
+            notification=self.messaging.Notification(title=title, body=body),
+            tokens=list(tokens),
+        )
+        with timed_call("fcm", "send_multicast"):
+            response = self.messaging.send_each_for_multicast(message, app=self.app)
+        result = BatchResult(success_count=response.success_count)
+        for token, item in zip(tokens, response.responses):
+            if not item.success:
+                result.failures.append((token, self.reason(item.exception)))
+        return result
+    def reason(self, exc):
+        if isinstance(exc, self.messaging.UnregisteredError):
+            return "UNREGISTERED"
+        if isinstance(exc, self.messaging.SenderIdMismatchError):
+            return "SENDER_ID_MISMATCH"
+        code = getattr(exc, "code", None)
+        if code == "INVALID_ARGUMENT" and "registration token" in str(exc).lower():
+            return "INVALID_TOKEN"
+        return code or repr(exc)
+class FakeTransport:
+    """
+    Records messages in ``FakeTransport.outbox`` instead of sending them.
+    Tokens starting with ``invalid`` fail as unregistered; ``NOTIFICATION_FAKE_LATENCY``
+    seconds are slept per batch to stand in for the network.
+    """
+    outbox = []
+    _lock = threading.Lock()
+    def __init__(self):
+        self.latency = getattr(settings, "NOTIFICATION_FAKE_LATENCY", 0)
+    def send_multicast(self, tokens, title, body):
+        if self.latency:
+            time.sleep(self.latency)
+        result = BatchResult()
+        for token in tokens:
+            if token.startswith("invalid"):
+                result.failures.append((token, "UNREGISTERED"))
+            else:
+                result.success_count += 1
+        with self._lock:
+            self.outbox.append({"tokens": list(tokens), "title": title, "body": body})
+        return result
+def get_transport():
+    return import_string(getattr(settings, "NOTIFICATION_TRANSPORT", "notifications.transports.FCMTransport"))()
\ No newline at end of file
@@ -1,11 +1,7 @@
-from firebase_admin import messaging
+from .dispatch import prune_dead_tokens
+from .transports import get_transport
 def send_fcm_notification(token, title, body):
-    message = messaging.Message(
-        notification=messaging.Notification(
-            title=title,
-            body=body
-        ),
-        token=token,
-    )
-    response = messaging.send(message)
-    return response
\ No newline at end of file
+    """Send to one device, pruning the token if FCM reports it dead; returns the ``BatchResult``."""
+    result = get_transport().send_multicast([token], title, body)
+    prune_dead_tokens(result.failures)
+    return result
\ No newline at end of file
@@ -1,6 +1,12 @@
+from django import forms
 from django.contrib import admin
 from django.contrib import messages
-from .models import Order, OrderItem, Coupon
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from dashboard.rollups import record_order_paid, record_order_unpaid
+from .invoices import iter_invoice_zip, render_invoices
+from .models import Order, OrderItem, Coupon, OrderStatusEvent, StripeEvent
+from .status import bulk_transition, can_transition, transition_order
 
 @admin.register(Coupon)
 class CouponAdmin(admin.ModelAdmin):
@@ -17,11 +23,43 @@ class CouponAdmin(admin.ModelAdmin):
     search_fields = ('code',)
     ordering = ('-valid_to',)
 
+@admin.register(StripeEvent)
+class StripeEventAdmin(admin.ModelAdmin):
+    list_display = ('event_id', 'type', 'order_id', 'status', 'attempts', 'stripe_created', 'processed')
+    list_filter = ('status', 'type')
+    search_fields = ('event_id',)
+    readonly_fields = [f.name for f in StripeEvent._meta.fields]
+    actions = ['retry_events']
+    def has_add_permission(self, request):
+        return False
+    def retry_events(self, request, queryset):
+        updated = queryset.filter(status='failed').update(
+            status='pending', attempts=0, next_attempt_at=timezone.now()
+        )
+        self.message_user(request, f"{updated} event(s) queued for retry", messages.SUCCESS)
+    retry_events.short_description = "Retry selected failed events"
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     raw_id_fields = ['product']
     extra = 0
     readonly_fields = ('price', 'quantity')
+class OrderStatusEventInline(admin.TabularInline):
+    model = OrderStatusEvent
+    extra = 0
+    can_delete = False
+    readonly_fields = ('from_status', 'to_status', 'actor', 'source', 'note', 'created')
+    def has_add_permission(self, request, obj=None):
+        return False
+class OrderAdminForm(forms.ModelForm):
+    class Meta:
+        model = Order
+        fields = '__all__'
+    def clean_status(self):
+        status = self.cleaned_data['status']
+        previous = self.initial.get('status')
+        if self.instance.pk and previous != status and not can_transition(previous, status):
+            raise forms.ValidationError(f"Cannot move an order from {previous} to {status}.")
+        return status
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
@@ -32,32 +70,54 @@ class OrderAdmin(admin.ModelAdmin):
         'last_name',
         'status',
         'paid',
+        'payment_status',
         'created',
         'tracking_number',
     ]
 
-    list_filter = ['paid', 'status', 'created']
+    list_filter = ['paid', 'payment_status', 'status', 'created']
     search_fields = ['id', 'email', 'tracking_number']
     ordering = ['-created']
-    inlines = [OrderItemInline]
+    inlines = [OrderItemInline, OrderStatusEventInline]
+    form = OrderAdminForm
     list_editable = ('status',)
     actions = [
-        "mark_placed",
         "mark_packed",
         "mark_shipped",
         "mark_out_for_delivery",
         "mark_delivered",
+        "download_invoices",
     ]
+    def get_changelist_form(self, request, **kwargs):
+        kwargs.setdefault('form', OrderAdminForm)
+        return super().get_changelist_form(request, **kwargs)
+    def save_model(self, request, obj, form, change):
+        if change and 'status' in form.changed_data:
+            new_status = obj.status
+            obj.status = form.initial['status']
+            super().save_model(request, obj, form, change)
+            transition_order(obj, new_status, user=request.user, source='admin')
+        else:
+            super().save_model(request, obj, form, change)
+        if change and 'paid' in form.changed_data:
+            (record_order_paid if obj.paid else record_order_unpaid)(obj)
     def _update_status(self, request, queryset, status_label):
-        updated = queryset.update(status=status_label)
-        self.message_user(
-            request,
-            f"{updated} order(s) successfully marked as {status_label.replace('_', ' ').title()}",
-            messages.SUCCESS
+        result = bulk_transition(
+            queryset.values_list('pk', flat=True), status_label, user=request.user, source='admin'
         )
-    def mark_placed(self, request, queryset):
-        self._update_status(request, queryset, "PLACED")
-    mark_placed.short_description = "Mark selected orders as PLACED"
+        label = status_label.replace('_', ' ').title()
+        if result["updated"]:
+            self.message_user(
+                request,
+                f"{len(result['updated'])} order(s) successfully marked as {label}",
+                messages.SUCCESS
+            )
+        if result["rejected"]:
+            self.message_user(
+                request,
+                f"{len(result['rejected'])} order(s) skipped: they cannot move to {label} from their current status",
+                messages.WARNING
+            )
     def mark_packed(self, request, queryset):
         self._update_status(request, queryset, "PACKED")
     mark_packed.short_description = "Mark selected orders as PACKED"
@@ -69,4 +129,14 @@ class OrderAdmin(admin.ModelAdmin):
     mark_out_for_delivery.short_description = "Mark selected orders as OUT FOR DELIVERY"
     def mark_delivered(self, request, queryset):
         self._update_status(request, queryset, "DELIVERED")
-    mark_delivered.short_description = "Mark selected orders as DELIVERED"
\ No newline at end of file
+    mark_delivered.short_description = "Mark selected orders as DELIVERED"
+    def download_invoices(self, request, queryset):
+        order_ids = list(queryset.order_by('id').values_list('id', flat=True))
+        response = StreamingHttpResponse(
+            iter_invoice_zip(render_invoices(order_ids, workers=1)),
+            content_type="application/zip"
+        )
+        stamp = timezone.localtime().strftime("%Y%m%d-%H%M%S")
+        response["Content-Disposition"] = f'attachment; filename="invoices-{stamp}.zip"'
+        return response
+    download_invoices.short_description = "Download invoices for selected orders (ZIP)"
\ No newline at end of file
@@ -0,0 +1,170 @@
+"""
+Offline stand-ins for Stripe, used for local load tests of the payment flow.
+Events are shaped like Stripe's and signed with ``STRIPE_WEBHOOK_SECRET`` so
+they pass the same verification as real deliveries; ``StubStripeServer``
+answers the API calls made by ``orders.payments`` when ``STRIPE_API_BASE``
+points at it.
+"""
+import hashlib
+import hmac
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+def sign_payload(payload, secret, timestamp=None):
+    """Build a ``Stripe-Signature`` header for ``payload`` (bytes)."""
+    timestamp = int(timestamp or time.time())
+    signed = f"{timestamp}.".encode() + payload
+    signature = hmac.new(secret.encode(), signed, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+def make_event(event_type, obj, created=None):
+    return {
+        "id": f"evt_fake_{uuid.uuid4().hex[:24]}",
+        "object": "event",
+        "type": event_type,
+        "created": int(created or time.time()),
+        "livemode": False,
+        "data": {"object": obj},
+    }
+def payment_intent(order_id, amount, status="succeeded", intent_id=None):
+    return {
+        "id": intent_id or f"pi_fake_{order_id}",
+        "object": "payment_intent",
+        "amount": amount,
+        "currency": "inr",
+        "status": status,
+        "metadata": {"order_id": str(order_id)},
+    }
+def checkout_session(order_id, amount, paid=True):
+    return {
+        "id": f"cs_fake_{order_id}",
+        "object": "checkout.session",
+        "amount_total": amount,
+        "client_reference_id": str(order_id),
+        "payment_intent": f"pi_fake_{order_id}",
+        "payment_status": "paid" if paid else "unpaid",
+        "metadata": {"order_id": str(order_id)},
+    }
+def charge(order_id, amount, amount_refunded):
+    return {
+        "id": f"ch_fake_{order_id}",
+        "object": "charge",
+        "amount": amount,
+        "amount_refunded": amount_refunded,
+        "refunded": amount_refunded >= amount,
+        "payment_intent": f"pi_fake_{order_id}",
+        "metadata": {},
+    }
+def order_event_sequence(order_id, amount, rng, failure_rate=0.1, refund_rate=0.05):
+    """The events Stripe would send over one order's payment lifecycle."""
+    now = int(time.time())
+    events = []
+    if rng.random() < failure_rate:
+        events.append(make_event(
+            "payment_intent.payment_failed",
+            payment_intent(order_id, amount, status="requires_payment_method"),
+            created=now,
+        ))
+    events.append(make_event("checkout.session.completed", checkout_session(order_id, amount), created=now + 1))
+    events.append(make_event("payment_intent.succeeded", payment_intent(order_id, amount), created=now + 1))
+    if rng.random() < refund_rate:
+        refunded = amount if rng.random() < 0.5 else amount // 2
+        events.append(make_event("charge.refunded", charge(order_id, amount, refunded), created=now + 2))
+    return events
+def generate_events(orders, seed=None, duplicate_rate=0.2, failure_rate=0.1, refund_rate=0.05):
+    """
+    Yield event dicts for ``orders`` (iterable of ``(order_id, amount_in_paise)``),
+    re-sending a share of them to mimic Stripe's at-least-once delivery.
+    """
+    rng = random.Random(seed)
+    for order_id, amount in orders:
+        for event in order_event_sequence(order_id, amount, rng, failure_rate, refund_rate):
+            yield event
+            while rng.random() < duplicate_rate:
+                yield event
+class StubStripeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    def log_message(self, format, *args):
+        pass
+    def _send(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Request-Id", f"req_fake_{uuid.uuid4().hex[:14]}")
+        self.end_headers()
+        self.wfile.write(data)
+    def _build(self, path, params):
+        suffix = uuid.uuid4().hex[:24]
+        if path == "/v1/checkout/sessions":
+            host = self.headers.get("Host", "localhost")
+            return {
+                "id": f"cs_fake_{suffix}",
+                "object": "checkout.session",
+                "url": f"http://{host}/pay/cs_fake_{suffix}",
+                "payment_status": "unpaid",
+                "client_reference_id": params.get("client_reference_id"),
+            }
+        if path == "/v1/payment_intents":
+            return {
+                "id": f"pi_fake_{suffix}",
+                "object": "payment_intent",
+                "amount": int(params.get("amount", 0)),
+                "currency": params.get("currency", "inr"),
+                "status": "requires_payment_method",
+                "client_secret": f"pi_fake_{suffix}_secret_{uuid.uuid4().hex[:12]}",
+            }
+        return None
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        params = dict(parse_qsl(self.rfile.read(length).decode()))
+        key = self.headers.get("Idempotency-Key")
+        with server.lock:
+            server.request_count += 1
+            cached = server.idempotent.get(key) if key else None
+        if cached is not None:
+            return self._send(200, cached)
+        if server.delay:
+            time.sleep(server.delay)
+        if server.rng.random() < server.fail_rate:
+            return self._send(500, {"error": {"type": "api_error", "message": "Stub failure"}})
+        body = self._build(self.path.split("?")[0], params)
+        if body is None:
+            return self._send(404, {"error": {"type": "invalid_request_error", "message": "Unknown path"}})
+        if key:
+            with server.lock:
+                server.idempotent[key] = body
+        self._send(200, body)
+class StubStripeServer(ThreadingHTTPServer):
+    """
+    Minimal Stripe API double with configurable latency and failure rate.
+    Repeated requests with the same ``Idempotency-Key`` replay the first
+    response, as Stripe does.
+    """
+    daemon_threads = True
+    def __init__(self, address=("127.0.0.1", 12111), delay=0.0, fail_rate=0.0, seed=None):
+        super().__init__(address, StubStripeHandler)
+        self.delay = delay
+        self.fail_rate = fail_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.idempotent = {}
+        self.request_count = 0
+    def handle_error(self, request, client_address):
+        # Clients that hit their read timeout hang up before we answer.
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,120 @@
+import io
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from django.conf import settings
+from django.db import connections
+from .models import Order
+
+INVOICE_DIR = "invoices"
+
+def invoice_path(order):
+    """Invoices are keyed by order id and the order's ``updated`` stamp."""
+    version = int(order.updated.timestamp() * 1_000_000)
+    return Path(settings.MEDIA_ROOT) / INVOICE_DIR / str(order.id) / f"{version}.pdf"
+def invoice_filename(order):
+    return f"invoice_{order.id}.pdf"
+def _draw_invoice(fh, order, items):
+    from reportlab.pdfgen import canvas
+    p = canvas.Canvas(fh)
+    p.setFont("Helvetica-Bold", 20)
+    p.drawString(200, 800, "PrimeStore Invoice")
+    p.setFont("Helvetica", 12)
+    p.drawString(50, 760, f"Order ID: {order.id}")
+    p.drawString(50, 740, f"Tracking Number: {order.tracking_number or ''}")
+    p.drawString(50, 720, f"Customer Email: {order.email}")
+    p.drawString(50, 700, f"Order Date: {order.created.strftime('%d-%m-%Y %H:%M')}")
+    p.drawString(50, 670, "Items:")
+    y = 650
+    for item in items:
+        p.drawString(60, y, f"{item.product.name} x{item.quantity} — ₹{item.get_cost()}")
+        y -= 20
+        if y < 80:
+            p.showPage()
+            p.setFont("Helvetica", 12)
+            y = 800
+    total = sum(item.get_cost() for item in items) - order.discount
+    p.drawString(50, y - 20, f"Total: ₹{total}")
+    p.showPage()
+    p.save()
+def render_invoice(order):
+    """Render the invoice for the current order version and drop older ones."""
+    path = invoice_path(order)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    items = list(order.items.select_related("product"))
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as fh:
+        _draw_invoice(fh, order, items)
+    os.replace(tmp_path, path)
+    for stale in path.parent.glob("*.pdf"):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+    return path
+def get_invoice(order):
+    path = invoice_path(order)
+    if not path.exists():
+        path = render_invoice(order)
+    return path
+def render_invoice_for_id(order_id):
+    order = Order.objects.get(pk=order_id)
+    return str(get_invoice(order))
+def _pool_context():
+    # Forked workers inherit the configured Django app registry.
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return None
+def render_invoices(order_ids, workers=None):
+    """
+    Render (or reuse) invoices for ``order_ids`` in a process pool and yield
+    ``(order_id, path)`` pairs in input order.
+    """
+    order_ids = list(order_ids)
+    if workers == 1 or len(order_ids) < 2:
+        for order_id in order_ids:
+            yield order_id, render_invoice_for_id(order_id)
+        return
+    # Child processes must not share the parent's open DB sockets.
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) as pool:
+        chunksize = max(1, min(100, len(order_ids) // ((workers or os.cpu_count() or 1) * 4)))
+        yield from zip(order_ids, pool.map(render_invoice_for_id, order_ids, chunksize=chunksize))
+class _ZipStream(io.RawIOBase):
+    """Write-only sink that lets ``zipfile`` emit an archive incrementally."""
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+    def writable(self):
+        return True
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+    def tell(self):
+        return self._position
+    def pop(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+def iter_invoice_zip(rendered):
+    """
+    Stream a ZIP archive built from ``(order_id, path)`` pairs, yielding bytes
+    after every file so memory use stays at one invoice.
+    """
+    sink = _ZipStream()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for order_id, path in rendered:
+            with open(path, "rb") as src, archive.open(f"invoice_{order_id}.pdf", "w") as dst:
+                while True:
+                    block = src.read(64 * 1024)
+                    if not block:
+                        break
+                    dst.write(block)
+                    data = sink.pop()
+                    if data:
+                        yield data
+            data = sink.pop()
+            if data:
+                yield data
+    yield sink.pop()
@@ -0,0 +1,48 @@
+import os
+import sys
+from datetime import datetime, time, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from orders.invoices import iter_invoice_zip, render_invoices
+from orders.models import Order
+
+class Command(BaseCommand):
+    help = "Render invoices for orders created in a date range and package them as a ZIP."
+    def add_arguments(self, parser):
+        parser.add_argument("--start", required=True, help="First order date (YYYY-MM-DD, inclusive).")
+        parser.add_argument("--end", required=True, help="Last order date (YYYY-MM-DD, inclusive).")
+        parser.add_argument("--output", "-o", default="-", help="ZIP file to write, or '-' for stdout.")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Render processes.")
+        parser.add_argument("--paid-only", action="store_true", help="Skip unpaid orders.")
+    def _parse_date(self, value):
+        try:
+            return datetime.strptime(value, "%Y-%m-%d").date()
+        except ValueError:
+            raise CommandError(f"Invalid date {value!r}, expected YYYY-MM-DD.")
+    def handle(self, *args, **options):
+        start = self._parse_date(options["start"])
+        end = self._parse_date(options["end"])
+        if end < start:
+            raise CommandError("--end must not be before --start.")
+        tz = timezone.get_current_timezone()
+        orders = Order.objects.filter(
+            created__gte=datetime.combine(start, time.min, tzinfo=tz),
+            created__lt=datetime.combine(end + timedelta(days=1), time.min, tzinfo=tz),
+        )
+        if options["paid_only"]:
+            orders = orders.filter(paid=True)
+        order_ids = list(orders.order_by("id").values_list("id", flat=True))
+        if not order_ids:
+            self.stderr.write("No orders in range.")
+            return
+        rendered = render_invoices(order_ids, workers=options["workers"])
+        if options["output"] == "-":
+            out = sys.stdout.buffer
+            for chunk in iter_invoice_zip(rendered):
+                out.write(chunk)
+            out.flush()
+        else:
+            with open(options["output"], "wb") as out:
+                for chunk in iter_invoice_zip(rendered):
+                    out.write(chunk)
+        self.stderr.write(self.style.SUCCESS(f"Packaged {len(order_ids)} invoice(s)."))
@@ -0,0 +1,78 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import DecimalField, F, Sum
+from orders.fake_stripe import generate_events, sign_payload
+from orders.models import Order
+from orders.webhooks import ingest_event, process_pending_events
+
+class Command(BaseCommand):
+    help = "Generate signed fake Stripe webhook events for existing orders and deliver them."
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=100, help="Number of most recent unpaid orders to use.")
+        parser.add_argument("--url", help="Webhook URL to POST to. Without it events are ingested in-process.")
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--seed", type=int)
+        parser.add_argument("--duplicate-rate", type=float, default=0.2)
+        parser.add_argument("--failure-rate", type=float, default=0.1)
+        parser.add_argument("--refund-rate", type=float, default=0.05)
+        parser.add_argument("--process", action="store_true", help="Drain the event queue afterwards.")
+    def handle(self, *args, **options):
+        orders = (
+            Order.objects.filter(paid=False)
+            .annotate(total=Sum(F("items__price") * F("items__quantity"), output_field=DecimalField()))
+            .order_by("-id")
+            .values_list("id", "total", "discount")[:options["orders"]]
+        )
+        pairs = [(pk, int(((total or 0) - discount) * 100)) for pk, total, discount in orders]
+        if not pairs:
+            raise CommandError("No unpaid orders to generate events for.")
+        events = list(generate_events(
+            pairs,
+            seed=options["seed"],
+            duplicate_rate=options["duplicate_rate"],
+            failure_rate=options["failure_rate"],
+            refund_rate=options["refund_rate"],
+        ))
+        secret = settings.STRIPE_WEBHOOK_SECRET
+        if options["url"]:
+            session = requests.Session()
+            def deliver(event):
+                payload = json.dumps(event).encode()
+                response = session.post(
+                    options["url"],
+                    data=payload,
+                    headers={"Stripe-Signature": sign_payload(payload, secret), "Content-Type": "application/json"},
+                    timeout=10,
+                )
+                return response.status_code
+        else:
+            def deliver(event):
+                payload = json.dumps(event).encode()
+                ingest_event(payload, sign_payload(payload, secret))
+                return 200
+        started = time.perf_counter()
+        if options["url"] and options["concurrency"] > 1:
+            with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+                codes = list(pool.map(deliver, events))
+        else:
+            codes = [deliver(event) for event in events]
+        elapsed = time.perf_counter() - started
+        failures = sum(1 for code in codes if code != 200)
+        self.stdout.write(
+            f"Delivered {len(events)} events for {len(pairs)} orders in {elapsed:.2f}s "
+            f"({len(events) / elapsed:.0f}/s), {failures} non-200 responses."
+        )
+        if options["process"]:
+            started = time.perf_counter()
+            handled = 0
+            while True:
+                count = process_pending_events(limit=500)
+                if not count:
+                    break
+                handled += count
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"Processed {handled} events in {elapsed:.2f}s.")
@@ -0,0 +1,21 @@
+import time
+from django.core.management.base import BaseCommand
+from orders.webhooks import process_pending_events
+
+class Command(BaseCommand):
+    help = "Process stored Stripe webhook events, retrying failures with backoff."
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Keep polling for new events.")
+        parser.add_argument("--interval", type=float, default=1.0, help="Seconds to sleep when idle.")
+        parser.add_argument("--batch", type=int, default=100)
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            handled = process_pending_events(limit=options["batch"])
+            total += handled
+            if handled:
+                continue
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+        self.stdout.write(f"Processed {total} event(s).")
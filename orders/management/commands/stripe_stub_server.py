@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from orders.fake_stripe import StubStripeServer
+
+class Command(BaseCommand):
+    help = "Run a local Stripe API stub; point STRIPE_API_BASE at it."
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=12111)
+        parser.add_argument("--delay", type=float, default=0.0, help="Seconds to wait before answering.")
+        parser.add_argument("--fail-rate", type=float, default=0.0, help="Share of requests answered with a 500.")
+        parser.add_argument("--seed", type=int)
+    def handle(self, *args, **options):
+        server = StubStripeServer(
+            (options["host"], options["port"]),
+            delay=options["delay"],
+            fail_rate=options["fail_rate"],
+            seed=options["seed"],
+        )
+        self.stdout.write(f"Stripe stub listening on {server.url} (STRIPE_API_BASE={server.url})")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
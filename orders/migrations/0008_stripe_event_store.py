@@ -0,0 +1,51 @@
+# Generated by Django 6.0 on 2026-10-19 16:55
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_payment_status(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    Order.objects.filter(paid=True).update(payment_status='PAID')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_orderstatusevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='payment_status',
+            field=models.CharField(choices=[('UNPAID', 'Unpaid'), ('PAID', 'Paid'), ('FAILED', 'Payment Failed'), ('PARTIALLY_REFUNDED', 'Partially Refunded'), ('REFUNDED', 'Refunded')], default='UNPAID', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='stripe_payment_intent',
+            field=models.CharField(blank=True, db_index=True, max_length=255, null=True),
+        ),
+        migrations.CreateModel(
+            name='StripeEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(max_length=255, unique=True)),
+                ('type', models.CharField(max_length=100)),
+                ('payload', models.JSONField()),
+                ('order_id', models.BigIntegerField(blank=True, null=True)),
+                ('stripe_created', models.DateTimeField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('processed', 'Processed'), ('skipped', 'Skipped'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True)),
+                ('received', models.DateTimeField(auto_now_add=True)),
+                ('processed', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['stripe_created', 'id'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='orders_stri_status_04637d_idx'), models.Index(fields=['order_id', 'stripe_created'], name='orders_stri_order_i_3e3acb_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_payment_status, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 6.0 on 2026-10-19 17:11
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_item_updated(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    OrderItem.objects.update(
+        updated=Subquery(Order.objects.filter(pk=OuterRef('order_id')).values('updated')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0008_stripe_event_store'),
+        ('store', '0015_watermark_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='updated',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_item_updated, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['updated', 'id'], name='order_updated_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['updated', 'id'], name='orderitem_updated_id_idx'),
+        ),
+    ]
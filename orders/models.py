@@ -13,6 +13,13 @@ class Order(models.Model):
         ("OUT_FOR_DELIVERY", "Out for Delivery"),
         ("DELIVERED", "Delivered"),
     ]
+    PAYMENT_STATUS_CHOICES = [
+        ("UNPAID", "Unpaid"),
+        ("PAID", "Paid"),
+        ("FAILED", "Payment Failed"),
+        ("PARTIALLY_REFUNDED", "Partially Refunded"),
+        ("REFUNDED", "Refunded"),
+    ]
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         related_name='orders',
@@ -29,6 +36,12 @@ class Order(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
     paid = models.BooleanField(default=False)
+    payment_status = models.CharField(
+        max_length=20,
+        choices=PAYMENT_STATUS_CHOICES,
+        default="UNPAID"
+    )
+    stripe_payment_intent = models.CharField(max_length=255, blank=True, null=True, db_index=True)
     status = models.CharField(
         max_length=20,
         choices=STATUS_CHOICES,
@@ -55,6 +68,7 @@ class Order(models.Model):
     discount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     class Meta:
         ordering = ['-created']
+        indexes = [models.Index(fields=['updated', 'id'], name='order_updated_id_idx')]
     def __str__(self):
         return f'Order {self.id}'
     def get_total_before_discount(self):
@@ -92,7 +106,60 @@ class OrderItem(models.Model):
     )
     quantity = models.PositiveIntegerField(default=1)
     price = models.DecimalField(max_digits=10, decimal_places=2)
+    updated = models.DateTimeField(auto_now=True)
+    class Meta:
+        indexes = [models.Index(fields=['updated', 'id'], name='orderitem_updated_id_idx')]
     def __str__(self):
         return f'{self.product.name} ({self.quantity})'
     def get_cost(self):
-        return self.price * self.quantity
\ No newline at end of file
+        return self.price * self.quantity
+class OrderStatusEvent(models.Model):
+    order = models.ForeignKey(
+        Order,
+        related_name='status_events',
+        on_delete=models.CASCADE
+    )
+    from_status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    to_status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name='order_status_events',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True
+    )
+    source = models.CharField(max_length=20, default='admin')
+    note = models.CharField(max_length=255, blank=True)
+    created = models.DateTimeField(default=timezone.now)
+    class Meta:
+        ordering = ['created', 'id']
+        indexes = [models.Index(fields=['order', 'created'])]
+    def __str__(self):
+        return f'Order {self.order_id}: {self.from_status} → {self.to_status}'
+class StripeEvent(models.Model):
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("processing", "Processing"),
+        ("processed", "Processed"),
+        ("skipped", "Skipped"),
+        ("failed", "Failed"),
+    ]
+    event_id = models.CharField(max_length=255, unique=True)
+    type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    order_id = models.BigIntegerField(null=True, blank=True)
+    stripe_created = models.DateTimeField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    received = models.DateTimeField(auto_now_add=True)
+    processed = models.DateTimeField(null=True, blank=True)
+    class Meta:
+        ordering = ['stripe_created', 'id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+            models.Index(fields=['order_id', 'stripe_created']),
+        ]
+    def __str__(self):
+        return f'{self.type} ({self.event_id})'
@@ -0,0 +1,276 @@
+"""
+Stripe access for checkout and payment intents.
+
+All outbound Stripe calls go through ``gateway`` so that every worker reuses
+one keep-alive connection pool, requests are bounded by explicit connect and
+read timeouts, transient failures are retried with a stable idempotency key,
+and a circuit breaker fails fast (callers then offer Cash on Delivery) while
+Stripe is slow or down. Async views use the ``acreate_*`` methods instead.
+Under ASGI (``long_lived_loops``, set in ``asgi.py``) those go through
+``acall`` and an httpx client per event loop with the same timeouts, retries
+and breaker, so waiting on Stripe doesn't hold a worker thread. Under WSGI
+each async view runs on a loop that ends with the request, so they run the
+sync methods in a thread instead and keep using the pooled connections.
+The Stripe SDK, with requests and httpx, is imported on first use rather
+than when the URLconf loads.
+"""
+import asyncio
+import logging
+import threading
+import time
+import uuid
+import weakref
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from PrimeStore.metrics import observe_external
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class PaymentGatewayError(Exception):
+    pass
+class PaymentGatewayUnavailable(PaymentGatewayError):
+    """Stripe can't be reached right now; offer another payment method."""
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+    def _state(self):
+        if self._opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+    def allow(self):
+        """The state a call goes out in, or ``None`` if it may not; half-open lets a single probe through."""
+        with self._lock:
+            state = self._state()
+            if state == self.CLOSED:
+                return state
+            if state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return state
+            return None
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+    def release(self):
+        """End a probe that neither reached Stripe nor failed there (a bug, a cancelled request)."""
+        with self._lock:
+            self._probing = False
+class LatencyStats:
+    """Per-operation call counts, errors and a cumulative latency histogram."""
+    def __init__(self, buckets=LATENCY_BUCKETS, service=None):
+        self.buckets = buckets
+        self.service = service
+        self._data = {}
+        self._lock = threading.Lock()
+    def observe(self, operation, seconds, outcome):
+        if self.service:
+            observe_external(self.service, operation, seconds, outcome)
+        with self._lock:
+            entry = self._data.setdefault(operation, {
+                "count": 0,
+                "errors": 0,
+                "sum": 0.0,
+                "max": 0.0,
+                "buckets": [0] * len(self.buckets),
+            })
+            entry["count"] += 1
+            entry["sum"] += seconds
+            entry["max"] = max(entry["max"], seconds)
+            if outcome != "ok":
+                entry["errors"] += 1
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    entry["buckets"][i] += 1
+    def snapshot(self):
+        with self._lock:
+            return {
+                op: dict(entry, buckets=dict(zip(self.buckets, entry["buckets"])))
+                for op, entry in self._data.items()
+            }
+class StripeGateway:
+    def __init__(self, api_key, api_base=None, connect_timeout=3.0, read_timeout=10.0,
+                 max_retries=2, pool_size=10, breaker=None):
+        self.api_key = api_key
+        self.api_base = api_base
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.pool_size = pool_size
+        self.breaker = breaker or CircuitBreaker()
+        self.stats = LatencyStats(service="stripe")
+        self._http_client = None
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.long_lived_loops = False
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            api_key=settings.STRIPE_SECRET_KEY,
+            api_base=getattr(settings, "STRIPE_API_BASE", None),
+            connect_timeout=getattr(settings, "STRIPE_CONNECT_TIMEOUT", 3.0),
+            read_timeout=getattr(settings, "STRIPE_READ_TIMEOUT", 10.0),
+            max_retries=getattr(settings, "STRIPE_MAX_RETRIES", 2),
+            pool_size=getattr(settings, "STRIPE_POOL_SIZE", 10),
+            breaker=CircuitBreaker(
+                failure_threshold=getattr(settings, "STRIPE_BREAKER_THRESHOLD", 5),
+                reset_timeout=getattr(settings, "STRIPE_BREAKER_RESET", 30.0),
+            ),
+        )
+    def _client(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+        import stripe
+        with self._lock:
+            if self._http_client is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._http_client = stripe.RequestsClient(timeout=self.timeout, session=session)
+                stripe.default_http_client = self._http_client
+                # Retries are ours, so each attempt is timed and counted.
+                stripe.max_network_retries = 0
+                if self.api_base:
+                    stripe.api_base = self.api_base
+            return self._http_client
+    def _async_client(self):
+        # httpx connections belong to the loop that opened them; uvicorn keeps
+        # one loop per worker, so each worker has one pool.
+        import httpx
+        import stripe
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = stripe.StripeClient(
+                self.api_key,
+                base_addresses={"api": self.api_base} if self.api_base else None,
+                max_network_retries=0,
+                http_client=stripe.HTTPXClient(timeout=httpx.Timeout(self.timeout[1], connect=self.timeout[0])),
+            )
+            self._async_clients[loop] = client
+        return client
+    def available(self):
+        return self.breaker.state != CircuitBreaker.OPEN
+    def _retryable(self, exc):
+        import stripe
+        if isinstance(exc, (stripe.APIConnectionError, stripe.RateLimitError)):
+            return True
+        status = getattr(exc, "http_status", None)
+        return isinstance(exc, stripe.APIError) and (status is None or status >= 500)
+    def _start(self, operation, idempotency_key):
+        admitted = self.breaker.allow()
+        if admitted is None:
+            self.stats.observe(operation, 0.0, "circuit_open")
+            raise PaymentGatewayUnavailable("Payment gateway temporarily unavailable")
+        return idempotency_key or f"{operation}-{uuid.uuid4().hex}", admitted == CircuitBreaker.HALF_OPEN
+    def _succeeded(self, operation, elapsed):
+        self.breaker.record_success()
+        self.stats.observe(operation, elapsed, "ok")
+        logger.info("Stripe %s succeeded in %.3fs", operation, elapsed)
+    def _failed(self, operation, exc, elapsed, attempt):
+        """Record a failed attempt and return the backoff before the next one, or raise."""
+        if not self._retryable(exc):
+            # The request reached Stripe and was rejected: not an outage.
+            self.breaker.record_success()
+            self.stats.observe(operation, elapsed, "rejected")
+            raise PaymentGatewayError(str(exc)) from exc
+        self.stats.observe(operation, elapsed, "error")
+        logger.warning("Stripe %s failed (attempt %s): %s", operation, attempt + 1, exc)
+        if attempt >= self.max_retries:
+            self.breaker.record_failure()
+            raise PaymentGatewayUnavailable(str(exc)) from exc
+        return min(0.25 * 2 ** (attempt + 1), 2.0)
+    def call(self, operation, func, idempotency_key=None, **params):
+        """
+        Invoke a Stripe resource method with timeouts, retries and the circuit
+        breaker applied. Retries reuse one idempotency key, so Stripe never
+        performs the operation twice.
+        """
+        import stripe
+        self._client()
+        idempotency_key, probe = self._start(operation, idempotency_key)
+        attempt = 0
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    result = func(
+                        api_key=self.api_key,
+                        idempotency_key=idempotency_key,
+                        **params,
+                    )
+                except stripe.StripeError as exc:
+                    time.sleep(self._failed(operation, exc, time.perf_counter() - started, attempt))
+                    attempt += 1
+                    continue
+                self._succeeded(operation, time.perf_counter() - started)
+                return result
+        finally:
+            # Otherwise a probe that raised anything else would block every later call.
+            if probe:
+                self.breaker.release()
+    async def acall(self, operation, method, idempotency_key=None, **params):
+        """
+        ``call`` for async views: ``method`` picks the async create method off
+        this loop's ``StripeClient``, e.g. ``lambda c: c.v1.payment_intents.create_async``.
+        """
+        import stripe
+        client = self._async_client()
+        idempotency_key, probe = self._start(operation, idempotency_key)
+        attempt = 0
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    result = await method(client)(params=params, options={"idempotency_key": idempotency_key})
+                except stripe.StripeError as exc:
+                    await asyncio.sleep(self._failed(operation, exc, time.perf_counter() - started, attempt))
+                    attempt += 1
+                    continue
+                self._succeeded(operation, time.perf_counter() - started)
+                return result
+        finally:
+            # Including CancelledError, when the client disconnects or the view times out.
+            if probe:
+                self.breaker.release()
+    async def _in_thread(self, func, idempotency_key, **params):
+        return await sync_to_async(func, thread_sensitive=False)(idempotency_key, **params)
+    def create_checkout_session(self, idempotency_key=None, **params):
+        import stripe
+        return self.call("checkout_session", stripe.checkout.Session.create, idempotency_key, **params)
+    def create_payment_intent(self, idempotency_key=None, **params):
+        import stripe
+        return self.call("payment_intent", stripe.PaymentIntent.create, idempotency_key, **params)
+    async def acreate_checkout_session(self, idempotency_key=None, **params):
+        if not self.long_lived_loops:
+            return await self._in_thread(self.create_checkout_session, idempotency_key, **params)
+        return await self.acall(
+            "checkout_session", lambda client: client.v1.checkout.sessions.create_async, idempotency_key, **params
+        )
+    async def acreate_payment_intent(self, idempotency_key=None, **params):
+        if not self.long_lived_loops:
+            return await self._in_thread(self.create_payment_intent, idempotency_key, **params)
+        return await self.acall(
+            "payment_intent", lambda client: client.v1.payment_intents.create_async, idempotency_key, **params
+        )
+gateway = StripeGateway.from_settings()
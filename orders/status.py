@@ -0,0 +1,90 @@
+from django.db import transaction
+from django.utils import timezone
+from .models import Order, OrderStatusEvent
+
+TRANSITIONS = {
+    "PLACED": ("PACKED",),
+    "PACKED": ("SHIPPED",),
+    "SHIPPED": ("OUT_FOR_DELIVERY", "DELIVERED"),
+    "OUT_FOR_DELIVERY": ("DELIVERED",),
+    "DELIVERED": (),
+}
+STATUS_LABELS = dict(Order.STATUS_CHOICES)
+
+class InvalidTransition(Exception):
+    pass
+def can_transition(from_status, to_status):
+    return to_status in TRANSITIONS.get(from_status, ())
+def allowed_sources(to_status):
+    return [s for s, targets in TRANSITIONS.items() if to_status in targets]
+def transition_order(order, to_status, user=None, source="web", note=""):
+    """Move a single order to ``to_status`` and record the event."""
+    result = bulk_transition([order.pk], to_status, user=user, source=source, note=note)
+    if order.pk in result["rejected"]:
+        raise InvalidTransition(result["rejected"][order.pk])
+    order.status = to_status
+    order.updated = result["timestamp"]
+    return order
+def bulk_transition(order_ids, to_status, user=None, source="admin", note=""):
+    """
+    Validate and apply a status change set-based: one locking SELECT, one
+    UPDATE and one bulk INSERT into the event log, however many orders.
+    Returns the ids that moved and a ``{id: reason}`` map of the rest.
+    """
+    if to_status not in TRANSITIONS:
+        raise InvalidTransition(f"Unknown status {to_status!r}")
+    order_ids = set(order_ids)
+    rejected = {}
+    now = timezone.now()
+    with transaction.atomic():
+        current = dict(
+            Order.objects.select_for_update()
+            .filter(pk__in=order_ids)
+            .values_list("pk", "status")
+        )
+        for pk in order_ids - current.keys():
+            rejected[pk] = "Order not found"
+        movable = {}
+        for pk, status in current.items():
+            if can_transition(status, to_status):
+                movable[pk] = status
+            else:
+                rejected[pk] = f"Cannot move from {status} to {to_status}"
+        if movable:
+            Order.objects.filter(pk__in=movable.keys()).update(status=to_status, updated=now)
+            OrderStatusEvent.objects.bulk_create(
+                [
+                    OrderStatusEvent(
+                        order_id=pk,
+                        from_status=from_status,
+                        to_status=to_status,
+                        actor=user if user is not None and user.is_authenticated else None,
+                        source=source,
+                        note=note,
+                        created=now,
+                    )
+                    for pk, from_status in movable.items()
+                ],
+                batch_size=1000,
+            )
+    return {"updated": sorted(movable), "rejected": rejected, "timestamp": now}
+def order_timeline(order):
+    """The order's status history, starting with its creation."""
+    timeline = [{
+        "status": "PLACED",
+        "label": STATUS_LABELS["PLACED"],
+        "from_status": None,
+        "at": order.created,
+        "source": "checkout",
+        "note": "",
+    }]
+    for event in order.status_events.all():
+        timeline.append({
+            "status": event.to_status,
+            "label": STATUS_LABELS.get(event.to_status, event.to_status),
+            "from_status": event.from_status,
+            "at": event.created,
+            "source": event.source,
+            "note": event.note,
+        })
+    return timeline
@@ -0,0 +1,16 @@
+from datetime import timedelta
+from jobs.queue import task
+from .invoices import get_invoice
+from .models import Order
+from .webhooks import process_pending_events
+
+@task("orders.process_stripe_events", priority=10, every=timedelta(seconds=30))
+def process_stripe_events(batch=100):
+    # Retries come due on their own schedule, so the periodic run picks them up.
+    while process_pending_events(limit=batch):
+        pass
+@task("orders.render_invoice", priority=-5)
+def render_invoice(order_id):
+    order = Order.objects.filter(pk=order_id).first()
+    if order is not None:
+        get_invoice(order)
@@ -1,3 +1,365 @@
-from django.test import TestCase
+import asyncio
+import json
+import tempfile
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth.models import User
+from django.db import DatabaseError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from accounts.models import Address
+from jobs.models import Job
+from PrimeStore.testing import QueryBudgetMixin
+from store.cart import Cart
+from store.models import Category, Product
+from . import invoices, webhooks
+from .fake_stripe import StubStripeServer, charge, checkout_session, make_event, payment_intent, sign_payload
+from .models import Order, OrderItem, OrderStatusEvent, StripeEvent
+from .payments import CircuitBreaker, PaymentGatewayUnavailable, StripeGateway
+from .status import InvalidTransition, bulk_transition, transition_order
 
-# Create your tests here.
+class OrderQueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("buyer", "buyer@example.com", "pass")
+        category = Category.objects.create(name="Phones", slug="phones")
+        products = [
+            Product.objects.create(
+                category=category, name=f"Phone {i}", slug=f"phone-{i}",
+                price=Decimal("100.00"), image="products/phone.jpg", stock=10,
+            )
+            for i in range(4)
+        ]
+        cls.products = products
+        cls.orders = []
+        for i in range(5):
+            order = Order.objects.create(
+                user=cls.user, first_name="Buyer", last_name="One", email=cls.user.email,
+                address="1 Main St", postal_code="10001", city="Pune",
+            )
+            for product in products:
+                OrderItem.objects.create(order=order, product=product, price=product.price, quantity=1)
+            cls.orders.append(order)
+    def setUp(self):
+        self.client.force_login(self.user)
+    def test_order_history(self):
+        self.assertQueryBudget(5, "/orders/history/")
+        self.assertQueryBudget(5, "/accounts/orders/")
+    def test_order_detail(self):
+        self.assertQueryBudget(6, f"/orders/{self.orders[0].pk}/")
+    def test_order_create_cod(self):
+        address = Address.objects.create(
+            user=self.user, full_name="Buyer One", phone="9999999999", address="1 Main St",
+            city="Pune", postal_code="411001", state="MH",
+        )
+        session = self.client.session
+        session[Cart.SESSION_KEY] = {
+            str(product.pk): {"quantity": 1, "price": str(product.price)} for product in self.products
+        }
+        session.save()
+        response = self.client.post("/orders/create/", {"selected_address": address.pk, "payment_method": "COD"})
+        order = Order.objects.latest("id")
+        self.assertRedirects(response, f"/orders/{order.pk}/", fetch_redirect_response=False)
+        self.assertEqual(order.status, "PLACED")
+        self.assertEqual(order.items.count(), len(self.products))
+    def test_stripe_success_replay_keeps_status(self):
+        order = self.orders[0]
+        for status in ("PACKED", "SHIPPED"):
+            transition_order(order, status)
+        Order.objects.filter(pk=order.pk).update(paid=True, payment_status="REFUNDED")
+        response = self.client.get("/orders/stripe/success/", {"order_id": order.pk})
+        self.assertEqual(response.status_code, 200)
+        order.refresh_from_db()
+        self.assertEqual(order.status, "SHIPPED")
+        self.assertEqual(order.status_events.count(), 2)
+        self.assertEqual(order.payment_status, "REFUNDED")
+        self.assertEqual(response.context["order"].payment_status, "REFUNDED")
+    def test_stripe_success_leaves_payment_to_webhooks(self):
+        order = self.orders[1]
+        response = self.client.get("/orders/stripe/success/", {"order_id": order.pk})
+        self.assertEqual(response.status_code, 200)
+        order.refresh_from_db()
+        self.assertFalse(order.paid)
+        self.assertEqual(order.payment_status, Order._meta.get_field("payment_status").default)
+        self.assertFalse(Job.objects.exists())
+class OrderStatusTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("buyer", "buyer@example.com", "pass")
+        cls.orders = [
+            Order.objects.create(
+                user=cls.user, first_name="Buyer", last_name="One", email=cls.user.email,
+                address="1 Main St", postal_code="10001", city="Pune",
+            )
+            for _ in range(5)
+        ]
+    def test_illegal_transition_rejected(self):
+        order = self.orders[0]
+        for status in ("PACKED", "SHIPPED", "DELIVERED"):
+            transition_order(order, status)
+        with self.assertRaises(InvalidTransition):
+            transition_order(order, "PLACED")
+        order.refresh_from_db()
+        self.assertEqual(order.status, "DELIVERED")
+        self.assertEqual(order.status_events.count(), 3)
+    def test_bulk_transition_is_set_based(self):
+        ids = [order.pk for order in self.orders]
+        # SELECT ... FOR UPDATE, one UPDATE and one bulk INSERT, inside a savepoint.
+        with self.assertNumQueries(5):
+            result = bulk_transition(ids, "PACKED")
+        self.assertEqual(result["updated"], sorted(ids))
+        self.assertEqual(Order.objects.filter(status="PACKED").count(), len(ids))
+        self.assertEqual(OrderStatusEvent.objects.filter(to_status="PACKED").count(), len(ids))
+        result = bulk_transition(ids + [0], "PACKED")
+        self.assertEqual(result["updated"], [])
+        self.assertEqual(set(result["rejected"]), set(ids) | {0})
+class CircuitBreakerTests(SimpleTestCase):
+    RESET = 0.2
+    def setUp(self):
+        import stripe
+        saved = stripe.api_base, stripe.default_http_client, stripe.max_network_retries
+        def restore():
+            stripe.api_base, stripe.default_http_client, stripe.max_network_retries = saved
+        self.addCleanup(restore)
+        self.server = StubStripeServer(address=("127.0.0.1", 0), fail_rate=1.0)
+        self.server.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=self.RESET)
+        self.gateway = StripeGateway(
+            "sk_test_stub", api_base=self.server.url, read_timeout=2.0, max_retries=0, breaker=self.breaker,
+        )
+    def pay(self):
+        return self.gateway.create_payment_intent(amount=1000, currency="inr")
+    def fail(self):
+        with self.assertLogs("orders.payments", "WARNING"), self.assertRaises(PaymentGatewayUnavailable):
+            self.pay()
+    def open_breaker(self):
+        for _ in range(2):
+            self.fail()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.gateway.available())
+    def test_opens_after_threshold(self):
+        self.fail()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.fail()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        sent = self.server.request_count
+        with self.assertRaises(PaymentGatewayUnavailable):
+            self.pay()
+        self.assertEqual(self.server.request_count, sent)
+    def test_half_open_probe_recovers(self):
+        self.open_breaker()
+        time.sleep(self.RESET)
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.server.fail_rate = 0.0
+        self.assertTrue(self.pay()["id"].startswith("pi_fake_"))
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+    def test_failed_probe_reopens(self):
+        self.open_breaker()
+        time.sleep(self.RESET)
+        self.fail()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+    def test_one_probe_at_a_time(self):
+        self.open_breaker()
+        time.sleep(self.RESET)
+        self.server.fail_rate = 0.0
+        # Another request's probe is in flight.
+        self.assertEqual(self.breaker.allow(), CircuitBreaker.HALF_OPEN)
+        sent = self.server.request_count
+        with self.assertRaises(PaymentGatewayUnavailable):
+            self.pay()
+        self.assertEqual(self.server.request_count, sent)
+        self.breaker.record_success()
+        self.pay()
+        self.assertEqual(self.server.request_count, sent + 1)
+    def test_probe_released_after_other_exception(self):
+        self.open_breaker()
+        time.sleep(self.RESET)
+        def broken(**params):
+            raise RuntimeError("bug")
+        with self.assertRaises(RuntimeError):
+            self.gateway.call("payment_intent", broken)
+        self.server.fail_rate = 0.0
+        self.pay()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+    def test_probe_released_when_cancelled(self):
+        self.open_breaker()
+        time.sleep(self.RESET)
+        hang = lambda client: lambda **kwargs: asyncio.sleep(10)
+        async def probe():
+            await asyncio.wait_for(self.gateway.acall("payment_intent", hang), 0.05)
+        with self.assertRaises(asyncio.TimeoutError):
+            asyncio.run(probe())
+        self.server.fail_rate = 0.0
+        self.pay()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+@override_settings(STRIPE_WEBHOOK_SECRET="whsec_test")
+class StripeWebhookTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user("buyer", "buyer@example.com", "pass")
+        cls.order = Order.objects.create(
+            user=user, first_name="Buyer", last_name="One", email=user.email,
+            address="1 Main St", postal_code="10001", city="Pune",
+        )
+    def post(self, event, secret="whsec_test"):
+        payload = json.dumps(event).encode()
+        return self.client.post(
+            "/orders/stripe/webhook/", payload, content_type="application/json",
+            HTTP_STRIPE_SIGNATURE=sign_payload(payload, secret),
+        )
+    def deliver(self, *events):
+        for event in events:
+            webhooks.store_event(event)
+        return webhooks.process_pending_events()
+    def event(self, event_type, obj, seconds=0):
+        return make_event(event_type, obj, created=time.time() + seconds)
+    def broken(self, event_type):
+        return mock.patch.dict(webhooks.HANDLERS, {event_type: mock.Mock(side_effect=RuntimeError)})
+    def test_ingest_dedupes_event_id(self):
+        event = self.event("payment_intent.succeeded", payment_intent(self.order.pk, 10000))
+        self.assertEqual(self.post(event).status_code, 200)
+        self.assertEqual(self.post(event).status_code, 200)
+        stored = StripeEvent.objects.get()
+        self.assertEqual((stored.event_id, stored.order_id, stored.status), (event["id"], self.order.pk, "pending"))
+        self.assertEqual(Job.objects.filter(task="orders.process_stripe_events").count(), 1)
+    def test_unsigned_payload_is_bad_request(self):
+        event = self.event("payment_intent.succeeded", payment_intent(self.order.pk, 10000))
+        self.assertEqual(self.post(event, secret="whsec_other").status_code, 400)
+        self.assertFalse(StripeEvent.objects.exists())
+    def test_storage_error_is_server_error(self):
+        self.client.raise_request_exception = False
+        event = self.event("payment_intent.succeeded", payment_intent(self.order.pk, 10000))
+        with mock.patch.object(webhooks, "store_event", side_effect=DatabaseError), self.assertLogs("django.request"):
+            self.assertEqual(self.post(event).status_code, 500)
+    def test_payment_succeeded(self):
+        self.deliver(self.event("payment_intent.succeeded", payment_intent(self.order.pk, 10000, intent_id="pi_1")))
+        self.order.refresh_from_db()
+        self.assertEqual((self.order.paid, self.order.payment_status), (True, "PAID"))
+        self.assertEqual(self.order.stripe_payment_intent, "pi_1")
+        self.assertTrue(Job.objects.filter(task="orders.render_invoice").exists())
+    def test_payment_failed(self):
+        failed = payment_intent(self.order.pk, 10000, status="requires_payment_method")
+        self.deliver(self.event("payment_intent.payment_failed", failed))
+        self.order.refresh_from_db()
+        self.assertEqual((self.order.paid, self.order.payment_status), (False, "FAILED"))
+        # A late failure doesn't undo a payment.
+        self.deliver(self.event("payment_intent.succeeded", payment_intent(self.order.pk, 10000), 1))
+        self.deliver(self.event("payment_intent.payment_failed", failed, 2))
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.payment_status, "PAID")
+        self.assertEqual(StripeEvent.objects.latest("stripe_created").status, "skipped")
+    def test_checkout_session_completed(self):
+        self.deliver(self.event("checkout.session.completed", checkout_session(self.order.pk, 10000, paid=False)))
+        self.order.refresh_from_db()
+        self.assertEqual((self.order.paid, self.order.stripe_payment_intent), (False, f"pi_fake_{self.order.pk}"))
+        self.deliver(self.event("checkout.session.completed", checkout_session(self.order.pk, 10000), 1))
+        self.order.refresh_from_db()
+        self.assertEqual((self.order.paid, self.order.payment_status), (True, "PAID"))
+    def test_refunds(self):
+        self.deliver(self.event("payment_intent.succeeded", payment_intent(self.order.pk, 10000)))
+        self.deliver(self.event("charge.refunded", charge(self.order.pk, 10000, 4000), 1))
+        self.order.refresh_from_db()
+        self.assertEqual((self.order.paid, self.order.payment_status), (True, "PARTIALLY_REFUNDED"))
+        # Without the amounts only Stripe's flag can say the refund is full.
+        bare = {"id": "ch_1", "object": "charge", "payment_intent": f"pi_fake_{self.order.pk}"}
+        self.deliver(self.event("charge.refunded", bare, 2))
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.payment_status, "PARTIALLY_REFUNDED")
+        self.deliver(self.event("charge.refunded", charge(self.order.pk, 10000, 10000), 3))
+        self.order.refresh_from_db()
+        self.assertEqual((self.order.paid, self.order.payment_status), (False, "REFUNDED"))
+    def test_failing_event_backs_off_then_fails(self):
+        event = self.event("payment_intent.succeeded", payment_intent(self.order.pk, 10000))
+        broken = self.broken("payment_intent.succeeded")
+        with broken, self.assertLogs("orders.webhooks", "ERROR"):
+            self.deliver(event)
+        stored = StripeEvent.objects.get()
+        self.assertEqual((stored.status, stored.attempts), ("pending", 1))
+        self.assertIn("RuntimeError", stored.last_error)
+        delay = stored.next_attempt_at - timezone.now()
+        self.assertTrue(timedelta(seconds=25) < delay <= timedelta(seconds=webhooks.RETRY_BASE_SECONDS))
+        self.assertEqual(webhooks.process_pending_events(), 0)
+        StripeEvent.objects.update(attempts=webhooks.MAX_ATTEMPTS - 1, next_attempt_at=timezone.now())
+        with broken, self.assertLogs("orders.webhooks", "ERROR"):
+            webhooks.process_pending_events()
+        self.assertEqual(StripeEvent.objects.get().status, "failed")
+    def test_later_event_waits_for_earlier_one(self):
+        failed = self.event(
+            "payment_intent.payment_failed", payment_intent(self.order.pk, 10000, status="requires_payment_method")
+        )
+        succeeded = self.event("payment_intent.succeeded", payment_intent(self.order.pk, 10000), 1)
+        broken = self.broken("payment_intent.payment_failed")
+        with broken, self.assertLogs("orders.webhooks", "ERROR"):
+            self.deliver(succeeded, failed)
+        self.assertEqual(StripeEvent.objects.get(event_id=succeeded["id"]).status, "pending")
+        self.assertEqual(webhooks.process_pending_events(), 0)
+        self.order.refresh_from_db()
+        self.assertFalse(self.order.paid)
+        StripeEvent.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(webhooks.process_pending_events(), 2)
+        self.order.refresh_from_db()
+        # Applied in Stripe's order, the success wins over the earlier failure.
+        self.assertEqual((self.order.paid, self.order.payment_status), (True, "PAID"))
+class InvoiceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("buyer", "buyer@example.com", "pass")
+        category = Category.objects.create(name="Phones", slug="phones")
+        product = Product.objects.create(
+            category=category, name="Phone", slug="phone", price=Decimal("100.00"), stock=10,
+        )
+        cls.order = Order.objects.create(
+            user=cls.user, first_name="Buyer", last_name="One", email=cls.user.email,
+            address="1 Main St", postal_code="10001", city="Pune",
+        )
+        OrderItem.objects.create(order=cls.order, product=product, price=product.price, quantity=2)
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=root.name))
+        self.draw = self.enterContext(mock.patch.object(invoices, "_draw_invoice", wraps=invoices._draw_invoice))
+        self.client.force_login(self.user)
+        self.url = f"/orders/{self.order.pk}/invoice/"
+    def download(self, **headers):
+        response = self.client.get(self.url, **headers)
+        body = b"".join(response.streaming_content) if response.streaming else response.content
+        return response, body
+    def test_cache_hit_and_miss(self):
+        response, pdf = self.download()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(pdf.startswith(b"%PDF"))
+        self.assertEqual(self.draw.call_count, 1)
+        path = invoices.invoice_path(self.order)
+        self.assertEqual(path.read_bytes(), pdf)
+        self.assertEqual(self.download()[1], pdf)
+        self.assertEqual(self.draw.call_count, 1)
+    def test_regenerated_after_order_changes(self):
+        self.download()
+        old_path = invoices.invoice_path(self.order)
+        self.order.tracking_number = "TRK123"
+        self.order.save()
+        self.download()
+        self.assertEqual(self.draw.call_count, 2)
+        self.assertFalse(old_path.exists())
+        self.assertTrue(invoices.invoice_path(self.order).exists())
+    def test_ranges(self):
+        _, pdf = self.download()
+        size = len(pdf)
+        response, body = self.download(HTTP_RANGE="bytes=0-9")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 0-9/{size}")
+        self.assertEqual(body, pdf[:10])
+        response, body = self.download(HTTP_RANGE="bytes=-10")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes {size - 10}-{size - 1}/{size}")
+        self.assertEqual(body, pdf[-10:])
+        response, _ = self.download(HTTP_RANGE=f"bytes={size}-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{size}")
+        # A Range for an older version of the file gets the whole new one.
+        response, body = self.download(HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"stale"')
+        self.assertEqual((response.status_code, body), (200, pdf))
@@ -1,23 +1,29 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse
 from django.http import HttpResponse
-from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_exempt
 from store.cart import Cart
+from dashboard.rollups import record_order_placed
 from accounts.models import Address
 from .models import Order, OrderItem
-from reportlab.pdfgen import canvas
-import stripe
+from .status import order_timeline
+from .invoices import get_invoice, invoice_filename
+from .webhooks import ingest_event
+from .payments import gateway, PaymentGatewayError
+from PrimeStore.ranges import ranged_file_response
 
-stripe.api_key = settings.STRIPE_SECRET_KEY
 @login_required
 def order_history(request):
-    orders = Order.objects.filter(user=request.user).order_by('-created')
+    orders = Order.objects.filter(user=request.user).prefetch_related('items__product').order_by('-created')
     return render(request, 'accounts/order_history.html', {'orders': orders})
-@login_required
-def order_create(request):
+def _order_create(request):
+    """
+    Everything ``order_create`` does except the Stripe call: returns either a
+    response, or the new order and its line items when it must go to Stripe.
+    """
     cart = Cart(request)
     if len(cart) == 0:
         messages.error(request, "Your cart is empty.")
@@ -30,6 +36,9 @@ def order_create(request):
             messages.error(request, "Please select a delivery address.")
             return redirect("orders:order_create")
         address = get_object_or_404(Address, id=selected_address_id, user=request.user)
+        if payment_method != "COD" and not gateway.available():
+            messages.warning(request, "Online payments are temporarily unavailable. Please choose Cash on Delivery.")
+            return redirect("orders:order_create")
         full_name_parts = address.full_name.split()
         first_name = full_name_parts[0] if full_name_parts else ""
         last_name = " ".join(full_name_parts[1:]) if len(full_name_parts) > 1 else ""
@@ -54,6 +63,7 @@ def order_create(request):
             order.status = "PLACED"
             order.paid = False
             order.save()
+            record_order_placed(order)
             cart.clear()
             messages.success(request, "Order placed successfully with Cash on Delivery.")
             return redirect("orders:order_detail", order_id=order.id)
@@ -68,7 +78,25 @@ def order_create(request):
             }
             for item in cart
         ]
-        session = stripe.checkout.Session.create(
+        return order, line_items
+    return render(request, "orders/order_create.html", {
+        "cart": cart,
+        "addresses": addresses,
+        "online_payments_available": gateway.available(),
+    })
+def _abandon_order(request, order):
+    # No payment was started, so drop the order and keep the cart.
+    order.delete()
+    messages.warning(request, "We couldn't reach the payment gateway. Please try again or choose Cash on Delivery.")
+@login_required
+async def order_create(request):
+    result = await sync_to_async(_order_create)(request)
+    if isinstance(result, HttpResponse):
+        return result
+    order, line_items = result
+    try:
+        session = await gateway.acreate_checkout_session(
+            idempotency_key=f"order-{order.id}-checkout",
             payment_method_types=["card"],
             line_items=line_items,
             mode="payment",
@@ -76,56 +104,54 @@ def order_create(request):
                 reverse("orders:stripe_success")
             ) + f"?order_id={order.id}",
             cancel_url=request.build_absolute_uri(reverse("orders:stripe_cancel")),
+            client_reference_id=str(order.id),
+            metadata={"order_id": str(order.id)},
+            payment_intent_data={"metadata": {"order_id": str(order.id)}},
         )
-        return redirect(session.url, code=303)
-    return render(request, "orders/order_create.html", {
-        "cart": cart,
-        "addresses": addresses,
-    })
+    except PaymentGatewayError:
+        await sync_to_async(_abandon_order)(request, order)
+        return redirect("orders:order_create")
+    await sync_to_async(record_order_placed)(order)
+    return redirect(session.url, code=303)
 @login_required
 def order_detail(request, order_id):
-    order = get_object_or_404(Order, id=order_id, user=request.user)
-    return render(request, "orders/order_details.html", {"order": order})
+    order = get_object_or_404(
+        Order.objects.prefetch_related("items__product", "status_events"), id=order_id, user=request.user
+    )
+    return render(request, "orders/order_details.html", {
+        "order": order,
+        "timeline": order_timeline(order),
+    })
 @login_required
 def stripe_success(request):
     order_id = request.GET.get("order_id")
     if not order_id:
         messages.error(request, "Missing order ID in payment callback.")
         return redirect("store:product_list")
+    # Anyone can open this URL, so it changes nothing on the order: payment
+    # is recorded from Stripe's webhooks, which also queue the invoice.
     order = get_object_or_404(Order, id=order_id, user=request.user)
-    order.paid = True
-    order.status = "PLACED"
-    order.save()
     cart = Cart(request)
     cart.clear()
     return render(request, "orders/stripe_success.html", {"order": order})
 @login_required
 def invoice_pdf(request, order_id):
     order = get_object_or_404(Order, id=order_id, user=request.user)
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename=\"invoice_{order.id}.pdf\""'
-    p = canvas.Canvas(response)
-    p.setFont("Helvetica-Bold", 20)
-    p.drawString(200, 800, "PrimeStore Invoice")
-    p.setFont("Helvetica", 12)
-    p.drawString(50, 760, f"Order ID: {order.id}")
-    p.drawString(50, 740, f"Tracking Number: {getattr(order, 'tracking_number', '')}")
-    p.drawString(50, 720, f"Customer Email: {order.email}")
-    p.drawString(50, 700, f"Order Date: {order.created.strftime('%d-%m-%Y %H:%M')}")
-    p.drawString(50, 670, "Items:")
-    y = 650
-    for item in order.items.all():
-        p.drawString(60, y, f"{item.product.name} x{item.quantity} — ₹{item.get_cost()}")
-        y -= 20
-        if y < 80:
-            p.showPage()
-            y = 800
-    p.drawString(50, y - 20, f"Total: ₹{order.get_total_cost()}")
-    p.showPage()
-    p.save()
-    return response
+    return ranged_file_response(
+        request,
+        get_invoice(order),
+        content_type="application/pdf",
+        filename=invoice_filename(order),
+    )
 def stripe_cancel(request):
     return render(request, "orders/stripe_cancel.html")
 @csrf_exempt
 def stripe_webhook(request):
+    import stripe
+    # Only a payload Stripe didn't sign is a bad request; anything else (the
+    # database, say) is left to become a 500, which Stripe retries.
+    try:
+        ingest_event(request.body, request.headers.get("stripe-signature"))
+    except (ValueError, stripe.SignatureVerificationError):
+        return HttpResponse(status=400)
     return HttpResponse(status=200)
\ No newline at end of file
@@ -0,0 +1,185 @@
+import json
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+from dashboard.rollups import record_order_paid, record_order_unpaid
+from jobs.queue import enqueue
+from .models import Order, StripeEvent
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 8
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+STALE_PROCESSING = timedelta(minutes=10)
+
+def _order_id_from(obj):
+    metadata = obj.get("metadata") or {}
+    order_id = metadata.get("order_id") or obj.get("client_reference_id")
+    if order_id:
+        try:
+            return int(order_id)
+        except (TypeError, ValueError):
+            return None
+    intent_id = obj.get("payment_intent")
+    if obj.get("object") == "payment_intent":
+        intent_id = obj.get("id")
+    if intent_id:
+        return (
+            Order.objects.filter(stripe_payment_intent=intent_id)
+            .values_list("id", flat=True)
+            .first()
+        )
+    return None
+def store_event(data):
+    """Persist a verified event dict; returns ``(event, created)``."""
+    obj = data.get("data", {}).get("object", {})
+    return StripeEvent.objects.get_or_create(
+        event_id=data["id"],
+        defaults={
+            "type": data["type"],
+            "payload": data,
+            "order_id": _order_id_from(obj),
+            "stripe_created": datetime.fromtimestamp(data.get("created") or 0, tz=dt_timezone.utc),
+        },
+    )
+def ingest_event(payload, sig_header):
+    """
+    Verify a raw webhook body and store it. Raises ``ValueError`` or
+    ``stripe.SignatureVerificationError`` for payloads Stripe didn't sign.
+    Processing is left to ``process_pending_events``, queued as a job.
+    """
+    import stripe
+    stripe.Webhook.construct_event(payload, sig_header, settings.STRIPE_WEBHOOK_SECRET)
+    event, created = store_event(json.loads(payload))
+    if created:
+        enqueue("orders.process_stripe_events", unique_key="orders.process_stripe_events")
+    return event, created
+def _locked_order(order_id):
+    if order_id is None:
+        return None
+    return Order.objects.select_for_update().filter(pk=order_id).first()
+def _mark_paid(order, intent_id):
+    if not order.paid:
+        record_order_paid(order)
+    order.paid = True
+    order.payment_status = "PAID"
+    if intent_id:
+        order.stripe_payment_intent = intent_id
+    order.save(update_fields=["paid", "payment_status", "stripe_payment_intent", "updated"])
+    enqueue("orders.render_invoice", {"order_id": order.id})
+def handle_payment_succeeded(event, obj):
+    order = _locked_order(event.order_id)
+    if order is None:
+        return False
+    _mark_paid(order, obj.get("id"))
+    return True
+def handle_payment_failed(event, obj):
+    order = _locked_order(event.order_id)
+    if order is None or order.paid:
+        return False
+    order.payment_status = "FAILED"
+    order.stripe_payment_intent = obj.get("id") or order.stripe_payment_intent
+    order.save(update_fields=["payment_status", "stripe_payment_intent", "updated"])
+    return True
+def handle_checkout_completed(event, obj):
+    order = _locked_order(event.order_id)
+    if order is None:
+        return False
+    if obj.get("payment_status") == "paid":
+        _mark_paid(order, obj.get("payment_intent"))
+    elif obj.get("payment_intent") and not order.stripe_payment_intent:
+        order.stripe_payment_intent = obj["payment_intent"]
+        order.save(update_fields=["stripe_payment_intent", "updated"])
+    return True
+def handle_charge_refunded(event, obj):
+    order = _locked_order(event.order_id)
+    if order is None:
+        return False
+    amount, amount_refunded = obj.get("amount"), obj.get("amount_refunded")
+    if obj.get("refunded") or (None not in (amount, amount_refunded) and amount_refunded >= amount):
+        if order.paid:
+            record_order_unpaid(order)
+        order.paid = False
+        order.payment_status = "REFUNDED"
+    else:
+        order.payment_status = "PARTIALLY_REFUNDED"
+    order.save(update_fields=["paid", "payment_status", "updated"])
+    return True
+HANDLERS = {
+    "payment_intent.succeeded": handle_payment_succeeded,
+    "payment_intent.payment_failed": handle_payment_failed,
+    "checkout.session.completed": handle_checkout_completed,
+    "charge.refunded": handle_charge_refunded,
+}
+def retry_delay(attempts):
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS))
+def process_event(event):
+    """Run the handler for an already-claimed event and record the outcome."""
+    handler = HANDLERS.get(event.type)
+    event.attempts += 1
+    try:
+        with transaction.atomic():
+            if handler is None:
+                handled = False
+            else:
+                if event.order_id is None:
+                    event.order_id = _order_id_from(event.payload["data"]["object"])
+                handled = handler(event, event.payload["data"]["object"])
+    except Exception as exc:
+        logger.exception("Stripe event %s failed (attempt %s)", event.event_id, event.attempts)
+        event.last_error = repr(exc)
+        if event.attempts >= MAX_ATTEMPTS:
+            event.status = "failed"
+        else:
+            event.status = "pending"
+            event.next_attempt_at = timezone.now() + retry_delay(event.attempts)
+    else:
+        event.status = "processed" if handled else "skipped"
+        event.processed = timezone.now()
+        event.last_error = ""
+    event.save(update_fields=[
+        "status", "attempts", "order_id", "next_attempt_at", "last_error", "processed",
+    ])
+    return event.status
+def process_pending_events(limit=100):
+    """
+    Process due events oldest-first. An event is held back while an earlier
+    event for the same order is still pending a retry or being processed
+    elsewhere, so handlers always see each order's events in Stripe order.
+    Returns the number of events handled in this pass.
+    """
+    now = timezone.now()
+    StripeEvent.objects.filter(
+        status="processing", next_attempt_at__lt=now - STALE_PROCESSING
+    ).update(status="pending")
+    due = list(
+        StripeEvent.objects.filter(status="pending", next_attempt_at__lte=now)
+        .order_by("stripe_created", "id")[:limit]
+    )
+    order_ids = {e.order_id for e in due if e.order_id is not None}
+    blocked = dict(
+        StripeEvent.objects.filter(order_id__in=order_ids, status__in=["pending", "processing"])
+        .exclude(status="pending", next_attempt_at__lte=now)
+        .values("order_id")
+        .annotate(first=Min("stripe_created"))
+        .values_list("order_id", "first")
+    )
+    done = 0
+    for event in due:
+        first_blocked = blocked.get(event.order_id)
+        if first_blocked is not None and first_blocked <= event.stripe_created:
+            continue
+        claimed = StripeEvent.objects.filter(pk=event.pk, status="pending").update(
+            status="processing", next_attempt_at=timezone.now()
+        )
+        if not claimed:
+            continue
+        status = process_event(event)
+        done += 1
+        if status == "pending" and event.order_id is not None:
+            blocked.setdefault(event.order_id, event.stripe_created)
+    return done
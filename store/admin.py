@@ -1,11 +1,12 @@
 from django.contrib import admin
 from django.utils.html import format_html
+from dashboard.inventory import record_stock_change
 from .models import Category, Product, ProductImage
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     prepopulated_fields = {'slug': ('name',)}
-    list_display = ['name', 'slug']
+    list_display = ['name', 'slug', 'low_stock_threshold']
 class ProductImageInline(admin.TabularInline):
     model = ProductImage
     extra = 3
@@ -28,11 +29,13 @@ class ProductAdmin(admin.ModelAdmin):
         'ram_size',
         'cpu_model',
         'stock',
+        'is_low_stock',
         'available',
         'created'
     ]
     list_filter = [
         'available',
+        'is_low_stock',
         'created',
         'brand',
         'category',
@@ -79,7 +82,11 @@ class ProductAdmin(admin.ModelAdmin):
             )
         }),
         ("🟥 Inventory", {
-            "fields": ("stock", "available")
+            "fields": ("stock", "low_stock_threshold", "available")
         }),
     )
-    inlines = [ProductImageInline]
\ No newline at end of file
+    inlines = [ProductImageInline]
+    def save_model(self, request, obj, form, change):
+        previous = obj.previous_stock
+        super().save_model(request, obj, form, change)
+        record_stock_change(obj, previous)
\ No newline at end of file
@@ -0,0 +1,66 @@
+"""
+Product filtering and sorting shared by the storefront's ``product_list`` and
+the API's ``ProductListAPI``, so a query string narrows both the same way.
+Values that don't parse are ignored rather than rejected, as the storefront's
+filter form can send empty or partial values.
+"""
+from decimal import Decimal, InvalidOperation
+from django.db.models import Avg, Q
+from .models import Product
+
+def _decimal(value):
+    try:
+        return Decimal(value) if value else None
+    except InvalidOperation:
+        return None
+def _with_rating(qs):
+    if "avg_rating" in qs.query.annotations:
+        return qs
+    return qs.annotate(avg_rating=Avg("reviews__rating"))
+def requested_brands(params):
+    """``?brand=a&brand=b`` or ``?brand=a,b``."""
+    brands = []
+    for value in params.getlist("brand"):
+        brands += [b.strip() for b in value.split(",") if b.strip()]
+    return brands
+def filter_products(qs, params):
+    """
+    Narrow ``qs`` by the ``q``, ``category`` (slug), ``min_price``/``max_price``,
+    ``brand``, ``rating_min`` and ``in_stock`` parameters in ``params``.
+    """
+    q = params.get("q", "").strip()
+    if q:
+        qs = qs.filter(Q(name__icontains=q) | Q(description__icontains=q) | Q(brand__icontains=q))
+    category_slug = params.get("category")
+    if category_slug:
+        qs = qs.filter(category__slug=category_slug)
+    min_price = _decimal(params.get("min_price"))
+    if min_price is not None:
+        qs = qs.filter(price__gte=min_price)
+    max_price = _decimal(params.get("max_price"))
+    if max_price is not None:
+        qs = qs.filter(price__lte=max_price)
+    brands = requested_brands(params)
+    if brands:
+        qs = qs.filter(brand__in=brands)
+    try:
+        rating_min = float(params.get("rating_min") or "")
+    except ValueError:
+        rating_min = None
+    if rating_min is not None:
+        qs = _with_rating(qs).filter(avg_rating__gte=rating_min)
+    in_stock = params.get("in_stock")
+    if in_stock and in_stock.lower() in ("1", "true", "yes"):
+        qs = qs.filter(stock__gt=0)
+    return qs
+def sort_products(qs, sort):
+    """Order ``qs`` by a ``?sort=`` value; newest first by default. Ties break on id so pages don't overlap."""
+    if sort == "low_price":
+        return qs.order_by("price", "id")
+    if sort == "high_price":
+        return qs.order_by("-price", "id")
+    if sort == "popular" and hasattr(Product, "sales_count"):
+        return qs.order_by("-sales_count", "-created", "-id")
+    if sort == "rating":
+        return _with_rating(qs).order_by("-avg_rating", "-created", "-id")
+    return qs.order_by("-created", "-id")
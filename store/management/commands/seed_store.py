@@ -0,0 +1,69 @@
+import time
+from datetime import datetime, time as dt_time
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from dashboard.rollups import rebuild_rollups
+from store.seeding import Seeder, flush, seeded
+
+class Command(BaseCommand):
+    help = "Generate a deterministic synthetic catalogue, customers and order history for scale testing."
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--categories", type=int, default=8)
+        parser.add_argument("--products", type=int, default=2000)
+        parser.add_argument("--gallery", type=int, default=3, help="Average gallery images per product.")
+        parser.add_argument("--users", type=int, default=10000)
+        parser.add_argument("--orders", type=int, default=50000)
+        parser.add_argument("--reviews", type=int, default=20000)
+        parser.add_argument("--wishlists", type=int, default=10000, help="Wishlist entries.")
+        parser.add_argument("--carts", type=int, default=5000, help="Cart items.")
+        parser.add_argument("--device-tokens", type=int, default=10000)
+        parser.add_argument("--days", type=int, default=730, help="Length of the order history.")
+        parser.add_argument("--end", help="Last day (YYYY-MM-DD) of the history; pass it for reproducible timestamps.")
+        parser.add_argument("--password", default="password", help="Password for every seeded user.")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--flush", action="store_true", help="Delete previously seeded data first.")
+        parser.add_argument("--skip-rollups", action="store_true", help="Don't rebuild the dashboard rollups.")
+    def handle(self, *args, **options):
+        for name in ("categories", "products", "users"):
+            if options[name] < 1:
+                raise CommandError(f"--{name} must be at least 1.")
+        end = None
+        if options["end"]:
+            try:
+                day = datetime.strptime(options["end"], "%Y-%m-%d").date()
+            except ValueError as exc:
+                raise CommandError(exc)
+            end = timezone.make_aware(datetime.combine(day, dt_time(23, 59, 59)))
+        if options["flush"]:
+            self.stdout.write(f"Removed {flush()} seeded orders and the rest of the seeded data.")
+        elif seeded():
+            raise CommandError("Seeded data already exists; pass --flush to replace it.")
+        started = time.perf_counter()
+        seeder = Seeder(
+            seed=options["seed"],
+            batch_size=options["batch_size"],
+            days=options["days"],
+            end=end,
+            password=options["password"],
+            log=self.stdout.write if options["verbosity"] > 1 else None,
+        )
+        seeder.run(
+            categories=options["categories"],
+            products=options["products"],
+            users=options["users"],
+            orders=options["orders"],
+            reviews=options["reviews"],
+            wishlists=options["wishlists"],
+            carts=options["carts"],
+            device_tokens=options["device_tokens"],
+            gallery=options["gallery"],
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {options['products']} products, {options['users']} users and "
+            f"{options['orders']} orders in {elapsed:.1f}s."
+        ))
+        if not options["skip_rollups"]:
+            rebuild_rollups()
+            self.stdout.write(f"Rebuilt dashboard rollups in {time.perf_counter() - started - elapsed:.1f}s.")
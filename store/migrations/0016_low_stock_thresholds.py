@@ -0,0 +1,39 @@
+# Generated by Django 6.0 on 2026-10-19 17:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def flag_low_stock(apps, schema_editor):
+    Product = apps.get_model('store', 'Product')
+    Product.objects.filter(stock__lte=settings.LOW_STOCK_THRESHOLD).update(is_low_stock=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0015_watermark_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='low_stock_threshold',
+            field=models.PositiveIntegerField(blank=True, help_text="Alert when a product's stock falls to this level. Products can override it.", null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='is_low_stock',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='low_stock_threshold',
+            field=models.PositiveIntegerField(blank=True, help_text="Overrides the category's low-stock threshold.", null=True),
+        ),
+        migrations.RunPython(flag_low_stock, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_low_stock', True)), fields=['stock'], name='product_low_stock_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:09
+
+import PrimeStore.media
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0016_low_stock_thresholds'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=PrimeStore.media.HashedFilenameStorage(), upload_to='products/%Y/%m/%d'),
+        ),
+        migrations.AlterField(
+            model_name='productimage',
+            name='image',
+            field=models.ImageField(storage=PrimeStore.media.HashedFilenameStorage(), upload_to='products/gallery/'),
+        ),
+    ]
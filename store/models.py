@@ -4,6 +4,7 @@ from django.urls import reverse
 from django.conf import settings
 from django.utils import timezone
 from django.utils.text import slugify
+from PrimeStore.media import hashed_storage
 
 class Coupon(models.Model):
     code = models.CharField(max_length=20, unique=True)
@@ -30,8 +31,27 @@ class Coupon(models.Model):
 class Category(models.Model):
     name = models.CharField(max_length=200, unique=True)
     slug = models.SlugField(max_length=200, unique=True)
+    low_stock_threshold = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Alert when a product's stock falls to this level. Products can override it."
+    )
     class Meta:
         ordering = ['name']
+    def save(self, *args, **kwargs):
+        threshold_changed = self.pk and Category.objects.filter(pk=self.pk).exclude(
+            low_stock_threshold=self.low_stock_threshold
+        ).exists()
+        super().save(*args, **kwargs)
+        if threshold_changed:
+            threshold = self.low_stock_threshold
+            if threshold is None:
+                threshold = settings.LOW_STOCK_THRESHOLD
+            self.products.filter(low_stock_threshold__isnull=True).update(
+                is_low_stock=models.ExpressionWrapper(
+                    models.Q(stock__lte=threshold), output_field=models.BooleanField()
+                )
+            )
     def __str__(self):
         return self.name
 class Product(models.Model):
@@ -63,17 +83,60 @@ class Product(models.Model):
     graphics_coprocessor = models.CharField(max_length=150, blank=True, null=True)
     about_this_item = models.TextField(blank=True, null=True)
     description = models.TextField(blank=True, null=True)
-    image = models.ImageField(upload_to="products/%Y/%m/%d", blank=True, null=True)
+    image = models.ImageField(upload_to="products/%Y/%m/%d", storage=hashed_storage, blank=True, null=True)
     stock = models.PositiveIntegerField(default=0)
+    low_stock_threshold = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Overrides the category's low-stock threshold."
+    )
+    is_low_stock = models.BooleanField(default=False, editable=False)
     available = models.BooleanField(default=True)
     sales_count = models.PositiveIntegerField(default=0)
     is_limited_offer = models.BooleanField(default=False)
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated', 'id'], name='product_updated_id_idx'),
+            # Default order of the storefront and the product API.
+            models.Index(fields=['-created', '-id'], name='product_created_idx'),
+            models.Index(
+                fields=['stock'],
+                name='product_low_stock_idx',
+                condition=models.Q(is_low_stock=True)
+            ),
+        ]
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_stock = instance.__dict__.get('stock')
+        return instance
+    @property
+    def previous_stock(self):
+        """Stock as loaded from the database, or None for a new product."""
+        return getattr(self, '_loaded_stock', None)
+    def get_low_stock_threshold(self):
+        if self.low_stock_threshold is not None:
+            return self.low_stock_threshold
+        if Product.category.is_cached(self):
+            category_threshold = self.category.low_stock_threshold if self.category else None
+        else:
+            category_threshold = Category.objects.filter(pk=self.category_id).values_list(
+                'low_stock_threshold', flat=True
+            ).first()
+        if category_threshold is not None:
+            return category_threshold
+        return settings.LOW_STOCK_THRESHOLD
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
+        self.is_low_stock = self.stock <= self.get_low_stock_threshold()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'stock', 'low_stock_threshold'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'is_low_stock'}
         super().save(*args, **kwargs)
+        self._loaded_stock = self.stock
     def get_absolute_url(self):
         return reverse('store:product_detail', kwargs={'slug': self.slug})
     def __str__(self):
@@ -87,7 +150,7 @@ class ProductImage(models.Model):
         related_name="gallery",   # product.gallery.all()
         on_delete=models.CASCADE
     )
-    image = models.ImageField(upload_to="products/gallery/")
+    image = models.ImageField(upload_to="products/gallery/", storage=hashed_storage)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     def __str__(self):
         return f"Image for {self.product.name}"
@@ -113,6 +176,7 @@ class Review(models.Model):
     class Meta:
         unique_together = ('product', 'user')
         ordering = ['-created']
+        indexes = [models.Index(fields=['updated', 'id'], name='review_updated_id_idx')]
     def __str__(self):
         return f"{self.user.username} review for {self.product.name}"
     def get_absolute_url(self):
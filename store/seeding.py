@@ -0,0 +1,411 @@
+"""
+Synthetic catalogue, customer and order data for local scale testing.
+
+``Seeder`` builds every row from one ``random.Random(seed)`` and writes them
+with ``bulk_create`` in batches, so the same seed (and ``end``) always gives
+the same data and a million orders load in a few minutes. Seeded rows are
+recognisable by the ``seed-`` slug/username prefix and the ``SEED_EMAIL_DOMAIN``
+address, which is what ``flush()`` removes.
+"""
+import random
+from collections import Counter
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate, islice
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+from accounts.models import Address, DeviceToken
+from orders.models import Order, OrderItem
+from .models import CartItem, Category, Product, ProductImage, Review, Wishlist
+
+SEED_PREFIX = "seed-"
+SEED_EMAIL_DOMAIN = "seed.primestore.test"
+
+COLOURS = ["Black", "White", "Silver", "Blue", "Red", "Green", "Grey", "Gold", "Navy", "Beige"]
+CATALOG = [
+    {
+        "name": "Smartphones",
+        "brands": ["Samsung", "Apple", "OnePlus", "Xiaomi", "Realme", "Motorola", "Google"],
+        "nouns": ["Galaxy", "Phone", "Nord", "Note", "Edge", "Pixel"],
+        "price": (7999, 149999),
+        "specs": {
+            "operating_system": ["Android 14", "Android 15", "iOS 18"],
+            "storage_capacity": ["64 GB", "128 GB", "256 GB", "512 GB"],
+            "screen_size": ["6.1 Inches", "6.5 Inches", "6.7 Inches"],
+            "ram_size": ["4 GB", "6 GB", "8 GB", "12 GB"],
+            "colour": COLOURS,
+        },
+    },
+    {
+        "name": "Laptops",
+        "brands": ["Dell", "HP", "Lenovo", "ASUS", "Acer", "Apple", "MSI"],
+        "nouns": ["Inspiron", "Pavilion", "IdeaPad", "VivoBook", "Aspire", "MacBook", "ThinkPad"],
+        "price": (29999, 249999),
+        "specs": {
+            "operating_system": ["Windows 11 Home", "Windows 11 Pro", "macOS", "Ubuntu"],
+            "screen_size": ["13.3 Inches", "14 Inches", "15.6 Inches", "16 Inches"],
+            "hard_disk_size": ["256 GB SSD", "512 GB SSD", "1 TB SSD"],
+            "cpu_model": ["Core i5", "Core i7", "Ryzen 5", "Ryzen 7", "Apple M3"],
+            "ram_size": ["8 GB", "16 GB", "32 GB"],
+            "graphics_card": ["Integrated", "GeForce RTX 4050", "GeForce RTX 4060", "Radeon 780M"],
+            "graphics_coprocessor": ["Intel Iris Xe", "NVIDIA GeForce", "AMD Radeon", "Apple GPU"],
+            "colour": COLOURS[:4],
+        },
+    },
+    {
+        "name": "Headphones",
+        "brands": ["Sony", "boAt", "JBL", "Sennheiser", "Bose", "Noise"],
+        "nouns": ["Buds", "Rockerz", "Tune", "Momentum", "QuietComfort", "Airdopes"],
+        "price": (799, 34999),
+        "specs": {"colour": COLOURS, "country_of_origin": ["China", "India", "Vietnam"]},
+    },
+    {
+        "name": "Men's Clothing",
+        "brands": ["Levi's", "Allen Solly", "Peter England", "U.S. Polo Assn.", "Roadster", "H&M"],
+        "nouns": ["Shirt", "T-Shirt", "Jeans", "Chinos", "Polo", "Jacket"],
+        "price": (399, 4999),
+        "specs": {
+            "material_composition": ["100% Cotton", "Cotton Blend", "Linen", "Polyester", "Denim"],
+            "style": ["Casual", "Formal", "Smart Casual"],
+            "fit_type": ["Slim Fit", "Regular Fit", "Relaxed Fit"],
+            "pattern": ["Solid", "Checked", "Striped", "Printed"],
+            "care_instructions": ["Machine Wash", "Hand Wash Only", "Dry Clean Only"],
+            "country_of_origin": ["India", "Bangladesh"],
+            "colour": COLOURS,
+        },
+    },
+    {
+        "name": "Women's Clothing",
+        "brands": ["BIBA", "W", "Libas", "ONLY", "Vero Moda", "Zara"],
+        "nouns": ["Kurta", "Dress", "Top", "Saree", "Palazzo", "Cardigan"],
+        "price": (499, 7999),
+        "specs": {
+            "material_composition": ["Rayon", "100% Cotton", "Georgette", "Silk Blend"],
+            "style": ["Ethnic", "Western", "Casual"],
+            "fit_type": ["Regular Fit", "Flared", "Straight"],
+            "length": ["Knee Length", "Calf Length", "Ankle Length"],
+            "pattern": ["Floral", "Solid", "Embroidered", "Printed"],
+            "care_instructions": ["Machine Wash", "Hand Wash Only"],
+            "country_of_origin": ["India"],
+            "colour": COLOURS,
+        },
+    },
+    {
+        "name": "Watches",
+        "brands": ["Titan", "Fastrack", "Casio", "Fossil", "Noise", "Amazfit"],
+        "nouns": ["Analog", "Chronograph", "Smartwatch", "Edge", "Classic"],
+        "price": (999, 29999),
+        "specs": {"style": ["Casual", "Formal", "Sports"], "colour": COLOURS[:6], "country_of_origin": ["India", "Japan", "China"]},
+    },
+    {
+        "name": "Home & Kitchen",
+        "brands": ["Prestige", "Pigeon", "Milton", "Philips", "Bajaj", "Borosil"],
+        "nouns": ["Pressure Cooker", "Kettle", "Mixer Grinder", "Bottle", "Air Fryer", "Tawa"],
+        "price": (299, 12999),
+        "specs": {"material_composition": ["Stainless Steel", "Aluminium", "Glass", "Plastic"], "colour": COLOURS[:5]},
+    },
+    {
+        "name": "Footwear",
+        "brands": ["Nike", "Adidas", "Puma", "Bata", "Campus", "Skechers"],
+        "nouns": ["Running Shoes", "Sneakers", "Sandals", "Loafers", "Slides"],
+        "price": (599, 14999),
+        "specs": {
+            "material_composition": ["Mesh", "Leather", "Synthetic", "Canvas"],
+            "style": ["Sports", "Casual", "Formal"],
+            "care_instructions": ["Wipe with a dry cloth"],
+            "colour": COLOURS,
+        },
+    },
+]
+FIRST_NAMES = [
+    "Aarav", "Vivaan", "Aditya", "Arjun", "Sai", "Reyansh", "Ishaan", "Kabir", "Rohan", "Aryan",
+    "Ananya", "Diya", "Aadhya", "Saanvi", "Pari", "Myra", "Anika", "Kiara", "Meera", "Riya",
+]
+LAST_NAMES = [
+    "Sharma", "Verma", "Patel", "Iyer", "Reddy", "Nair", "Gupta", "Singh", "Khan", "Das",
+    "Mehta", "Joshi", "Kulkarni", "Chatterjee", "Rao", "Bose",
+]
+CITIES = [
+    ("Mumbai", "Maharashtra", "400"), ("Pune", "Maharashtra", "411"), ("Delhi", "Delhi", "110"),
+    ("Bengaluru", "Karnataka", "560"), ("Chennai", "Tamil Nadu", "600"), ("Hyderabad", "Telangana", "500"),
+    ("Kolkata", "West Bengal", "700"), ("Ahmedabad", "Gujarat", "380"), ("Jaipur", "Rajasthan", "302"),
+    ("Kochi", "Kerala", "682"),
+]
+STREETS = ["MG Road", "Park Street", "Station Road", "Link Road", "Ring Road", "Main Road", "Church Street"]
+REVIEW_COMMENTS = {
+    5: ["Excellent product, totally worth it.", "Love it!", "Great quality and fast delivery."],
+    4: ["Good value for money.", "Works well, minor issues.", "Pretty good overall."],
+    3: ["Average, does the job.", "Okay for the price."],
+    2: ["Not as described.", "Quality could be better."],
+    1: ["Stopped working after a week.", "Very disappointed."],
+}
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let ``bulk_create`` keep the ``auto_now``/``auto_now_add`` values we set."""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+class Seeder:
+    def __init__(self, seed=0, batch_size=5000, days=730, end=None, password="password", log=None):
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.end = end or timezone.now().replace(microsecond=0)
+        self.start = self.end - timedelta(days=days)
+        self.password = password
+        self.log = log or (lambda message: None)
+        self.categories = []
+        self.products = []
+        self.users = []
+    def _moment(self, fraction):
+        return self.start + (self.end - self.start) * fraction
+    def _insert(self, model, objs):
+        """``bulk_create`` ``objs`` (any iterable) one committed batch at a time."""
+        created = []
+        objs = iter(objs)
+        while batch := list(islice(objs, self.batch_size)):
+            with transaction.atomic():
+                created.extend(model.objects.bulk_create(batch, batch_size=self.batch_size))
+        return created
+    def _pairs(self, count):
+        """``count`` distinct (user, product) pairs, products drawn by popularity."""
+        limit = min(count, len(self.users) * len(self.products))
+        seen = set()
+        while len(seen) < limit:
+            pair = (self.rng.randrange(len(self.users)), self._product_index())
+            if pair not in seen:
+                seen.add(pair)
+                yield self.users[pair[0]], self.products[pair[1]]
+    def _product_index(self):
+        return self.rng.choices(range(len(self.products)), cum_weights=self.product_weights)[0]
+    def seed_categories(self, count):
+        taken = set(Category.objects.values_list("name", flat=True))
+        rows = []
+        for index in range(count):
+            spec = CATALOG[index % len(CATALOG)]
+            name = spec["name"] if index < len(CATALOG) else f"{spec['name']} {index // len(CATALOG) + 1}"
+            while name in taken:
+                name += " *"
+            taken.add(name)
+            rows.append(Category(name=name, slug=f"{SEED_PREFIX}{slugify(name)}-{index}"))
+        self.categories = [(category, CATALOG[index % len(CATALOG)]) for index, category in enumerate(self._insert(Category, rows))]
+        self.log(f"categories: {len(self.categories)}")
+    def _product(self, index):
+        rng = self.rng
+        category, spec = self.categories[index % len(self.categories)]
+        brand = rng.choice(spec["brands"])
+        model_name = f"{rng.choice('ABCDEFGHKMNPRSTXZ')}{rng.randint(1, 99)}"
+        name = f"{brand} {rng.choice(spec['nouns'])} {model_name}"
+        low, high = spec["price"]
+        price = Decimal(int(low * (high / low) ** rng.random())) - Decimal("0.01")
+        stock = 0 if rng.random() < 0.03 else rng.randint(1, 8) if rng.random() < 0.1 else rng.randint(9, 500)
+        slug = f"{SEED_PREFIX}{slugify(name)}-{index}"
+        created = self._moment(rng.random() * 0.5)
+        return Product(
+            category=category,
+            name=name,
+            slug=slug,
+            price=price,
+            brand=brand,
+            model_name=model_name,
+            description=f"{name} from {brand}. {rng.choice(spec['nouns'])} built for everyday use.",
+            about_this_item=" | ".join(f"{key.replace('_', ' ').title()}: {value}" for key, value in self._specs(spec).items()),
+            image=f"products/seed/{slug}.jpg",
+            stock=stock,
+            is_low_stock=stock <= settings.LOW_STOCK_THRESHOLD,
+            available=rng.random() > 0.02,
+            is_limited_offer=rng.random() < 0.05,
+            created=created,
+            updated=created,
+            **self._specs(spec),
+        )
+    def _specs(self, spec):
+        return {field: self.rng.choice(values) for field, values in spec["specs"].items()}
+    def seed_products(self, count, gallery=3):
+        with explicit_timestamps(Product, ProductImage):
+            self.products = self._insert(Product, (self._product(index) for index in range(count)))
+            def images():
+                for product in self.products:
+                    for n in range(self.rng.randint(gallery - 1, gallery + 1) if gallery else 0):
+                        yield ProductImage(
+                            product=product, image=f"products/gallery/seed/{product.slug}-{n}.jpg", uploaded_at=product.created
+                        )
+            image_count = len(self._insert(ProductImage, images()))
+        # A few best sellers and a long tail, in shuffled catalogue order.
+        weights = [1 / (rank + 1) ** 0.9 for rank in range(len(self.products))]
+        self.rng.shuffle(weights)
+        self.product_weights = list(accumulate(weights))
+        self.log(f"products: {len(self.products)} ({image_count} gallery images)")
+    def seed_users(self, count):
+        rng = self.rng
+        password = make_password(self.password)
+        def users():
+            for index in range(count):
+                first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                username = f"{SEED_PREFIX}{index:07d}"
+                yield User(
+                    username=username,
+                    first_name=first,
+                    last_name=last,
+                    email=f"{first.lower()}.{last.lower()}.{index}@{SEED_EMAIL_DOMAIN}",
+                    password=password,
+                    date_joined=self._moment(rng.random() ** 1.5),
+                )
+        self.users = self._insert(User, users())
+        def addresses():
+            for user in self.users:
+                for n in range(1 if rng.random() < 0.8 else 2):
+                    city, state, pin = rng.choice(CITIES)
+                    yield Address(
+                        user=user,
+                        full_name=f"{user.first_name} {user.last_name}",
+                        phone=f"9{rng.randrange(10 ** 9):09d}",
+                        address=f"{rng.randint(1, 999)}, {rng.choice(STREETS)}",
+                        city=city,
+                        postal_code=f"{pin}{rng.randrange(1000):03d}",
+                        state=state,
+                        is_default=n == 0,
+                    )
+        addresses = self._insert(Address, addresses())
+        self.shipping = {address.user_id: address for address in addresses if address.is_default}
+        # Repeat customers: a heavy-tailed share of orders per user.
+        self.user_weights = list(accumulate(rng.paretovariate(1.2) for _ in self.users))
+        self.log(f"users: {len(self.users)} ({len(addresses)} addresses)")
+    def seed_reviews(self, count):
+        def reviews():
+            for user, product in self._pairs(count):
+                rating = self.rng.choices([5, 4, 3, 2, 1], weights=[45, 30, 12, 6, 7])[0]
+                created = self._moment(self.rng.random())
+                yield Review(
+                    product=product, user=user, rating=rating,
+                    comment=self.rng.choice(REVIEW_COMMENTS[rating]), created=created, updated=created,
+                )
+        with explicit_timestamps(Review):
+            self.log(f"reviews: {len(self._insert(Review, reviews()))}")
+    def seed_wishlists(self, count):
+        with explicit_timestamps(Wishlist):
+            rows = (
+                Wishlist(user=user, product=product, created=self._moment(self.rng.random()))
+                for user, product in self._pairs(count)
+            )
+            self.log(f"wishlist items: {len(self._insert(Wishlist, rows))}")
+    def seed_carts(self, count):
+        def items():
+            for user, product in self._pairs(count):
+                created = self._moment(0.9 + self.rng.random() * 0.1)
+                yield CartItem(user=user, product=product, quantity=self.rng.choice([1, 1, 1, 2, 3]), created=created, updated=created)
+        with explicit_timestamps(CartItem):
+            self.log(f"cart items: {len(self._insert(CartItem, items()))}")
+    def _order(self, index, count):
+        rng = self.rng
+        # Increasing timestamps with volume growing over the period.
+        created = self._moment(min(((index + rng.random()) / count) ** (1 / 1.7), 1))
+        user = None
+        if rng.random() > 0.05:
+            user = self.users[rng.choices(range(len(self.users)), cum_weights=self.user_weights)[0]]
+        address = self.shipping.get(user.pk) if user else None
+        if address is None:
+            city, state, pin = rng.choice(CITIES)
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            email = f"guest.{index}@{SEED_EMAIL_DOMAIN}"
+            street, postal_code = f"{rng.randint(1, 999)}, {rng.choice(STREETS)}", f"{pin}{rng.randrange(1000):03d}"
+        else:
+            first, last, email = user.first_name, user.last_name, user.email
+            city, street, postal_code = address.city, address.address, address.postal_code
+        age = (self.end - created).days
+        status = "DELIVERED" if age > 6 else rng.choice(["PLACED", "PACKED", "SHIPPED", "OUT_FOR_DELIVERY"])
+        cash_on_delivery = rng.random() < 0.15
+        paid = not cash_on_delivery or status == "DELIVERED"
+        payment_status = "PAID" if paid else "UNPAID"
+        roll = rng.random()
+        if paid and roll < 0.01:
+            payment_status = "REFUNDED"
+        elif not cash_on_delivery and roll > 0.98:
+            status, paid, payment_status = "PLACED", False, "FAILED"
+        return Order(
+            user=user,
+            first_name=first,
+            last_name=last,
+            email=email,
+            address=street,
+            postal_code=postal_code,
+            city=city,
+            created=created,
+            updated=created + timedelta(days=min(age, rng.randint(0, 6))),
+            paid=paid,
+            payment_status=payment_status,
+            stripe_payment_intent=None if cash_on_delivery else f"pi_{SEED_PREFIX}{index}",
+            status=status,
+            tracking_number=f"SD{index:010d}" if status in ("SHIPPED", "OUT_FOR_DELIVERY", "DELIVERED") else None,
+            billing_name=f"{first} {last}",
+        )
+    def seed_orders(self, count):
+        rng = self.rng
+        sold = Counter()
+        orders = (self._order(index, count) for index in range(count))
+        total_items = 0
+        with explicit_timestamps(Order, OrderItem):
+            while batch := list(islice(orders, self.batch_size)):
+                with transaction.atomic():
+                    Order.objects.bulk_create(batch)
+                    items = []
+                    for order in batch:
+                        lines = {}
+                        for _ in range(rng.choices([1, 2, 3, 4], weights=[55, 25, 12, 8])[0]):
+                            product = self.products[self._product_index()]
+                            lines[product.pk] = (product, rng.choices([1, 2, 3], weights=[85, 12, 3])[0])
+                        for product, quantity in lines.values():
+                            items.append(OrderItem(order=order, product=product, price=product.price, quantity=quantity, updated=order.created))
+                            sold[product.pk] += quantity
+                    OrderItem.objects.bulk_create(items, batch_size=self.batch_size)
+                total_items += len(items)
+                self.log(f"orders: {batch[-1].created:%Y-%m-%d}, {total_items} items so far")
+        for product in self.products:
+            product.sales_count = sold[product.pk]
+        Product.objects.bulk_update(self.products, ["sales_count"], batch_size=self.batch_size)
+        self.log(f"orders: {count} ({total_items} items)")
+    def seed_device_tokens(self, count):
+        def tokens():
+            for index in range(count):
+                user = self.users[self.rng.randrange(len(self.users))]
+                yield DeviceToken(
+                    user=user,
+                    token=f"{SEED_PREFIX}{index:x}:{self.rng.getrandbits(560):0140x}",
+                    device_type="ios" if self.rng.random() < 0.3 else "android",
+                    created=self._moment(self.rng.random()),
+                )
+        with explicit_timestamps(DeviceToken):
+            self.log(f"device tokens: {len(self._insert(DeviceToken, tokens()))}")
+    def run(self, categories, products, users, orders, reviews=0, wishlists=0, carts=0, device_tokens=0, gallery=3):
+        self.seed_categories(categories)
+        self.seed_products(products, gallery=gallery)
+        self.seed_users(users)
+        self.seed_reviews(reviews)
+        self.seed_wishlists(wishlists)
+        self.seed_carts(carts)
+        self.seed_orders(orders)
+        self.seed_device_tokens(device_tokens)
+def seeded():
+    return User.objects.filter(username__startswith=SEED_PREFIX).exists()
+def flush():
+    """Delete everything a ``Seeder`` created."""
+    with transaction.atomic():
+        orders = Order.objects.filter(email__endswith=f"@{SEED_EMAIL_DOMAIN}").delete()[1].get("orders.Order", 0)
+        Product.objects.filter(slug__startswith=SEED_PREFIX).delete()
+        Category.objects.filter(slug__startswith=SEED_PREFIX).delete()
+        User.objects.filter(username__startswith=SEED_PREFIX).delete()
+    return orders
@@ -1,3 +1,69 @@
-from django.test import TestCase
+import tempfile
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from PrimeStore.media import HashedFilenameStorage
+from PrimeStore.testing import QueryBudgetMixin
+from .models import Category, Product, Review, Wishlist
 
-# Create your tests here.
+class StoreQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Budgets are fixed however many products/reviews are listed, so an N+1 fails them."""
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="Phones", slug="phones")
+        cls.users = [User.objects.create_user(f"user{i}", f"user{i}@example.com", "pass") for i in range(3)]
+        cls.products = [
+            Product.objects.create(
+                category=cls.category,
+                name=f"Phone {i}",
+                slug=f"phone-{i}",
+                price=Decimal("100.00") + i,
+                brand="Acme",
+                image="products/phone.jpg",
+                stock=10,
+            )
+            for i in range(12)
+        ]
+        for product in cls.products:
+            for user in cls.users:
+                Review.objects.create(product=product, user=user, rating=4, comment="Good")
+        for product in cls.products[:5]:
+            Wishlist.objects.create(user=cls.users[0], product=product)
+    def test_product_list(self):
+        self.assertQueryBudget(5, "/")
+        self.assertQueryBudget(5, "/", data={"sort": "rating", "rating_min": "3"})
+    def test_product_list_by_category(self):
+        self.assertQueryBudget(6, f"/category/{self.category.slug}/")
+    def test_product_detail(self):
+        self.client.force_login(self.users[1])
+        self.assertQueryBudget(11, f"/product/{self.products[0].slug}/")
+    def test_product_quick_view(self):
+        self.assertQueryBudget(4, f"/product/quick/{self.products[0].pk}/")
+    def test_search_suggest(self):
+        self.assertQueryBudget(2, "/search/suggest/", data={"q": "Phone"})
+    def test_product_filters(self):
+        self.assertQueryBudget(4, "/filters/")
+    def test_wishlist(self):
+        self.client.force_login(self.users[0])
+        self.assertQueryBudget(4, "/wishlist/")
+class MediaServingTests(TestCase):
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=root.name))
+        self.storage = HashedFilenameStorage(location=root.name)
+    def test_content_hashed_names(self):
+        name = self.storage.save("products/phone.jpg", ContentFile(b"x" * 1000))
+        self.assertRegex(name, r"^products/phone\.[0-9a-f]{12}\.jpg$")
+        self.assertEqual(self.storage.save("products/phone.jpg", ContentFile(b"x" * 1000)), name)
+        self.assertNotEqual(self.storage.save("products/phone.jpg", ContentFile(b"y" * 1000)), name)
+    def test_serve_range_and_revalidation(self):
+        name = self.storage.save("products/phone.jpg", ContentFile(bytes(range(256)) * 4))
+        response = self.client.get(f"/media/{name}", HTTP_RANGE="bytes=10-19")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b"".join(response.streaming_content), bytes(range(10, 20)))
+        self.assertEqual(response["Cache-Control"], "public, max-age=31536000, immutable")
+        response = self.client.get(f"/media/{name}", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get("/media/products/../../settings.py").status_code, 404)
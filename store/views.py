@@ -1,27 +1,25 @@
 from decimal import Decimal
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, get_object_or_404, redirect
 from django.core.paginator import Paginator
 from django.views.decorators.http import require_POST
 from django.http import JsonResponse, HttpResponseBadRequest
 from django.urls import reverse
-from django.db.models import Q, Sum, F, FloatField, Avg, Min, Max
+from django.db.models import Q, Avg, Min, Max
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt, ensure_csrf_cookie
 from django.views.decorators.http import require_GET
-from django.conf import settings
-from django.contrib.auth.models import User
 from .models import Product, Category, Wishlist, Review, ProductImage
 from .forms import ReviewForm
 from .cart import Cart
+from .filters import filter_products, sort_products
 
 try:
-    import stripe
-    stripe.api_key = settings.STRIPE_SECRET_KEY
+    from orders.payments import gateway, PaymentGatewayError
     _HAS_STRIPE = True
 except Exception:
-    stripe = None
+    gateway = None
     _HAS_STRIPE = False
 def _parse_int(value, default=None):
     try:
@@ -31,62 +29,21 @@ def _parse_int(value, default=None):
 @ensure_csrf_cookie
 @require_GET
 def product_list(request, category_slug=None):
-    qs = Product.objects.filter(available=True).select_related("category")
+    qs = (
+        Product.objects.filter(available=True)
+        .select_related("category")
+        .annotate(avg_rating=Avg("reviews__rating"))
+    )
     categories = Category.objects.all()
     category = None
     if category_slug:
         category = get_object_or_404(Category, slug=category_slug)
         qs = qs.filter(category=category)
     q = request.GET.get("q", "").strip()
-    if q:
-        qs = qs.filter(
-            Q(name__icontains=q) |
-            Q(description__icontains=q) |
-            Q(brand__icontains=q)
-        )
     min_price = request.GET.get("min_price")
     max_price = request.GET.get("max_price")
-    if min_price:
-        try:
-            qs = qs.filter(price__gte=Decimal(min_price))
-        except Exception:
-            pass
-    if max_price:
-        try:
-            qs = qs.filter(price__lte=Decimal(max_price))
-        except Exception:
-            pass
-    brand = request.GET.getlist("brand") or request.GET.get("brand")
-    if isinstance(brand, str) and "," in brand:
-        brand = [b.strip() for b in brand.split(",") if b.strip()]
-    if brand:
-        qs = qs.filter(brand__in=brand)
-    rating_min = request.GET.get("rating_min")
-    if rating_min:
-        try:
-            rating_min_val = float(rating_min)
-            qs = qs.annotate(avg_rating=Avg("reviews__rating")).filter(avg_rating__gte=rating_min_val)
-        except Exception:
-            pass
-    in_stock = request.GET.get("in_stock")
-    if in_stock and in_stock.lower() in ("1", "true", "yes"):
-        qs = qs.filter(stock__gt=0)
     sort = request.GET.get("sort", "")
-    if sort == "low_price":
-        qs = qs.order_by("price")
-    elif sort == "high_price":
-        qs = qs.order_by("-price")
-    elif sort == "latest":
-        qs = qs.order_by("-created")
-    elif sort == "popular":
-        if hasattr(Product, "sales_count"):
-            qs = qs.order_by("-sales_count", "-created")
-        else:
-            qs = qs.order_by("-created")
-    elif sort == "rating":
-        qs = qs.annotate(avg_rating=Avg("reviews__rating")).order_by("-avg_rating", "-created")
-    else:
-        qs = qs.order_by("-created")
+    qs = sort_products(filter_products(qs, request.GET), sort)
     page_number = _parse_int(request.GET.get("page"), 1) or 1
     page_size = _parse_int(request.GET.get("page_size"), 12) or 12
     paginator = Paginator(qs, page_size)
@@ -110,7 +67,7 @@ def product_list(request, category_slug=None):
     }
     return render(request, "store/product_list.html", context)
 @require_GET
-def search_suggest(request):
+async def search_suggest(request):
     q = request.GET.get("q", "").strip()
     if not q:
         return JsonResponse([], safe=False)
@@ -121,7 +78,7 @@ def search_suggest(request):
         qs = qs.filter(category__slug=category_slug)
     results = qs.filter(Q(name__icontains=q) | Q(description__icontains=q) | Q(brand__icontains=q))[:limit]
     out = []
-    for p in results:
+    async for p in results:
         out.append({
             "id": p.id,
             "name": p.name,
@@ -202,15 +159,8 @@ def product_quick_view(request, pk):
         "variants": variants,
         "url": request.build_absolute_uri(product.get_absolute_url()),
     })
-@csrf_exempt
-def stripe_checkout(request):
-    if not _HAS_STRIPE:
-        messages.error(request, "Payment gateway is not configured.")
-        return redirect("store:cart_detail")
+def _checkout_line_items(request):
     cart = Cart(request)
-    if len(cart) == 0:
-        messages.error(request, "Your cart is empty.")
-        return redirect("store:cart_detail")
     line_items = []
     for item in cart:
         try:
@@ -225,13 +175,29 @@ def stripe_checkout(request):
             },
             "quantity": item["quantity"],
         })
-    session = stripe.checkout.Session.create(
-        payment_method_types=["card"],
-        line_items=line_items,
-        mode="payment",
-        success_url=request.build_absolute_uri(reverse("store:payment_success")),
-        cancel_url=request.build_absolute_uri(reverse("store:payment_cancel")),
-    )
+    return line_items
+@csrf_exempt
+async def stripe_checkout(request):
+    if not _HAS_STRIPE:
+        await sync_to_async(messages.error)(request, "Payment gateway is not configured.")
+        return redirect("store:cart_detail")
+    line_items = await sync_to_async(_checkout_line_items)(request)
+    if not line_items:
+        await sync_to_async(messages.error)(request, "Your cart is empty.")
+        return redirect("store:cart_detail")
+    try:
+        session = await gateway.acreate_checkout_session(
+            payment_method_types=["card"],
+            line_items=line_items,
+            mode="payment",
+            success_url=request.build_absolute_uri(reverse("store:payment_success")),
+            cancel_url=request.build_absolute_uri(reverse("store:payment_cancel")),
+        )
+    except PaymentGatewayError:
+        await sync_to_async(messages.warning)(
+            request, "Online payments are temporarily unavailable. Please choose Cash on Delivery."
+        )
+        return redirect("orders:order_create")
     return redirect(session.url, code=303)
 def payment_success(request):
     cart = Cart(request)
@@ -408,35 +374,16 @@ def delete_review(request, slug):
 def analytics_dashboard(request):
     if not request.user.is_staff:
         return redirect("store:product_list")
-    total_products = Product.objects.filter(available=True).count()
-    total_users = User.objects.count()
-    total_orders = 0
-    total_revenue = 0
-    recent_orders = 0
-    top_products = []
-    try:
-        from orders.models import Order, OrderItem
-        total_orders = Order.objects.count()
-        total_revenue = OrderItem.objects.aggregate(
-            total=Sum(F("price") * F("quantity"), output_field=FloatField())
-        )["total"] or 0
-        last_30 = timezone.now() - timezone.timedelta(days=30)
-        recent_orders = Order.objects.filter(created__gte=last_30).count()
-        top_products = (
-            OrderItem.objects.values("product__name")
-            .annotate(qty=Sum("quantity"))
-            .order_by("-qty")[:5]
-        )
-    except Exception:
-        total_orders = 0
-        total_revenue = 0
-        recent_orders = 0
-        top_products = []
+    from dashboard.widgets import get_widgets
+    widgets = get_widgets(["catalog", "summary", "top_products"])
+    catalog = widgets["catalog"]["value"]
+    summary = widgets["summary"]["value"]
     return render(request, "store/analytics_dashboard.html", {
-        "total_products": total_products,
-        "total_users": total_users,
-        "total_orders": total_orders,
-        "total_revenue": total_revenue,
-        "recent_orders": recent_orders,
-        "top_products": top_products,
+        "widgets": widgets,
+        "total_products": catalog["total_products"],
+        "total_users": catalog["total_users"],
+        "total_orders": summary["total_orders"],
+        "total_revenue": summary["total_revenue"],
+        "recent_orders": summary["orders_30_days"],
+        "top_products": widgets["top_products"]["value"]["top_products"],
     })
\ No newline at end of file